@@ -634,11 +634,18 @@ void Simplex::setExactSolve(bool exact){
 }
 
 std::vector<double> Simplex::solve(const std::vector<double> &vec){
+	std::vector<double> output;
+	solve(vec, output);
+	return output;
+}
+
+void Simplex::solve(const std::vector<double> &vec, std::vector<double> &output){
 	// The solver should simply follow this pattern:
 	// Ask each top level thing to store its value
 	// Ask each shape controller for its contribution to the output
-	std::vector<double> posVec, clamped, output;
-	std::vector<bool> inverses;
+	std::vector<double> &posVec = posBuffer;
+	std::vector<double> &clamped = clampBuffer;
+	std::vector<bool> &inverses = inverseBuffer;
 	rectify(vec, posVec, clamped, inverses);
 
 
@@ -667,7 +674,7 @@ std::vector<double> Simplex::solve(const std::vector<double> &vec){
 		x.storeValue(vec, posVec, clamped, inverses);
 	*/
 	
-	output.resize(shapes.size());
+	output.assign(shapes.size(), 0.0);
 	double maxAct = 0.0;
 
 
@@ -695,7 +702,6 @@ std::vector<double> Simplex::solve(const std::vector<double> &vec){
 	// set the rest value properly
 	if (!output.empty())
 		output[0] = 1.0 - maxAct;
-	return output;
 }
 
 Simplex::Simplex(const string &json){
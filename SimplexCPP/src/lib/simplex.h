@@ -65,9 +65,10 @@ inline void rectify(const std::vector<double> &rawVec, std::vector<double> &valu
 	inverses.resize(rawVec.size());
 	for (size_t i=0; i<rawVec.size(); ++i){
 		double v = rawVec[i];
+		// Always write the inverse so the output vectors can be re-used
+		inverses[i] = v < 0;
 		if (v < 0){
 			v = -v;
-			inverses[i] = true;
 		}
 		values[i] = v;
 		clamped[i] = (v > MAXVAL) ? MAXVAL : v;
@@ -289,6 +290,10 @@ class TriSpace {
 class Simplex {
 	private:
 		bool exactSolve;
+		// Scratch buffers so repeated solves don't re-allocate
+		std::vector<double> posBuffer;
+		std::vector<double> clampBuffer;
+		std::vector<bool> inverseBuffer;
 	public:
 		std::vector<Shape> shapes;
 		std::vector<Progression> progs;
@@ -320,6 +325,7 @@ class Simplex {
 		bool getExactSolve() { return exactSolve; }
 
 		std::vector<double> solve(const std::vector<double> &vec);
+		void solve(const std::vector<double> &vec, std::vector<double> &output);
 };
 
 } // end namespace simplex
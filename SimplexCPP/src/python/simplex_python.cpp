@@ -1,5 +1,6 @@
 #include <Python.h>
 #include <structmember.h>
+#include <pythread.h>
 
 #include "simplex.h"
 #include <string>
@@ -9,13 +10,31 @@ typedef struct {
     PyObject_HEAD // No Semicolon for this Macro;
     PyObject *definition;
     simplex::Simplex *sPointer;
+    PyThread_type_lock lock; // The solver isn't re-entrant, and the batch solve releases the GIL
 } PySimplex;
 
+// Grab the solver lock, releasing the GIL while we wait if another thread has it
+static void
+PySimplex_acquire(PySimplex* self) {
+    if (!PyThread_acquire_lock(self->lock, 0)) {
+        Py_BEGIN_ALLOW_THREADS
+        PyThread_acquire_lock(self->lock, 1);
+        Py_END_ALLOW_THREADS
+    }
+}
+
+static void
+PySimplex_release(PySimplex* self) {
+    PyThread_release_lock(self->lock);
+}
+
 static void
 PySimplex_dealloc(PySimplex* self) {
     Py_XDECREF(self->definition);
     if (self->sPointer != NULL)
 		delete self->sPointer;
+    if (self->lock != NULL)
+        PyThread_free_lock(self->lock);
     Py_TYPE(self)->tp_free((PyObject*)self);
 }
 
@@ -30,6 +49,12 @@ PySimplex_new(PyTypeObject *type, PyObject *args, PyObject *kwds) {
             return NULL;
         }
         self->sPointer = new simplex::Simplex();
+        self->lock = PyThread_allocate_lock();
+        if (self->lock == NULL) {
+            Py_DECREF(self);
+            PyErr_SetString(PyExc_MemoryError, "Unable to allocate the solver lock");
+            return NULL;
+        }
     }
 
     return (PyObject *)self;
@@ -58,9 +83,11 @@ PySimplex_setdefinition(PySimplex* self, PyObject* jsValue, void* closure){
     Py_DECREF(tmp);
 
     // set the definition in the solver
+    PySimplex_acquire(self);
     self->sPointer->clear();
     self->sPointer->parseJSON(std::string(PyString_AsString(self->definition)));
     self->sPointer->build();
+    PySimplex_release(self);
 
     return 0;
 }
@@ -81,7 +108,9 @@ PySimplex_setexactsolve(PySimplex* self, PyObject* exact, void* closure){
         return -1;
     }
 
+    PySimplex_acquire(self);
     self->sPointer->setExactSolve((truthy == 1));
+    PySimplex_release(self);
     return 0;
 }
 
@@ -115,8 +144,10 @@ PySimplex_solve(PySimplex* self, PyObject* vec){
         Py_DECREF(item);
     }
 
+    PySimplex_acquire(self);
 	self->sPointer->clearValues();
     outVec = self->sPointer->solve(stdVec);
+    PySimplex_release(self);
 
     PyObject *out = PyList_New(outVec.size());
     for (size_t i=0; i<outVec.size(); ++i){
@@ -185,8 +216,10 @@ PySimplex_solveBuffer(PySimplex* self, PyObject* args){
         iptr += inView.strides[0];
     }
 
+    PySimplex_acquire(self);
 	self->sPointer->clearValues();
     outVec = self->sPointer->solve(stdVec);
+    PySimplex_release(self);
 
     if (outView.shape[0] < outVec.size()){
         PyErr_SetString(PyExc_ValueError, "Output must have enough space allocated");
@@ -212,6 +245,119 @@ PySimplex_solveBuffer(PySimplex* self, PyObject* args){
 }
 
 
+// Get whether a float buffer holds doubles, or -1 if it isn't a float buffer
+static int
+bufferIsDouble(const Py_buffer &view){
+    char fmt = 'B';
+    if (view.format != NULL) {
+        size_t fmtLen = strlen(view.format);
+        if (fmtLen > 0)
+            fmt = view.format[fmtLen - 1];
+    }
+    if (fmt == 'd' && view.itemsize == sizeof(double)) return 1;
+    if (fmt == 'f' && view.itemsize == sizeof(float)) return 0;
+    return -1;
+}
+
+static PyObject *
+PySimplex_solveBatchBuffer(PySimplex* self, PyObject* args){
+    PyObject *input, *output;
+    if (!PyArg_ParseTuple(args, "OO", &input, &output)) {
+        return NULL;
+    }
+
+    if (PyObject_CheckBuffer(input) == 0){
+        PyErr_SetString(PyExc_TypeError, "Input must be a buffer");
+        return NULL;
+    }
+    if (PyObject_CheckBuffer(output) == 0){
+        PyErr_SetString(PyExc_TypeError, "Output must be a buffer");
+        return NULL;
+    }
+
+    Py_buffer inView, outView;
+    if (PyObject_GetBuffer(input, &inView, PyBUF_STRIDED_RO | PyBUF_FORMAT) != 0){
+        PyErr_SetString(PyExc_TypeError, "Cannot read input buffer");
+        return NULL;
+    }
+
+    if (PyObject_GetBuffer(output, &outView, PyBUF_STRIDED | PyBUF_FORMAT) != 0){
+        PyErr_SetString(PyExc_TypeError, "Cannot read output buffer");
+        PyBuffer_Release(&inView);
+        return NULL;
+    }
+
+    const char *err = NULL;
+    int inDouble = bufferIsDouble(inView);
+    int outDouble = bufferIsDouble(outView);
+
+    if (inView.ndim != 2)
+        err = "Input must have exactly 2 dimensions";
+    else if (outView.ndim != 2)
+        err = "Output must have exactly 2 dimensions";
+    else if (inDouble == -1 || outDouble == -1)
+        err = "Input and output must be float32 or float64 buffers";
+    else if (outView.shape[0] != inView.shape[0])
+        err = "Input and output must have the same number of rows";
+
+    if (err != NULL){
+        PyErr_SetString(PyExc_ValueError, err);
+        PyBuffer_Release(&inView);
+        PyBuffer_Release(&outView);
+        return NULL;
+    }
+
+    // Check the sizes while holding the lock, so the definition
+    // can't change between the check and the solve
+    PySimplex_acquire(self);
+    size_t numSliders = self->sPointer->sliders.size();
+    size_t numShapes = self->sPointer->shapes.size();
+
+    if ((size_t)inView.shape[1] != numSliders)
+        err = "Input must have one column per slider";
+    else if ((size_t)outView.shape[1] < numShapes)
+        err = "Output must have enough space allocated";
+
+    if (err != NULL){
+        PySimplex_release(self);
+        PyErr_SetString(PyExc_ValueError, err);
+        PyBuffer_Release(&inView);
+        PyBuffer_Release(&outView);
+        return NULL;
+    }
+
+    // Nothing in here touches a python object, so let other threads run
+    Py_BEGIN_ALLOW_THREADS
+
+    std::vector<double> stdVec(numSliders), outVec;
+    for (Py_ssize_t r = 0; r < inView.shape[0]; ++r){
+        char *iptr = (char *)inView.buf + r * inView.strides[0];
+        for (size_t c = 0; c < numSliders; ++c){
+            stdVec[c] = (inDouble) ? *(double *)iptr : (double)(*(float *)iptr);
+            iptr += inView.strides[1];
+        }
+
+        self->sPointer->clearValues();
+        self->sPointer->solve(stdVec, outVec);
+
+        char *optr = (char *)outView.buf + r * outView.strides[0];
+        for (size_t c = 0; c < outVec.size(); ++c){
+            if (outDouble)
+                *(double *)optr = outVec[c];
+            else
+                *(float *)optr = (float)outVec[c];
+            optr += outView.strides[1];
+        }
+    }
+
+    Py_END_ALLOW_THREADS
+    PySimplex_release(self);
+
+    PyBuffer_Release(&inView);
+    PyBuffer_Release(&outView);
+    Py_RETURN_NONE;
+}
+
 
 static PyGetSetDef PySimplex_getseters[] = {
     {"definition",
@@ -233,6 +379,9 @@ static PyMethodDef PySimplex_methods[] = {
     {"solveBuffer", (PyCFunction)PySimplex_solveBuffer, METH_VARARGS,
      "Supply an input list to the solver, and recieve and output buffer"
     },
+    {"solveBatchBuffer", (PyCFunction)PySimplex_solveBatchBuffer, METH_VARARGS,
+     "Supply an (N, numSliders) input buffer to the solver, and fill an (N, numShapes) output buffer"
+    },
     {NULL}  /* Sentinel */
 };
 
@@ -138,13 +138,14 @@ class ComboCheckDialog(QDialog):
 		""" Create the missing selected combos """
 		simplex = self.parent().simplex
 		created = []
-		for item in self.uiComboCheckLIST.selectedItems():
-			name = item.text()
-			sliders, vals = zip(*item.pairs)
-			# Double check that the user didn't create any extra sliders
-			if Combo.comboAlreadyExists(simplex, sliders, vals) is None:
-				c = Combo.createCombo(name, simplex, sliders, vals)
-				created.append(c)
+		with simplex.batch():
+			for item in self.uiComboCheckLIST.selectedItems():
+				name = item.text()
+				sliders, vals = zip(*item.pairs)
+				# Double check that the user didn't create any extra sliders
+				if Combo.comboAlreadyExists(simplex, sliders, vals) is None:
+					c = Combo.createCombo(name, simplex, sliders, vals)
+					created.append(c)
 
 		self.parent().uiComboTREE.setItemSelection(created)
 		self.populateWithoutUpdate()
@@ -1,5 +1,7 @@
+import os, hashlib
 from imath import V3fArray, IntArray, V2fArray, V2f, UnsignedIntArray
-from alembic.AbcGeom import OV2fGeomParamSample, GeometryScope
+from alembic.Abc import OStringProperty
+from alembic.AbcGeom import OV2fGeomParamSample, GeometryScope, OXform, OPolyMesh, OPolyMeshSchemaSample
 
 try:
 	import numpy as np
@@ -84,12 +86,176 @@ def getSampleArray(imesh):
 			shapes.append(s)
 		return shapes
 
+def iterSampleArrays(imesh):
+	''' Yield the point positions of each sample one at a time
+	so the full stack never has to be in memory
+	'''
+	meshSchema = imesh.getSchema()
+	posProp = meshSchema.getPositionsProperty()
+	for s in posProp.samples:
+		if arrayToNumpy is not None:
+			yield np.array(arrayToNumpy(s))
+		elif np is not None:
+			yield np.array(s)
+		else:
+			yield s
+
+# Set this environment variable to a directory to keep the shape caches
+# there instead of next to the .smpx files, or to 0 to disable caching
+SMPX_CACHE_ENV = 'SIMPLEX_SMPX_CACHE'
+
+def getSmpxCachePath(abcPath, tag=None, ext='npy'):
+	''' Get the path of the sidecar shape cache for an alembic file
+	The name has a digest of the absolute path, and a digest of the modification
+	time and size, so any change to the file will miss the cache. Files with the
+	same name in different folders can share a cache folder without colliding.
+	The tag is added to the name so different kinds of cache can live next to
+	the same file
+	'''
+	abcPath = os.path.abspath(abcPath)
+	st = os.stat(abcPath)
+	# Encoding a byte str would decode it as ascii first, so hash it as it is
+	pathKey = abcPath if isinstance(abcPath, str) else abcPath.encode('utf-8')
+	pathDigest = hashlib.sha1(pathKey).hexdigest()[:12]
+	stateKey = '{0!r}|{1}'.format(st.st_mtime, st.st_size)
+	stateDigest = hashlib.sha1(stateKey).hexdigest()[:12]
+
+	cacheDir = os.environ.get(SMPX_CACHE_ENV) or os.path.dirname(abcPath)
+	base = os.path.basename(abcPath)
+	if tag:
+		base = '{0}.{1}'.format(base, tag)
+	return os.path.join(cacheDir, '.{0}.{1}-{2}.{3}'.format(base, pathDigest, stateDigest, ext))
+
+def clearStaleCaches(cachePath):
+	''' Remove any older caches of the same kind for the same file
+	Only caches with the same name, tag, and path digest are removed,
+	so caches of other files in a shared cache folder are left alone
+	'''
+	folder, name = os.path.split(cachePath)
+	stem, ext = name.rsplit('.', 1)
+	prefix = stem.rsplit('-', 1)[0] + '-'
+	ext = '.' + ext
+	for fn in os.listdir(folder):
+		if fn == name or not fn.startswith(prefix) or not fn.endswith(ext):
+			continue
+		stateDigest = fn[len(prefix):-len(ext)]
+		if not stateDigest or '.' in stateDigest or '-' in stateDigest:
+			# Not a finished cache, like a temp file
+			continue
+		try:
+			os.remove(os.path.join(folder, fn))
+		except OSError:
+			# Probably still mapped by some other process
+			pass
+
+def writeSampleCache(imesh, cachePath):
+	''' Decode every sample of a mesh into a float32 .npy file '''
+	meshSchema = imesh.getSchema()
+	posProp = meshSchema.getPositionsProperty()
+	numShapes = len(posProp.samples)
+	numVerts = len(posProp.samples[0])
+
+	# Write to a temp file and move it into place, so another
+	# process can never map a half-written cache
+	tmpPath = '{0}.{1}.tmp'.format(cachePath, os.getpid())
+	out = np.lib.format.open_memmap(tmpPath, mode='w+', dtype=np.float32, shape=(numShapes, numVerts, 3))
+	try:
+		for i, pts in enumerate(iterSampleArrays(imesh)):
+			out[i] = pts
+		out.flush()
+	finally:
+		del out
+	moveCacheIntoPlace(tmpPath, cachePath)
+
+def writeArrayCache(array, cachePath):
+	''' Write an in-memory array to a sidecar .npy cache '''
+	tmpPath = '{0}.{1}.tmp'.format(cachePath, os.getpid())
+	with open(tmpPath, 'wb') as f:
+		np.save(f, array)
+	moveCacheIntoPlace(tmpPath, cachePath)
+
+def moveCacheIntoPlace(tmpPath, cachePath):
+	''' Replace a cache with a fully written temp file '''
+	try:
+		if os.path.exists(cachePath):
+			os.remove(cachePath)
+		os.rename(tmpPath, cachePath)
+	except OSError:
+		if os.path.exists(tmpPath):
+			os.remove(tmpPath)
+		raise
+	clearStaleCaches(cachePath)
+
+def getCachedSampleArray(imesh, abcPath=None, write=True):
+	''' Get the point positions of every sample as a read-only memmap
+
+	The first load of a file decodes the samples into a sidecar .npy file.
+	Later loads map that file directly, and the pages can be shared between
+	processes. If the cache can't be written, this falls back to getSampleArray
+
+	If write is False, this only checks for an existing cache, and returns
+	None if there isn't one
+	'''
+	if np is None or os.environ.get(SMPX_CACHE_ENV) == '0':
+		return getSampleArray(imesh) if write else None
+
+	if abcPath is None:
+		abcPath = imesh.getArchive().getName()
+	cachePath = getSmpxCachePath(str(abcPath))
+
+	if os.path.isfile(cachePath):
+		try:
+			return np.load(cachePath, mmap_mode='r')
+		except (IOError, ValueError):
+			pass # A corrupt cache. Just try to rebuild it
+
+	if not write:
+		return None
+
+	try:
+		writeSampleCache(imesh, cachePath)
+		return np.load(cachePath, mmap_mode='r')
+	except (IOError, OSError):
+		return getSampleArray(imesh)
+
+def getSampleAt(imesh, index):
+	''' Get the point positions of a single sample '''
+	meshSchema = imesh.getSchema()
+	posProp = meshSchema.getPositionsProperty()
+	s = posProp.samples[index]
+	if arrayToNumpy is not None:
+		return np.array(arrayToNumpy(s))
+	elif np is not None:
+		return np.array(s)
+	return s
+
 def getStaticMeshData(imesh):
 	sch = imesh.getSchema()
 	faces = sch.getFaceIndicesProperty().samples[0]
 	counts = sch.getFaceCountsProperty().samples[0]
 	return faces, counts
 
+def getFaceArrays(imesh):
+	''' Get the topology of a mesh as flat numpy arrays
+	When imathnumpy is available, the index and count arrays are
+	views of the alembic buffers, so nothing is copied
+
+	Returns:
+		faceIdxs: The int32 vertex index of every face-vertex
+		faceCounts: The int32 number of vertices in every face
+		offsets: The (numFaces + 1,) start of every face in faceIdxs
+	'''
+	faces, counts = getStaticMeshData(imesh)
+	if arrayToNumpy is not None:
+		faceIdxs = np.asarray(arrayToNumpy(faces), dtype=np.int32)
+		faceCounts = np.asarray(arrayToNumpy(counts), dtype=np.int32)
+	else:
+		faceIdxs = np.array(faces, dtype=np.int32)
+		faceCounts = np.array(counts, dtype=np.int32)
+	offsets = np.zeros(len(faceCounts) + 1, dtype=np.int64)
+	np.cumsum(faceCounts, out=offsets[1:])
+	return faceIdxs, faceCounts, offsets
+
 def getUvSample(imesh):
 	imeshsch = imesh.getSchema()
 	uvParam = imeshsch.getUVsParam()
@@ -116,3 +282,76 @@ def getUvArray(imesh):
 		uv = None
 	return uv
 
+
+def writeSmpxSamples(schema, shapes, faces, counts, uvs=None, pBar=None, verbose=True):
+	''' Stream point positions into an OPolyMesh schema, one sample per shape
+
+	The shapes can be any iterable of (numVerts, 3) arrays, like a generator or
+	a memmapped stack, and only one is ever converted at a time. When
+	imathnumpy is available, a single V3fArray is allocated and re-used for
+	every sample. The topology and uvs are only written on the first sample,
+	and alembic carries them forward for the rest
+
+	Progress is printed when there's no progress bar, unless verbose is False.
+	Callers that report their own progress from the shapes iterable turn it off
+
+	Returns False if the progress bar was canceled
+	'''
+	try:
+		count = len(shapes)
+	except TypeError:
+		count = None
+
+	if pBar is not None:
+		from SimplexUI.Qt.QtWidgets import QApplication
+		if count is not None:
+			pBar.setMaximum(count)
+
+	i = -1
+	verts, memView = None, None
+	for i, pts in enumerate(shapes):
+		if pBar is not None:
+			pBar.setValue(i)
+			QApplication.processEvents()
+			if pBar.wasCanceled():
+				return False
+		elif verbose and i % 50 == 0:
+			print "Writing {0: 3d} of {1}\r".format(i, count if count is not None else '?'),
+
+		if isinstance(pts, V3fArray):
+			verts = pts
+		elif arrayToNumpy is None:
+			verts = mkSampleVertexPoints(pts)
+		else:
+			if memView is None or len(memView) != len(pts):
+				verts = V3fArray(len(pts))
+				memView = arrayToNumpy(verts)
+			np.copyto(memView, pts, casting='unsafe')
+
+		if i == 0:
+			if uvs is not None:
+				abcSample = OPolyMeshSchemaSample(verts, faces, counts, uvs)
+			else:
+				abcSample = OPolyMeshSchemaSample(verts, faces, counts)
+		else:
+			abcSample = OPolyMeshSchemaSample()
+			abcSample.setPositions(verts)
+		schema.set(abcSample)
+
+	if pBar is None and verbose:
+		print "Writing {0: 3d} of {0}".format(i + 1 if count is None else count)
+	return True
+
+def writeSmpx(oarch, name, jsString, faces, counts, shapes, uvs=None, pBar=None):
+	''' Write a simplex system into an open output archive
+	Keep the writer separate from oarch creation so garbage
+	collection *hopefully* works as expected
+	'''
+	par = OXform(oarch.getTop(), name)
+	props = par.getSchema().getUserProperties()
+	prop = OStringProperty(props, "simplex")
+	prop.setValue(str(jsString))
+	abcMesh = OPolyMesh(par, name)
+	schema = abcMesh.getSchema()
+	return writeSmpxSamples(schema, shapes, faces, counts, uvs=uvs, pBar=pBar)
+
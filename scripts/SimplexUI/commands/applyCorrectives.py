@@ -18,28 +18,86 @@ along with Simplex.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
 #pylint:disable=unused-variable
-import itertools, gc, os
+import itertools, gc, os, json, hashlib
 import numpy as np
 
-from alembic.Abc import IArchive, OArchive, OStringProperty
-from alembic.AbcGeom import IXform, IPolyMesh, OPolyMesh, OXform, OPolyMeshSchemaSample
-from SimplexUI.commands.alembicCommon import mkSampleVertexPoints, getSampleArray
+from alembic.Abc import IArchive, OArchive
+from alembic.AbcGeom import IXform, IPolyMesh
+from SimplexUI.commands.alembicCommon import getSampleArray, getCachedSampleArray, writeSmpx
+from SimplexUI.commands.alembicCommon import getSmpxCachePath, writeArrayCache, moveCacheIntoPlace, SMPX_CACHE_ENV
+from SimplexUI.commands.shapeMatrix import ShapeMatrix, buildShapeMatrix
+from SimplexUI.commands.referenceFile import References, isReferenceFile, loadReferences, writeReferences
 
 from SimplexUI.interfaceItems import Simplex, Combo, Slider
 from SimplexUI.Qt.QtWidgets import QApplication
 
-from pysimplex import PySimplex #pylint:disable=unused-import,wrong-import-position,import-error
+try:
+	from pysimplex import PySimplex #pylint:disable=unused-import,wrong-import-position,import-error
+except ImportError:
+	# Fall back to the numpy solver when the compiled plugin isn't available
+	from SimplexUI.commands.numpySolver import NumpySimplex as PySimplex
 
 def invertAll(matrixArray):
-	''' Invert all the square sub-matrices in a numpy array '''
-	# Look into numpy to see if there is a way to ignore
-	# all the repeated sanity checks, and do them ourselves, once
-	return np.array([np.linalg.inv(a) for a in matrixArray])
+	''' Invert all the square sub-matrices in a numpy array
+
+	The whole stack is inverted in one call, so the sanity checks only happen
+	once instead of once per matrix
+	'''
+	return np.linalg.inv(np.asarray(matrixArray))
+
+def invertReferences(references, refPath=None):
+	''' Invert the whole (numRefs, numVerts, N, N) reference block
+
+	The references can also be a References object from a reference file.
+	Then only the points that each reference actually stores get inverted,
+	and the result is another References object
+
+	If the path the references were loaded from is given, the inverses are
+	cached next to it. Re-running the correctives with the same reference
+	file will load that cache instead of inverting again
+	'''
+	isRefs = isinstance(references, References)
+	if not isRefs:
+		references = np.asarray(references)
+
+	cachePath = None
+	if refPath is not None and os.environ.get(SMPX_CACHE_ENV) != '0':
+		ext = 'smpxref' if isRefs else 'npy'
+		cachePath = getSmpxCachePath(str(refPath), tag='inv', ext=ext)
+		if os.path.isfile(cachePath):
+			try:
+				if isRefs:
+					inverses = loadReferences(cachePath)[2]
+				else:
+					inverses = np.load(cachePath, mmap_mode='r')
+			except (IOError, ValueError):
+				pass # A corrupt cache. Just rebuild it
+			else:
+				if inverses.shape == references.shape:
+					return inverses
+
+	if isRefs:
+		inverses = references.invert()
+	else:
+		inverses = invertAll(references)
+
+	if cachePath is not None:
+		try:
+			if isRefs:
+				tmpPath = '{0}.{1}.tmp'.format(cachePath, os.getpid())
+				writeReferences(tmpPath, [], [], inverses, dtype=np.float64)
+				moveCacheIntoPlace(tmpPath, cachePath)
+			else:
+				writeArrayCache(inverses, cachePath)
+		except (IOError, OSError):
+			pass # Not being able to cache isn't an error
+	return inverses
 
 def applyReference(pts, inv):
 	'''
 	Given a shape and an array of pre-inverted
 	per-point matrices return the deltas
+	pts can also be a stack of shapes that all use the same reference
 	'''
 	preSize = pts.shape[-1]
 	if inv.shape[-2] > pts.shape[-1]:
@@ -48,7 +106,7 @@ def applyReference(pts, inv):
 		pts = np.concatenate((pts, np.ones(oneShape)), axis=-1)
 
 	# Return the 3d points
-	return np.einsum('ij,ijk->ik', pts, inv)[..., :preSize]
+	return np.einsum('...ij,ijk->...ik', pts, inv)[..., :preSize]
 
 def loadJSString(iarch):
 	''' Get the json string out of a .smpx file '''
@@ -62,22 +120,15 @@ def loadJSString(iarch):
 	jsString = prop.getValue()
 	return jsString
 
-def loadSmpx(iarch):
-	''' Load the json and shape data from a .smpx file '''
+def loadSmpxMesh(iarch):
+	''' Get the alembic mesh out of a .smpx file '''
 	top = iarch.getTop()
 	par = top.children[0]
 	par = IXform(top, par.getName())
 
 	abcMesh = par.children[0]
 	abcMesh = IPolyMesh(par, abcMesh.getName())
-
-	meshSchema = abcMesh.getSchema()
-	posProp = meshSchema.getPositionsProperty()
-	shapes = getSampleArray(abcMesh)
-
-	print "Done Loading"
-
-	return shapes
+	return abcMesh
 
 def loadMesh(iarch):
 	''' Load the static mesh data from a .smpx file'''
@@ -94,54 +145,34 @@ def loadMesh(iarch):
 
 	return faces, counts
 
-def loadSimplex(shapePath):
-	''' Load and parse all the data from a simplex file '''
+def loadSimplex(shapePath, sparse=False):
+	''' Load and parse all the data from a simplex file
+
+	If sparse is True, the shapes are returned as a SparseShapeMatrix instead
+	of a dense array of deltas. If sparse is None, the storage is chosen by
+	how much of the mesh the shapes actually move
+	'''
 	if not os.path.isfile(str(shapePath)):
 		raise IOError("File does not exist: " + str(shapePath))
 	iarch = IArchive(str(shapePath))
 	print "Opening File:", iarch
 
 	jsString = loadJSString(iarch)
-	shapes = loadSmpx(iarch)
-	del iarch
-
 	simplex = Simplex.buildSystemFromJsonString(jsString, None, forceDummy=True)
 	solver = PySimplex(jsString)
 
 	# return as delta shapes
+	# Keep double precision here because the correctives get
+	# inverted and collapsed on top of these deltas
 	restIdx = simplex.shapes.index(simplex.restShape)
-	restPts = shapes[restIdx]
-	shapes = shapes - restPts[None, ...] # reshape for broadcasting
-
-	return jsString, simplex, solver, shapes, restPts
-
-def _writeSimplex(oarch, name, jsString, faces, counts, newShapes, pBar=None):
-	''' Separate the writer from oarch creation so garbage
-	collection *hopefully* works as expected
-	'''
-	par = OXform(oarch.getTop(), name)
-	props = par.getSchema().getUserProperties()
-	prop = OStringProperty(props, "simplex")
-	prop.setValue(str(jsString))
-	abcMesh = OPolyMesh(par, name)
-	schema = abcMesh.getSchema()
-
-	if pBar is not None:
-		pBar.setLabelText('Writing Corrected Simplex')
-		pBar.setMaximum(len(newShapes))
-
-	for i, newShape in enumerate(newShapes):
-		if pBar is not None:
-			pBar.setValue(i)
-			QApplication.processEvents()
-		else:
-			print "Writing {0: 3d} of {1}\r".format(i, len(newShapes)),
+	names = [s.name for s in simplex.shapes]
+	abcMesh = loadSmpxMesh(iarch)
+	matrix = buildShapeMatrix(names, getCachedSampleArray(abcMesh, shapePath), restIdx=restIdx, sparse=sparse, dtype=np.float64)
+	del abcMesh, iarch
+	print "Done Loading"
 
-		verts = mkSampleVertexPoints(newShape)
-		abcSample = OPolyMeshSchemaSample(verts, faces, counts)
-		schema.set(abcSample)
-	if pBar is None:
-		print "Writing {0: 3d} of {1}".format(len(newShapes), len(newShapes))
+	shapes = matrix.deltas if type(matrix) is ShapeMatrix else matrix
+	return jsString, simplex, solver, shapes, matrix.rest
 
 def writeSimplex(inPath, outPath, newShapes, name='Face', pBar=None):
 	''' Write a simplex file with new shapes '''
@@ -154,7 +185,9 @@ def writeSimplex(inPath, outPath, newShapes, name='Face', pBar=None):
 
 	oarch = OArchive(str(outPath)) # alembic does not like unicode filepaths
 	try:
-		_writeSimplex(oarch, name, jsString, faces, counts, newShapes, pBar)
+		if pBar is not None:
+			pBar.setLabelText('Writing Corrected Simplex')
+		writeSmpx(oarch, name, jsString, faces, counts, newShapes, pBar=pBar)
 	finally:
 		del oarch
 		gc.collect()
@@ -191,14 +224,25 @@ def _buildSolverInputs(simplex, item, value, indexBySlider):
 	else:
 		raise ValueError("Not a slider or combo. Got type {0}: {1}".format(type(item), item))
 
-def buildFullShapes(simplex, shapeObjs, shapes, solver, restPts, pBar=None):
+def solveBatch(solver, inputs, numShapes):
 	'''
-	Given shape inputs, build the full output shape from the deltas
-	We use shapes here because a shape implies both the progression
-	and the value of the inputs (with a little figuring)
+	Solve an (N, numSliders) input matrix in one call, and return the
+	(N, numShapes) outputs. Solvers without a batch method solve row by row
+	'''
+	inputs = np.ascontiguousarray(inputs, dtype=np.float64)
+	output = np.zeros((len(inputs), numShapes))
+	if hasattr(solver, 'solveBatchBuffer'):
+		solver.solveBatchBuffer(inputs, output)
+	else:
+		for i, inVec in enumerate(inputs):
+			output[i] = solver.solve(inVec.tolist())
+	return output
+
+def buildSolveVectors(simplex, shapeObjs, solver):
+	'''
+	Get the (numTargets, numShapes) solver outputs that would
+	turn on each of the given shapes
 	'''
-	###########################################
-	# Manipulate all the input lists and caches
 	indexBySlider = {s: i for i, s in enumerate(simplex.sliders)}
 	indexByShape = {s: i for i, s in enumerate(simplex.shapes)}
 	floaters = set(simplex.getFloatingShapes())
@@ -210,46 +254,98 @@ def buildFullShapes(simplex, shapeObjs, shapes, solver, restPts, pBar=None):
 			if not pair.shape.isRest:
 				shapeDict[pair.shape] = (item, pair.value)
 
-	######################
-	# Actually do the work
-	vecByShape = {} # store this for later use
-	ptsByShape = {}
+	# Build every input vector up front, and solve them all at once
+	inputs = np.zeros((len(shapeObjs), len(simplex.sliders)))
+	for i, shape in enumerate(shapeObjs):
+		item, value = shapeDict[shape]
+		inputs[i] = _buildSolverInputs(simplex, item, value, indexBySlider)
+	outVecs = solveBatch(solver, inputs, len(simplex.shapes))
+
+	# Only the floating shapes get to keep their floater values
+	isFloater = np.array([s in floaters for s in shapeObjs], dtype=bool)
+	if floatIdxs and not isFloater.all():
+		outVecs[np.ix_(~isFloater, sorted(floatIdxs))] = 0.0
+	outVecs[np.isclose(outVecs, 0)] = 0
+	outVecs[np.isclose(outVecs, 1)] = 1
+	return outVecs
+
+def evaluateFullShapes(shapes, outVecs, restPts):
+	'''
+	Get the full (numTargets, numVerts, 3) points for a set of solver outputs
+	This is one (numTargets x numShapes) by (numShapes x numVerts*3) multiply
+	'''
+	if isinstance(shapes, ShapeMatrix):
+		allPts = shapes.evaluateDeltasBatch(outVecs)
+	else:
+		flatShapes = shapes.reshape((len(shapes), -1))
+		allPts = np.dot(outVecs, flatShapes).reshape((len(outVecs), -1, 3))
+	allPts += restPts[None, ...]
+	return allPts
 
+def buildFullShapes(simplex, shapeObjs, shapes, solver, restPts, pBar=None):
+	'''
+	Given shape inputs, build the full output shape from the deltas
+	We use shapes here because a shape implies both the progression
+	and the value of the inputs (with a little figuring)
+	'''
 	if pBar is not None:
 		pBar.setMaximum(len(shapeObjs))
 		pBar.setValue(0)
 		QApplication.processEvents()
+	else:
+		print "Solving {0} shapes".format(len(shapeObjs))
 
-	flatShapes = shapes.reshape((len(shapes), -1))
-	for i, shape in enumerate(shapeObjs):
-		if pBar is not None:
-			pBar.setValue(i)
-			QApplication.processEvents()
-		else:
-			print "Building {0} of {1}\r".format(i+1, len(shapeObjs)),
+	outVecs = buildSolveVectors(simplex, shapeObjs, solver)
 
-		item, value = shapeDict[shape]
-		inVec = _buildSolverInputs(simplex, item, value, indexBySlider)
-		outVec = solver.solve(inVec)
-		if shape not in floaters:
-			for fi in floatIdxs:
-				outVec[fi] = 0.0
-		outVec = np.array(outVec)
-		outVec[np.where(np.isclose(outVec, 0))] = 0
-		outVec[np.where(np.isclose(outVec, 1))] = 1
-		vecByShape[shape] = outVec
-		pts = np.dot(outVec, flatShapes)
-		pts = pts.reshape((-1, 3))
-		ptsByShape[shape] = pts + restPts
-	if pBar is None:
-		print
+	if pBar is not None:
+		pBar.setValue(len(shapeObjs))
+		QApplication.processEvents()
+	else:
+		print "Building {0} shapes".format(len(shapeObjs))
 
+	allPts = evaluateFullShapes(shapes, outVecs, restPts)
+
+	# store the vectors for later use
+	vecByShape = dict(zip(shapeObjs, outVecs))
+	ptsByShape = dict(zip(shapeObjs, allPts))
 	return ptsByShape, vecByShape
 
-def collapseFullShapes(simplex, allPts, ptsByShape, vecByShape, pBar=None):
+def buildCollapseLevels(rows, vecByRow):
+	'''
+	Group the combo shape rows into levels that can be collapsed together
+
+	The rows are given in the order they would be collapsed one at a time.
+	A row has to go in a later level than any earlier row its solve vector
+	reads from. And a row that an earlier row reads from can't go in an
+	earlier level than that reader, otherwise the reader would see the new
+	value instead of the old one. Every level reads all its rows before
+	writing any of them, so the result matches the one-at-a-time order
+	'''
+	levelByRow = {}
+	readerLevel = {}
+	levels = []
+	for row in rows:
+		reads = np.flatnonzero(vecByRow[row]).tolist()
+		lvl = readerLevel.get(row, 0)
+		for r in reads:
+			if r in levelByRow:
+				lvl = max(lvl, levelByRow[r] + 1)
+		for r in reads:
+			if r not in levelByRow:
+				readerLevel[r] = max(readerLevel.get(r, 0), lvl)
+		levelByRow[row] = lvl
+		while len(levels) <= lvl:
+			levels.append([])
+		levels[lvl].append(row)
+	return levels
+
+def collapseFullShapes(simplex, allPts, ptsByShape, vecByShape, pBar=None, finalByShape=None):
 	'''
 	Given a set of shapes that are full-on shapes (not just deltas)
 	Collapse them back into deltas in the simplex shape list
+
+	finalByShape can hold shapes whose collapsed deltas are already known.
+	They aren't rebuilt, but they still need their solve vectors
 	'''
 	#######################
 	# Manipulate all the input lists and caches
@@ -257,7 +353,12 @@ def collapseFullShapes(simplex, allPts, ptsByShape, vecByShape, pBar=None):
 	indexByShape = {s: i for i, s in enumerate(simplex.shapes)}
 	floaters = set(simplex.getFloatingShapes())
 	#floatIdxs = set([indexByShape[s] for s in floaters])
-	newPts = np.copy(allPts)
+	if isinstance(allPts, ShapeMatrix):
+		newPts = allPts.toDeltas()
+	else:
+		newPts = np.copy(allPts)
+	if finalByShape is None:
+		finalByShape = {}
 
 	# Order the combos by depth, and split out the floaters
 	allDFirst = sorted(simplex.combos[:], key=lambda x: len(x.pairs))
@@ -272,13 +373,17 @@ def collapseFullShapes(simplex, allPts, ptsByShape, vecByShape, pBar=None):
 			if pair.shape in ptsByShape:
 				idx = indexByShape[pair.shape]
 				newPts[idx] = ptsByShape[pair.shape]
+			elif pair.shape in finalByShape:
+				idx = indexByShape[pair.shape]
+				newPts[idx] = finalByShape[pair.shape]
 
-	# Get the max number of iterations
-	mxcount = 0
+	# Get the combo shapes in the order they would be collapsed one at a time
+	order = []
 	for c in itertools.chain(dFirst, dFloat):
 		for pair in c.prog.pairs:
-			if pair.shape in ptsByShape:
-				mxcount += 1
+			if pair.shape in ptsByShape or pair.shape in finalByShape:
+				order.append(pair.shape)
+	mxcount = len(order)
 
 	if pBar is not None:
 		pBar.setValue(0)
@@ -286,59 +391,87 @@ def collapseFullShapes(simplex, allPts, ptsByShape, vecByShape, pBar=None):
 		pBar.setLabelText("Building Corrected Deltas")
 		QApplication.processEvents()
 
-	# Then go through all the combos in order
+	# Turn off the influence of the current shape
+	vecByRow = {}
+	for shape in order:
+		idx = indexByShape[shape]
+		outVec = np.array(vecByShape[shape], dtype=float)
+		outVec[idx] = 0.0
+		vecByRow[idx] = outVec
+	rows = [indexByShape[shape] for shape in order]
+	levels = buildCollapseLevels(rows, vecByRow)
+
+	# Keep one flat view of the stack, and only read the rows each level uses
+	flatPts = newPts.reshape((len(newPts), -1))
 	vcount = 0
-	for c in itertools.chain(dFirst, dFloat):
-
-		for pair in c.prog.pairs:
-			if pair.shape in ptsByShape:
-				if pBar is not None:
-					pBar.setValue(vcount)
-					QApplication.processEvents()
-				else:
-					print "Collapsing {0} of {1}\r".format(vcount + 1, mxcount),
-				vcount += 1
-
-				idx = indexByShape[pair.shape]
-				outVec = vecByShape[pair.shape]
-				outVec[idx] = 0.0 # turn off the influence of the current shape
-				comboBase = np.dot(outVec, newPts.transpose((1, 0, 2)))
-				comboSculpt = ptsByShape[pair.shape]
-				newPts[idx] = comboSculpt - comboBase
+	for level in levels:
+		if pBar is not None:
+			pBar.setValue(vcount)
+			QApplication.processEvents()
+		else:
+			print "Collapsing {0} of {1}\r".format(vcount + 1, mxcount),
+		vcount += len(level)
+
+		build = [row for row in level if simplex.shapes[row] in ptsByShape]
+		known = [row for row in level if simplex.shapes[row] not in ptsByShape]
+		if build:
+			vecs = np.array([vecByRow[row] for row in build])
+			cols = np.flatnonzero(np.any(vecs, axis=0))
+			comboBase = np.dot(vecs[:, cols], flatPts[cols])
+			comboSculpt = np.array([ptsByShape[simplex.shapes[row]] for row in build])
+			flatPts[build] = comboSculpt.reshape((len(build), -1)) - comboBase
+		if known:
+			# Write the known shapes at their level, so anything that reads
+			# them sees the same value it would in a full collapse
+			final = np.array([finalByShape[simplex.shapes[row]] for row in known])
+			flatPts[known] = final.reshape((len(known), -1))
 	if pBar is None:
 		print
 
 	return newPts
 
-def applyCorrectives(simplex, allShapePts, restPts, solver, shapes, refIdxs, references, pBar=None):
+def correctShapes(shapes, refIdxs, inverses, ptsByShape):
+	''' Apply the inverted references to the full shapes '''
+	# Apply each reference to all of its shapes at once
+	shapesByRef = {}
+	for shape, refIdx in zip(shapes, refIdxs):
+		shapesByRef.setdefault(refIdx, []).append(shape)
+
+	newPtsByShape = {}
+	for refIdx, refShapes in sorted(shapesByRef.iteritems()):
+		pts = np.stack([ptsByShape[shape] for shape in refShapes])
+		if isinstance(inverses, References):
+			# Only the points this reference moves need the full multiply
+			newPts = inverses.applyTo(refIdx, pts)
+		else:
+			newPts = applyReference(pts, inverses[refIdx])
+		for shape, sPts in zip(refShapes, newPts):
+			newPtsByShape[shape] = sPts
+	return newPtsByShape
+
+def applyCorrectives(simplex, allShapePts, restPts, solver, shapes, refIdxs, references, pBar=None, refPath=None):
 	'''
 	Loop over the shapes and references, apply them, and return a new np.array
 	of shape points
 
 	simplex: Simplex system
-	allShapePts: deltas per shape
+	allShapePts: deltas per shape, or a ShapeMatrix of them
 	restPts: The rest point positions
 	solver: The Python Simplex solver object
 	shapes: The simplex shape objects we care about
 	refIdxs: The reference index per shape
 	references: A list of matrix-per-points
+	refPath: The file the references were read from. Used to cache the inverses
 	'''
 	# The rule of thumb is "THE SHAPE IS ALWAYS A DELTA"
 
 	if pBar is not None:
 		pBar.setLabelText("Inverting References")
-		pBar.setValue(0)
-		pBar.setMaximum(len(references))
 		QApplication.processEvents()
 	else:
 		print "Inverting References"
 
-	inverses = []
-	for i, r in enumerate(references):
-		if pBar is not None:
-			pBar.setValue(i)
-			QApplication.processEvents()
-		inverses.append(invertAll(r))
+	inverses = invertReferences(references, refPath)
 
 	if pBar is not None:
 		pBar.setLabelText("Extracting Uncorrected Shapes")
@@ -352,46 +485,237 @@ def applyCorrectives(simplex, allShapePts, restPts, solver, shapes, refIdxs, ref
 		QApplication.processEvents()
 	else:
 		print "Correcting"
-	newPtsByShape = {}
-	for shape, refIdx in zip(shapes, refIdxs):
-		inv = inverses[refIdx]
-		pts = ptsByShape[shape]
-		newPts = applyReference(pts, inv)
-		newPtsByShape[shape] = newPts
+	newPtsByShape = correctShapes(shapes, refIdxs, inverses, ptsByShape)
 
 	newShapePts = collapseFullShapes(simplex, allShapePts, newPtsByShape, vecByShape, pBar)
 	newShapePts = newShapePts + restPts[None, ...]
 
 	return newShapePts
 
-def readAndApplyCorrectives(inPath, namePath, refPath, outPath, pBar=None):
+#########################################################################
+####                     Incremental Correctives                     ####
+#########################################################################
+
+# Bump this if anything changes how the corrective input hashes are built
+CORRECTIVE_STATE_VERSION = 1
+
+def getCorrectiveStatePath(outPath):
+	''' Get the path of the file that stores the corrective input hashes for an output '''
+	folder, name = os.path.split(os.path.abspath(outPath))
+	return os.path.join(folder, '.{0}.correctives.json'.format(name))
+
+def _hashArray(arr):
+	return hashlib.sha1(np.ascontiguousarray(arr, dtype=np.float64).tobytes()).hexdigest()
+
+def _fileStamp(path):
+	st = os.stat(path)
+	return [repr(st.st_mtime), st.st_size]
+
+def hashCorrectiveInputs(simplex, allShapePts, shapes, refIdxs, references, outVecs):
+	'''
+	Get a hash per corrected shape of everything it is built from: the solver
+	vector, the reference, and the input delta of every shape the vector reads
+	'''
+	if isinstance(allShapePts, ShapeMatrix):
+		getDelta = lambda i: allShapePts.getDelta(simplex.shapes[i].name)
+	else:
+		getDelta = lambda i: allShapePts[i]
+
+	deltaHashes = {}
+	refHashes = {}
+	hashes = {}
+	for shape, refIdx, outVec in zip(shapes, refIdxs, outVecs):
+		if refIdx not in refHashes:
+			refHashes[refIdx] = _hashArray(references[refIdx])
+		h = hashlib.sha1(np.ascontiguousarray(outVec, dtype=np.float64).tobytes())
+		h.update('{0}:{1}'.format(refIdx, refHashes[refIdx]))
+		for col in np.flatnonzero(outVec).tolist():
+			if col not in deltaHashes:
+				deltaHashes[col] = _hashArray(getDelta(col))
+			h.update(deltaHashes[col])
+		hashes[shape.name] = h.hexdigest()
+	return hashes
+
+def getDirtyShapes(simplex, shapes, outVecs, hashes, oldHashes):
+	'''
+	Get the corrected shapes that have to be rebuilt. That's any shape whose
+	inputs changed, and any combo shape whose collapse reads from one of those
+	'''
+	indexByShape = {s: i for i, s in enumerate(simplex.shapes)}
+	shapeByRow = {indexByShape[s]: s for s in shapes}
+	sliderShapes = set(p.shape for sl in simplex.sliders for p in sl.prog.pairs)
+
+	dirty = set(s for s in shapes if oldHashes.get(s.name) != hashes[s.name])
+
+	# Slider shapes aren't built from the other corrected shapes
+	readsByShape = {}
+	for shape, outVec in zip(shapes, outVecs):
+		if shape in sliderShapes:
+			continue
+		idx = indexByShape[shape]
+		reads = [shapeByRow[r] for r in np.flatnonzero(outVec).tolist() if r != idx and r in shapeByRow]
+		if reads:
+			readsByShape[shape] = reads
+
+	changed = True
+	while changed:
+		changed = False
+		for shape, reads in readsByShape.iteritems():
+			if shape not in dirty and any(r in dirty for r in reads):
+				dirty.add(shape)
+				changed = True
+	return dirty
+
+def applyCorrectivesIncremental(simplex, allShapePts, restPts, solver, shapes, refIdxs, references, oldHashes, oldShapePts, pBar=None, refPath=None):
+	'''
+	Apply the correctives, but only rebuild the shapes whose inputs changed
+	since the last run. Everything else is taken from the previous output
+
+	oldHashes: The per-shape input hashes from the previous run
+	oldShapePts: The full point positions of every shape in the previous output
+
+	Returns the new shape points, and the new per-shape input hashes
+	'''
+	if pBar is not None:
+		pBar.setLabelText("Checking For Changes")
+		QApplication.processEvents()
+	else:
+		print "Checking For Changes"
+
+	outVecs = buildSolveVectors(simplex, shapes, solver)
+	hashes = hashCorrectiveInputs(simplex, allShapePts, shapes, refIdxs, references, outVecs)
+	dirty = getDirtyShapes(simplex, shapes, outVecs, hashes, oldHashes)
+	if pBar is not None:
+		pBar.setLabelText("Rebuilding {0} of {1} shapes".format(len(dirty), len(shapes)))
+		QApplication.processEvents()
+	else:
+		print "Rebuilding {0} of {1} shapes".format(len(dirty), len(shapes))
+
+	isDirty = np.array([s in dirty for s in shapes], dtype=bool)
+	dShapes = [s for s in shapes if s in dirty]
+	dRefIdxs = [r for s, r in zip(shapes, refIdxs) if s in dirty]
+
+	newPtsByShape = {}
+	if dShapes:
+		if pBar is not None:
+			pBar.setLabelText("Inverting References")
+			QApplication.processEvents()
+		inverses = invertReferences(references, refPath)
+
+		if pBar is not None:
+			pBar.setLabelText("Correcting")
+			QApplication.processEvents()
+		allPts = evaluateFullShapes(allShapePts, outVecs[isDirty], restPts)
+		ptsByShape = dict(zip(dShapes, allPts))
+		newPtsByShape = correctShapes(dShapes, dRefIdxs, inverses, ptsByShape)
+
+	indexByShape = {s: i for i, s in enumerate(simplex.shapes)}
+	finalByShape = {}
+	for shape in shapes:
+		if shape not in dirty:
+			finalByShape[shape] = oldShapePts[indexByShape[shape]] - restPts
+
+	vecByShape = dict(zip(shapes, outVecs))
+	newShapePts = collapseFullShapes(simplex, allShapePts, newPtsByShape, vecByShape, pBar, finalByShape=finalByShape)
+	newShapePts = newShapePts + restPts[None, ...]
+	return newShapePts, hashes
+
+def loadCorrectiveState(outPath, jsString, restPts):
+	'''
+	Load the input hashes and the shapes of a previous corrective run
+	Returns (None, None) if there's nothing that can be reused
+	'''
+	statePath = getCorrectiveStatePath(outPath)
+	if not os.path.isfile(statePath) or not os.path.isfile(str(outPath)):
+		return None, None
+	try:
+		with open(statePath, 'r') as f:
+			state = json.load(f)
+	except (IOError, ValueError):
+		return None, None
+
+	# Anything that touches every shape means a full rebuild
+	if state.get('version') != CORRECTIVE_STATE_VERSION:
+		return None, None
+	if state.get('definition') != hashlib.sha1(jsString).hexdigest():
+		return None, None
+	if state.get('rest') != _hashArray(restPts):
+		return None, None
+	if state.get('output') != _fileStamp(str(outPath)):
+		# The output was changed by something else
+		return None, None
+
+	iarch = IArchive(str(outPath))
+	try:
+		oldShapePts = getSampleArray(loadSmpxMesh(iarch))
+	finally:
+		del iarch
+	return state['shapes'], oldShapePts
+
+def saveCorrectiveState(outPath, jsString, restPts, hashes):
+	''' Store the input hashes of a corrective run next to its output '''
+	state = {
+		'version': CORRECTIVE_STATE_VERSION,
+		'definition': hashlib.sha1(jsString).hexdigest(),
+		'rest': _hashArray(restPts),
+		'output': _fileStamp(str(outPath)),
+		'shapes': hashes,
+	}
+	with open(getCorrectiveStatePath(outPath), 'w') as f:
+		json.dump(state, f)
+
+def readAndApplyCorrectives(inPath, namePath, refPath, outPath, pBar=None, sparse=False, incremental=False):
 	'''
 	Read the provided files, apply the correctives, then output a new file
 
 	Arguments:
 		inPath: The input .smpx file
 		namePath: A file correlating the shape names, and the reference
-			indices. Separated by ; with one entry per line
+			indices. Separated by ; with one entry per line. This is ignored
+			if the refPath is a reference file, because those store the names
 		refPath: The reference matrices per point of deformation.
-			Created by npArray.dump(refPath)
+			Either a reference file written by referenceFile.writeReferences
+			or a legacy file created by npArray.dump(refPath)
 		outPath: The output .smpx filepath
+		sparse: Whether to load the shapes as sparse deltas. None picks automatically.
+			Defaults to dense, like it was before sparse storage existed
+		incremental: Keep the input hashes of this run next to the output, and on
+			later runs only rebuild the shapes whose inputs changed
 	'''
 
 	if pBar is not None:
 		pBar.setLabelText("Reading reference data")
 		QApplication.processEvents()
 
-	jsString, simplex, solver, allShapePts, restPts = loadSimplex(inPath)
-	with open(namePath, 'r') as f:
-		nr = f.read()
-	nr = [i.split(';') for i in nr.split('\n') if i]
-	names, refIdxs = zip(*nr)
-	refIdxs = map(int, refIdxs)
-	refs = np.load(refPath)
+	jsString, simplex, solver, allShapePts, restPts = loadSimplex(inPath, sparse=sparse)
+	if isReferenceFile(refPath):
+		# The names are stored in the reference file
+		names, refIdxs, refs = loadReferences(refPath)
+	else:
+		with open(namePath, 'r') as f:
+			nr = f.read()
+		nr = [i.split(';') for i in nr.split('\n') if i]
+		names, refIdxs = zip(*nr)
+		refIdxs = map(int, refIdxs)
+		refs = np.load(refPath)
 	shapeByName = {i.name: i for i in simplex.shapes}
 	shapes = [shapeByName[n] for n in names]
-	newPts = applyCorrectives(simplex, allShapePts, restPts, solver, shapes, refIdxs, refs, pBar)
+	if not incremental:
+		newPts = applyCorrectives(simplex, allShapePts, restPts, solver, shapes, refIdxs, refs, pBar, refPath=refPath)
+		writeSimplex(inPath, outPath, newPts, pBar=pBar)
+		print "DONE"
+		return
+
+	oldHashes, oldShapePts = loadCorrectiveState(outPath, jsString, restPts)
+	if oldShapePts is None:
+		oldHashes = {}
+	newPts, hashes = applyCorrectivesIncremental(simplex, allShapePts, restPts, solver, shapes, refIdxs, refs,
+		oldHashes, oldShapePts, pBar, refPath=refPath)
+
+	# Alembic can't update samples in place, so every sample gets streamed
+	# back out. Only the rebuilt ones were actually computed though
 	writeSimplex(inPath, outPath, newPts, pBar=pBar)
+	saveCorrectiveState(outPath, jsString, restPts, hashes)
 	print "DONE"
 
 
@@ -19,6 +19,7 @@ along with Simplex.  If not, see <http://www.gnu.org/licenses/>.
 
 import blurdev
 from applyCorrectives import loadJSString
+from referenceFile import writeReferences, compressReference, sparsifyReference, References
 from alembic.Abc import IArchive
 from SimplexUI.Qt.QtWidgets import QApplication
 import numpy as np
@@ -98,6 +99,11 @@ def buildCorrectiveReferences(mesh, simplex, poses, sliders, pBar=None):
 	refCache = {}
 	refs, shapes, refIdxs = [], [], []
 
+	# Most points don't move for any given pose, so only
+	# keep the points that are different from the rest
+	rest = getDeformReference(mesh)
+	restBlock = compressReference(rest)
+
 	# get the slider outputs
 	if pBar is not None:
 		pBar.setLabelText("Building Shape References")
@@ -126,7 +132,7 @@ def buildCorrectiveReferences(mesh, simplex, poses, sliders, pBar=None):
 					ref = getRefForPoses(mesh, [pose], p.value)
 					refIdxs.append(len(refs))
 					refCache[cacheKey] = len(refs)
-					refs.append(ref)
+					refs.append(sparsifyReference(ref, restBlock))
 				shapes.append(p.shape)
 
 	# Get the combo outputs
@@ -158,18 +164,22 @@ def buildCorrectiveReferences(mesh, simplex, poses, sliders, pBar=None):
 					ref = getRefForPoses(mesh, poses, p.value)
 					refIdxs.append(len(refs))
 					refCache[cacheKey] = len(refs)
-					refs.append(ref)
+					refs.append(sparsifyReference(ref, restBlock))
 				shapes.append(p.shape)
 
-	return np.array(refs), shapes, refIdxs
+	idxs = [r[0] for r in refs]
+	blocks = [r[1] for r in refs]
+	refs = References(len(rest), blocks, idxs, restBlock)
+	return refs, shapes, refIdxs
 
 def outputCorrectiveReferences(outNames, outRefs, simplex, mesh, poses, sliders, pBar=None):
 	'''
 	Output the proper files for an external corrective application
 
 	Arguments:
-		outNames: The filepath for the output shape and reference indices
-		outRefs: The filepath for the deformation references
+		outNames: The filepath for the output shape and reference indices.
+			The reference file stores these too, so this can be None
+		outRefs: The filepath for the reference file
 		simplex: A simplex system
 		mesh: The mesh object to deform
 		poses: Lists of parameter/value pairs. Each list corresponds to a slider
@@ -180,13 +190,14 @@ def outputCorrectiveReferences(outNames, outRefs, simplex, mesh, poses, sliders,
 	if pBar is not None:
 		pBar.setLabelText('Writing Names')
 		QApplication.processEvents()
-	nameWrite = ['{};{}'.format(s.name, r) for s, r, in zip(shapes, refIdxs)]
-	with open(outNames, 'w') as f:
-		f.write('\n'.join(nameWrite))
+	if outNames is not None:
+		nameWrite = ['{};{}'.format(s.name, r) for s, r, in zip(shapes, refIdxs)]
+		with open(outNames, 'w') as f:
+			f.write('\n'.join(nameWrite))
 
 	if pBar is not None:
 		pBar.setLabelText('Writing References')
 		QApplication.processEvents()
-	refs.dump(outRefs)
+	writeReferences(outRefs, [s.name for s in shapes], refIdxs, refs)
 
 
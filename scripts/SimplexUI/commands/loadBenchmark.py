@@ -0,0 +1,134 @@
+'''
+Copyright 2016, Blur Studio
+
+This file is part of Simplex.
+
+Simplex is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Simplex is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Simplex.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+""" Time how long it takes to load a simplex system headless
+
+The load is split into reading the definition off disk, and building the
+object graph from it. Everything is built on the dummy DCC, so the numbers
+only cover the python side of loading. Without a path, a FACS-like
+system is generated in memory instead
+"""
+import os, sys, json, time, random
+
+from SimplexUI.interfaceItems import Simplex
+
+def buildBenchmarkDefinition(numSliders=500, numCombos=4000, numTraversals=50, seed=0):
+	''' Build a version 2 definition for a large FACS-like system
+	Every slider has a positive and negative shape, and every combo
+	and traversal has a single shape
+	'''
+	rand = random.Random(seed)
+	shapes = [{"name": "Rest", "color": [0, 0, 0]}]
+	progs = []
+
+	def buildProg(name, values):
+		pairs = [[0, 0.0]]
+		for i, v in enumerate(values):
+			shapes.append({"name": "{0}_{1}".format(name, i), "color": [128, 128, 128]})
+			pairs.append([len(shapes) - 1, v])
+		progs.append({"name": name, "pairs": pairs, "interp": "spline", "falloffs": []})
+		return len(progs) - 1
+
+	sliders = []
+	for i in range(numSliders):
+		name = "Slider{0}".format(i)
+		sliders.append({"name": name, "prog": buildProg(name, [1.0, -1.0]), "group": 0, "color": [128, 128, 128], "enabled": True})
+
+	combos = []
+	for i in range(numCombos):
+		name = "Combo{0}".format(i)
+		pairs = [[s, 1.0] for s in rand.sample(range(numSliders), rand.randint(2, 3))]
+		combos.append({
+			"name": name, "prog": buildProg(name, [1.0]), "pairs": pairs, "group": 1,
+			"solveType": "min", "color": [128, 128, 128], "enabled": True,
+		})
+
+	travs = []
+	for i in range(min(numTraversals, numSliders - 1)):
+		name = "Traversal{0}".format(i)
+		travs.append({
+			"name": name, "prog": buildProg(name, [1.0]), "group": 2, "color": [128, 128, 128], "enabled": True,
+			"progressType": "Slider", "progressControl": i, "progressFlip": False,
+			"multiplierType": "Slider", "multiplierControl": i + 1, "multiplierFlip": False,
+		})
+
+	return {
+		"encodingVersion": 2,
+		"systemName": "Benchmark",
+		"clusterName": "Shape",
+		"falloffs": [],
+		"groups": [
+			{"name": "Group_0", "type": "Slider", "color": [128, 128, 128]},
+			{"name": "Group_1", "type": "Combo", "color": [128, 128, 128]},
+			{"name": "Group_2", "type": "Traversal", "color": [128, 128, 128]},
+		],
+		"shapes": shapes,
+		"progressions": progs,
+		"sliders": sliders,
+		"combos": combos,
+		"traversals": travs,
+	}
+
+def readDefinition(path):
+	''' Read the definition out of a .json or .smpx file '''
+	if os.path.splitext(path)[1].lower() == '.smpx':
+		iarch, abcMesh, js = Simplex.getAbcDataFromPath(path)
+		del iarch, abcMesh # release the files
+		return js
+	with open(path, 'r') as f:
+		return json.load(f)
+
+def benchmarkLoad(path=None, repeats=3):
+	''' Time loading a simplex system
+
+	Args:
+		path: A .json or .smpx file. If None, a definition
+			from buildBenchmarkDefinition is used
+		repeats: The number of times to build the system. The fastest one is kept
+
+	Returns:
+		dict: The number of shapes, and the seconds spent reading and building
+	'''
+	start = time.time()
+	if path is None:
+		jsString = json.dumps(buildBenchmarkDefinition())
+		start = time.time()
+		simpDict = json.loads(jsString)
+	else:
+		simpDict = readDefinition(path)
+	readTime = time.time() - start
+
+	buildTime = None
+	for _ in range(repeats):
+		# Loading can change the definition, so give it a fresh copy every time
+		jsDict = json.loads(json.dumps(simpDict))
+		start = time.time()
+		Simplex.buildSystemFromDict(jsDict, None, forceDummy=True)
+		elapsed = time.time() - start
+		buildTime = elapsed if buildTime is None else min(buildTime, elapsed)
+
+	return {"shapes": len(simpDict["shapes"]), "read": readTime, "build": buildTime}
+
+if __name__ == "__main__":
+	_path = sys.argv[1] if len(sys.argv) > 1 else None
+	_result = benchmarkLoad(_path)
+	print "Loaded {0} shapes".format(_result["shapes"])
+	print "Read:  {0:.3f}s".format(_result["read"])
+	print "Build: {0:.3f}s".format(_result["build"])
+
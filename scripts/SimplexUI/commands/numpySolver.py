@@ -0,0 +1,692 @@
+'''
+Copyright 2016, Blur Studio
+
+This file is part of Simplex.
+
+Simplex is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Simplex is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Simplex.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+""" A pure numpy port of the c++ simplex solver
+
+This mirrors the PySimplex interface (definition, exactSolve, solve, solveBuffer,
+solveBatchBuffer) so it can be dropped in wherever the compiled plugin isn't
+available. It also has a solveBatch method that takes an (N, numSliders) array
+of inputs and returns an (N, numShapes) array of outputs in a single call.
+
+The logic follows SimplexCPP/src/lib/simplex.cpp and trispace.cpp as closely
+as possible, including the quirks, so the results match the compiled solver.
+"""
+import json
+import numpy as np
+
+EPS = 1e-6
+MAXVAL = 1.0 # max clamping value
+
+LINEAR, SPLINE, SPLITSPLINE = range(3)
+MIN, ALLMUL, EXTMUL, MULAVGALL, MULAVGEXT, NONE = range(6)
+
+SOLVE_TYPES = {
+	'min': MIN,
+	'allMul': ALLMUL,
+	'extMul': EXTMUL,
+	'mulAvgExt': MULAVGEXT,
+	'mulAvgAll': MULAVGALL,
+	'None': NONE,
+}
+
+
+def isZero(a):
+	return np.abs(a) <= EPS
+
+def isPositive(a):
+	return a > -EPS
+
+def softMin(X, Y):
+	''' The soft-min of two arrays of values '''
+	zero = isZero(X) | isZero(Y)
+	X, Y = np.maximum(X, Y), np.minimum(X, Y)
+
+	h = 0.025
+	p = 2.0
+	q = 1.0 / p
+
+	d = 2.0 * ((1.0 + h)**q - h**q)
+	s = h**q
+	z = (X**p + h)**q + (Y**p + h)**q - ((X - Y)**p + h)**q
+	return np.where(zero, 0.0, (z - s) / d)
+
+def getInterval(tVals, times):
+	''' Get the index of the start of the segment each tVal falls in '''
+	if len(times) <= 1:
+		return np.zeros(len(tVals), dtype=int)
+	idx = np.searchsorted(times, tVals, side='right') - 1
+	return np.clip(idx, 0, len(times) - 2)
+
+def barycentric(corners, points):
+	''' Get the barycentric coordinates of multiple points in a single simplex
+
+	Arguments:
+		corners: A (k+1, k) array of simplex corners
+		points: An (N, k) array of points
+
+	Returns:
+		An (N, k+1) array of barycentric coordinates
+	'''
+	corners = np.asarray(corners, dtype=float)
+	points = np.asarray(points, dtype=float)
+	last = corners[-1]
+	mat = (corners[:-1] - last).T
+	# pinv gives the same answer as the c++ QR solve for
+	# any non-degenerate simplex, and doesn't raise otherwise
+	bary = np.dot(points - last, np.linalg.pinv(mat).T)
+	return np.concatenate((bary, 1.0 - bary.sum(axis=1)[:, None]), axis=1)
+
+
+class Progression(object):
+	def __init__(self, name, pairs, interp):
+		self.name = name
+		pairs = sorted(pairs, key=lambda x: x[1])
+		self.shapeIdxs = np.array([p[0] for p in pairs], dtype=int)
+		self.times = np.array([p[1] for p in pairs], dtype=float)
+		self.interp = interp
+
+		posPairs = [p for p in pairs if p[1] >= 0]
+		negPairs = [p for p in pairs if p[1] <= 0]
+		self._pos = (np.array([p[0] for p in posPairs], dtype=int), np.array([p[1] for p in posPairs], dtype=float))
+		self._neg = (np.array([p[0] for p in negPairs], dtype=int), np.array([p[1] for p in negPairs], dtype=float))
+
+	def accumulate(self, tVals, muls, out):
+		''' Add the weighted shape outputs for each row of values to the output array '''
+		rows = np.arange(len(tVals))
+		if self.interp == SPLINE:
+			self.rawSplineOutput(self.shapeIdxs, self.times, rows, tVals, muls, out)
+		elif self.interp == SPLITSPLINE:
+			gt = tVals >= 0.0
+			for sel, (shapeIdxs, times) in ((gt, self._pos), (~gt, self._neg)):
+				if sel.any():
+					self.rawSplineOutput(shapeIdxs, times, rows[sel], tVals[sel], muls[sel], out)
+		else:
+			self.rawLinearOutput(self.shapeIdxs, self.times, rows, tVals, muls, out)
+
+	@classmethod
+	def rawSplineOutput(cls, shapeIdxs, times, rows, tVals, muls, out):
+		if len(times) <= 2:
+			cls.rawLinearOutput(shapeIdxs, times, rows, tVals, muls, out)
+			return
+
+		interval = getInterval(tVals, times)
+		start = times[interval]
+		end = times[interval + 1]
+
+		# compute the catmull-rom basis multipliers
+		x = (tVals - start) / (end - start)
+		x2 = x*x
+		x3 = x2*x
+		v0 = muls * (-0.5*x3 + 1.0*x2 - 0.5*x)
+		v1 = muls * (1.5*x3 - 2.5*x2 + 1.0)
+		v2 = muls * (-1.5*x3 + 2.0*x2 + 0.5*x)
+		v3 = muls * (0.5*x3 - 0.5*x2)
+
+		# Every row shows up only once per assignment
+		# so fancy indexed += is safe here
+		first = interval == 0
+		last = (interval == len(times) - 2) & ~first
+		mid = ~(first | last)
+
+		# deal with input tangent
+		r = rows[first]
+		out[r, shapeIdxs[0]] += v1[first] + v0[first] + v0[first]
+		out[r, shapeIdxs[1]] += v2[first] - v0[first]
+		out[r, shapeIdxs[2]] += v3[first]
+
+		# deal with output tangent
+		r = rows[last]
+		out[r, shapeIdxs[-3]] += v0[last]
+		out[r, shapeIdxs[-2]] += v1[last] - v3[last]
+		out[r, shapeIdxs[-1]] += v2[last] + v3[last] + v3[last]
+
+		r = rows[mid]
+		i = interval[mid]
+		out[r, shapeIdxs[i - 1]] += v0[mid]
+		out[r, shapeIdxs[i + 0]] += v1[mid]
+		out[r, shapeIdxs[i + 1]] += v2[mid]
+		out[r, shapeIdxs[i + 2]] += v3[mid]
+
+	@staticmethod
+	def rawLinearOutput(shapeIdxs, times, rows, tVals, muls, out):
+		if len(times) < 2:
+			return
+		idx = getInterval(tVals, times)
+		u = (tVals - times[idx]) / (times[idx + 1] - times[idx])
+		out[rows, shapeIdxs[idx]] += muls * (1.0 - u)
+		out[rows, shapeIdxs[idx + 1]] += muls * u
+
+	@classmethod
+	def parseJSONv1(cls, val):
+		name, idxs, weights = val[0], val[1], val[2]
+		interp = SPLINE
+		if len(val) > 3 and val[3] == 'linear':
+			interp = LINEAR
+		return cls(name, zip(idxs, weights), interp)
+
+	@classmethod
+	def parseJSONv2(cls, val):
+		interp = SPLINE
+		if val['interp'] == 'linear':
+			interp = LINEAR
+		elif val['interp'] == 'splitspline':
+			interp = SPLITSPLINE
+		return cls(val['name'], [tuple(p) for p in val['pairs']], interp)
+
+
+class Slider(object):
+	def __init__(self, name, prog, index, enabled=True):
+		self.name = name
+		self.prog = prog
+		self.index = index
+		self.enabled = enabled
+
+	@classmethod
+	def parseJSONv1(cls, val, index, progs):
+		return cls(val[0], progs[val[1]], index)
+
+	@classmethod
+	def parseJSONv2(cls, val, index, progs):
+		enabled = val.get('enabled', True)
+		return cls(val['name'], progs[val['prog']], index, bool(enabled))
+
+
+class Combo(object):
+	def __init__(self, name, prog, index, stateList, isFloater, solveType, enabled=True):
+		self.name = name
+		self.prog = prog
+		self.index = index
+		self.enabled = enabled
+		self.isFloater = isFloater
+		self.solveType = solveType
+		self.exact = True
+
+		stateList = sorted(stateList, key=lambda x: x[0])
+		self.sliderIdxs = np.array([s for s, _ in stateList], dtype=int)
+		self.targets = np.array([v for _, v in stateList], dtype=float)
+		self.inverted = self.targets < 0
+
+	def storeValue(self, sliderVals):
+		''' Get the activation of this combo for each row of slider values '''
+		count = len(sliderVals)
+		if not self.enabled or self.isFloater or not len(self.sliderIdxs):
+			return np.zeros(count)
+
+		vals = sliderVals[:, self.sliderIdxs]
+
+		# Specifically this instead of isNegative()
+		# because isNegative returns true for 0.0
+		valNeg = ~isPositive(vals)
+		tarNeg = ~isPositive(self.targets)
+		valid = np.all(valNeg == tarNeg[None, :], axis=1)
+
+		vals = np.where(valNeg, -vals, vals)
+		vals = np.minimum(vals, MAXVAL)
+
+		mn = vals.min(axis=1)
+		mx = vals.max(axis=1)
+		allMul = vals.prod(axis=1)
+		allSum = vals.sum(axis=1)
+
+		with np.errstate(divide='ignore', invalid='ignore'):
+			if self.solveType == ALLMUL:
+				value = allMul
+			elif self.solveType == EXTMUL:
+				value = mx * mn
+			elif self.solveType == MULAVGEXT:
+				value = np.where(isZero(mx + mn), 0.0, 2 * (mx * mn) / (mx + mn))
+			elif self.solveType == MULAVGALL:
+				value = np.where(isZero(allSum), 0.0, len(self.sliderIdxs) * allMul / allSum)
+			else:
+				value = mn if self.exact else softMin(mx, mn)
+
+		return np.where(valid, value, 0.0)
+
+	@staticmethod
+	def checkFloater(stateList):
+		for _, val in stateList:
+			if abs(abs(val) - 1.0) > EPS and not isZero(val):
+				return True
+		return False
+
+	@classmethod
+	def parseJSONv1(cls, val, index, progs):
+		stateList = [tuple(p) for p in val[2]]
+		isFloater = cls.checkFloater(stateList)
+		return cls(val[0], progs[val[1]], index, stateList, isFloater, NONE)
+
+	@classmethod
+	def parseJSONv2(cls, val, index, progs):
+		stateList = [tuple(p) for p in val['pairs']]
+		isFloater = cls.checkFloater(stateList)
+		solveType = SOLVE_TYPES.get(val.get('solveType'), NONE)
+		enabled = val.get('enabled', True)
+		return cls(val['name'], progs[val['prog']], index, stateList, isFloater, solveType, bool(enabled))
+
+
+class Traversal(object):
+	def __init__(self, name, prog, index, progressCtrl, multiplierCtrl, valueFlip, multiplierFlip, enabled=True):
+		self.name = name
+		self.prog = prog
+		self.index = index
+		self.enabled = enabled
+		# Controllers are stored as (isSlider, index) pairs
+		self.progressCtrl = progressCtrl
+		self.multiplierCtrl = multiplierCtrl
+		self.valueFlip = valueFlip
+		self.multiplierFlip = multiplierFlip
+
+	def storeValue(self, sliderVals, comboVals, inverses):
+		''' Get the value and multiplier of this traversal for each row of inputs '''
+		count = len(sliderVals)
+		value = np.zeros(count)
+		multiplier = np.ones(count)
+		if not self.enabled:
+			return value, multiplier
+
+		valid = np.ones(count, dtype=bool)
+		ctrls = (
+			(self.progressCtrl, self.valueFlip),
+			(self.multiplierCtrl, self.multiplierFlip),
+		)
+		out = []
+		for (isSlider, idx), flip in ctrls:
+			if isSlider:
+				val = sliderVals[:, idx]
+				valid &= inverses[:, idx] == flip
+				if flip:
+					val = -val
+			else:
+				val = comboVals[:, idx]
+			out.append(val)
+
+		value[valid] = out[0][valid]
+		multiplier[valid] = out[1][valid]
+		return value, multiplier
+
+	@classmethod
+	def parseJSONv2(cls, val, index, progs):
+		pcType = val['progressType']
+		mcType = val['multiplierType']
+		pc = (bool(pcType) and pcType[0] == 'S', val['progressControl'])
+		mc = (bool(mcType) and mcType[0] == 'S', val['multiplierControl'])
+		enabled = val.get('enabled', True)
+		return cls(val['name'], progs[val['prog']], index, pc, mc,
+			bool(val['progressFlip']), bool(val['multiplierFlip']), bool(enabled))
+
+	parseJSONv1 = parseJSONv2
+
+
+class TriSpace(object):
+	''' Solve for the activation of a group of floaters that share the same sliders
+
+	Each simplex is encoded as a permutation of [(+-)(i+1) for i in range(dim)]
+	starting at 0, so [0, -2, 3, 1] is a valid encoding. These are the
+	"Schlafli Orthoscheme" of the hypercube. Floater points split these into
+	user simplices whose corners are indexed past the end of the dimension
+	'''
+	def __init__(self, floaters, floaterIdxs):
+		self.floaters = floaters
+		self.floaterIdxs = floaterIdxs # index into the solver's floater list
+		self.sliderIdxs = floaters[0].sliderIdxs
+		self.inverted = floaters[0].inverted
+		self.userPoints = []
+		self.simplexMap = {}
+		self.triangulate()
+
+	@classmethod
+	def buildSpaces(cls, floaters):
+		''' Group floaters by subspace dimension span '''
+		dimmed = {}
+		for i, floater in enumerate(floaters):
+			dimmed.setdefault(len(floater.sliderIdxs), []).append(i)
+
+		# Go through each dimension group and separate
+		# them by shared sliders
+		spaces = []
+		for dim in sorted(dimmed):
+			buckets = []
+			for i in dimmed[dim]:
+				key = tuple(floaters[i].sliderIdxs)
+				for bKey, bucket in buckets:
+					if bKey == key:
+						bucket.append(i)
+						break
+				else:
+					buckets.append((key, [i]))
+			for _, bucket in buckets:
+				spaces.append(cls([floaters[i] for i in bucket], bucket))
+		return spaces
+
+	def triangulate(self):
+		d = {}
+		for f in self.floaters:
+			userPoint = tuple(f.targets.tolist())
+			self.userPoints.append(userPoint)
+			for rawSimp in self.pointToAdjSimp(userPoint):
+				d.setdefault(tuple(rawSimp), []).append(userPoint)
+
+		for simp, pts in d.iteritems():
+			size = len(simp)
+			for userSimplex in self.splitSimps(pts, [simp]):
+				newSimp = []
+				for cIdx, corner in enumerate(userSimplex):
+					corner = tuple(corner)
+					if corner in self.userPoints:
+						newSimp.append(size + self.userPoints.index(corner))
+					else:
+						newSimp.append(simp[cIdx])
+				self.simplexMap.setdefault(simp, []).append(newSimp)
+
+	@classmethod
+	def pointToAdjSimp(cls, pt, eps=0.01):
+		''' Search for simplices that are near the point
+		This allows for splitting the simplex, or snapping a
+		point to a nearby progression
+		'''
+		out = []
+		cls._rec(list(pt), range(len(pt)), [0], out, eps)
+		return out
+
+	@classmethod
+	def _rec(cls, point, oVals, simp, out, eps):
+		if not point:
+			out.append(simp)
+			return
+
+		maxabs = max(abs(p) for p in point)
+		mxs = [i for i, p in enumerate(point) if maxabs - abs(p) < eps]
+		for mx in mxs:
+			# zero is both positive and negative
+			# so I need to do both directions
+			if isZero(maxabs):
+				directions = [-1, 1]
+			else:
+				directions = [1 if isPositive(point[mx]) else -1]
+
+			for direction in directions:
+				nSimp = simp + [(oVals[mx] + 1) * direction]
+				subpoint = point[:mx] + point[mx+1:]
+				subvals = oVals[:mx] + oVals[mx+1:]
+				cls._rec(subpoint, subvals, nSimp, out, eps)
+
+	def simplexToCorners(self, simplex):
+		currVec = [0.0] * (len(simplex) - 1)
+		out = []
+		for s in simplex:
+			if s == 0:
+				out.append(list(currVec))
+				continue
+			idx = abs(s)
+			if idx >= len(simplex):
+				out.append(list(self.userPoints[idx - len(simplex)]))
+			else:
+				currVec[idx - 1] = 1.0 if s > 0 else -1.0
+				out.append(list(currVec))
+		return out
+
+	def splitSimps(self, pts, simps):
+		out = [self.simplexToCorners(s) for s in simps]
+		for p in pts:
+			tmpList = []
+			for corners in out:
+				bary = barycentric(corners, [p])[0]
+				if np.all(isPositive(bary)):
+					for k, b in enumerate(bary):
+						if not isZero(b):
+							ns = list(corners)
+							ns[k] = list(p)
+							tmpList.append(ns)
+				else:
+					tmpList.append(corners)
+			out = tmpList
+		return out
+
+	def userSimplexToCorners(self, simplex, original):
+		''' Break down the given simplex encoding to a list of corner points
+		for the barycentric solver and a correlation of the point index to
+		the floater index (or -1 if invalid)
+		'''
+		currVec = [0.0] * (len(simplex) - 1)
+		out, floaterCorners = [], []
+		for s, os in zip(simplex, original):
+			if s == 0:
+				out.append(list(currVec))
+				floaterCorners.append(-1)
+				continue
+
+			idx = abs(s)
+			oidx = abs(os)
+			if oidx != 0:
+				# keep track of where we *would* be normally
+				# unless we're replacing the first item
+				currVec[oidx - 1] = 1.0 if os > 0 else -1.0
+
+			if idx >= len(simplex):
+				out.append(list(self.userPoints[idx - len(simplex)]))
+				floaterCorners.append(idx - len(simplex))
+			else:
+				out.append(list(currVec))
+				floaterCorners.append(-1)
+		return out, floaterCorners
+
+	@staticmethod
+	def pointToSimp(pts):
+		''' Get the encoded orthoscheme that contains each row of points '''
+		sign = np.where(isPositive(pts), 1, -1)
+		codes = (np.arange(pts.shape[1]) + 1)[None, :] * sign
+		order = np.argsort(pts * sign, axis=1, kind='mergesort')[:, ::-1]
+		codes = codes[np.arange(len(codes))[:, None], order]
+		return np.concatenate((np.zeros((len(pts), 1), dtype=int), codes), axis=1)
+
+	def storeValue(self, clamped, inverses, floaterVals):
+		''' Set the floater values for each row of inputs '''
+		vec = clamped[:, self.sliderIdxs]
+		valid = ~np.any(isZero(vec), axis=1)
+		valid &= np.all(inverses[:, self.sliderIdxs] == self.inverted[None, :], axis=1)
+		rows = np.nonzero(valid)[0]
+		if not len(rows):
+			return
+		vec = vec[rows]
+
+		# Group the rows by the major simplex they fall into
+		simps = self.pointToSimp(vec)
+		dim = simps.shape[1]
+		keys = np.dot(simps + dim, (2 * dim + 1) ** np.arange(dim))
+		uKeys, uIdx, inv = np.unique(keys, return_index=True, return_inverse=True)
+
+		for k in range(len(uKeys)):
+			majorSimp = tuple(simps[uIdx[k]].tolist())
+			userSimps = self.simplexMap.get(majorSimp)
+			if userSimps is None:
+				continue
+
+			remaining = np.nonzero(inv == k)[0]
+			for simp in userSimps:
+				expanded, floaterCorners = self.userSimplexToCorners(simp, majorSimp)
+				b = barycentric(expanded, vec[remaining])
+				inside = np.all(isPositive(b), axis=1)
+				if not inside.any():
+					continue
+				hitRows = rows[remaining[inside]]
+				for i, fcIdx in enumerate(floaterCorners):
+					if fcIdx != -1:
+						floaterVals[hitRows, self.floaterIdxs[fcIdx]] = b[inside, i]
+				remaining = remaining[~inside]
+				if not len(remaining):
+					break
+
+
+class NumpySimplex(object):
+	''' A numpy implementation of the PySimplex solver '''
+	def __init__(self, jsValue=None):
+		self._definition = ""
+		self._exactSolve = True
+		self.shapes = []
+		self.progs = []
+		self.sliders = []
+		self.combos = []
+		self.floaters = []
+		self.spaces = []
+		self.traversals = []
+		self.definition = jsValue
+
+	@property
+	def definition(self):
+		return self._definition
+
+	@definition.setter
+	def definition(self, jsValue):
+		if jsValue is None:
+			jsValue = ""
+		if not isinstance(jsValue, basestring):
+			raise TypeError("The simplex definition must be a string")
+		self._definition = jsValue
+		self.clear()
+		if jsValue:
+			self.parseJSON(jsValue)
+			self.build()
+
+	@property
+	def exactSolve(self):
+		return self._exactSolve
+
+	@exactSolve.setter
+	def exactSolve(self, exact):
+		self._exactSolve = bool(exact)
+		for combo in self.combos:
+			combo.exact = self._exactSolve
+
+	def clear(self):
+		self.shapes = []
+		self.progs = []
+		self.sliders = []
+		self.combos = []
+		self.floaters = []
+		self.spaces = []
+		self.traversals = []
+
+	def parseJSON(self, jsString):
+		d = json.loads(jsString)
+		version = d.get("encodingVersion", 1)
+		suffix = 'v2' if version == 2 else 'v1'
+
+		if version == 2:
+			self.shapes = [s['name'] for s in d['shapes']]
+		else:
+			self.shapes = list(d['shapes'])
+
+		self.progs = [getattr(Progression, 'parseJSON' + suffix)(p) for p in d['progressions']]
+
+		for i, s in enumerate(d['sliders']):
+			self.sliders.append(getattr(Slider, 'parseJSON' + suffix)(s, i, self.progs))
+
+		for i, c in enumerate(d.get('combos', [])):
+			combo = getattr(Combo, 'parseJSON' + suffix)(c, i, self.progs)
+			combo.exact = self._exactSolve
+			self.combos.append(combo)
+			if combo.isFloater:
+				# a floater is still a combo, so it's in both lists
+				self.floaters.append(combo)
+
+		for i, t in enumerate(d.get('traversals', [])):
+			self.traversals.append(getattr(Traversal, 'parseJSON' + suffix)(t, i, self.progs))
+
+	def build(self):
+		self.spaces = TriSpace.buildSpaces(self.floaters)
+
+	def solveBatch(self, inputs):
+		''' Solve multiple input vectors at once
+
+		Arguments:
+			inputs: An (N, numSliders) array-like of slider values
+
+		Returns:
+			An (N, numShapes) numpy array of shape values
+		'''
+		vec = np.asarray(inputs, dtype=float)
+		if vec.ndim == 1:
+			vec = vec[None, :]
+		if vec.ndim != 2 or vec.shape[1] != len(self.sliders):
+			raise ValueError("Input must have shape (N, {0}), got {1}".format(len(self.sliders), vec.shape))
+		count = len(vec)
+
+		# Rectifying just makes everything positive,
+		# keeps track of the inversion, and applies clamping
+		inverses = vec < 0
+		clamped = np.minimum(np.abs(vec), MAXVAL)
+
+		enabled = np.array([s.enabled for s in self.sliders], dtype=bool)
+		sliderVals = np.where(enabled[None, :], vec, 0.0)
+
+		comboVals = np.zeros((count, len(self.combos)))
+		for i, combo in enumerate(self.combos):
+			comboVals[:, i] = combo.storeValue(sliderVals)
+
+		floaterVals = np.zeros((count, len(self.floaters)))
+		for space in self.spaces:
+			space.storeValue(clamped, inverses, floaterVals)
+
+		travVals = [trav.storeValue(sliderVals, comboVals, inverses) for trav in self.traversals]
+
+		output = np.zeros((count, len(self.shapes)))
+		maxAct = np.zeros(count)
+		ones = np.ones(count)
+
+		solves = []
+		solves.extend((s.prog, sliderVals[:, i], ones) for i, s in enumerate(self.sliders))
+		solves.extend((c.prog, comboVals[:, i], ones) for i, c in enumerate(self.combos))
+		solves.extend((f.prog, floaterVals[:, i], ones) for i, f in enumerate(self.floaters))
+		solves.extend((t.prog, v, m) for t, (v, m) in zip(self.traversals, travVals))
+
+		for prog, value, mul in solves:
+			maxAct = np.maximum(maxAct, np.abs(value * mul))
+			prog.accumulate(value, mul, output)
+
+		# set the rest value properly
+		if output.shape[1]:
+			output[:, 0] = 1.0 - maxAct
+		return output
+
+	def solve(self, vec):
+		''' Supply an input list to the solver, and receive an output list '''
+		return self.solveBatch([vec])[0].tolist()
+
+	def solveBuffer(self, inVec, outVec):
+		''' Supply an input array to the solver, and fill the output array '''
+		outVec = np.asarray(outVec)
+		if outVec.ndim != 1:
+			raise ValueError("Output must have exactly 1 dimension")
+		if len(outVec) < len(self.shapes):
+			raise ValueError("Output must have enough space allocated")
+		outVec[:len(self.shapes)] = self.solveBatch([inVec])[0]
+
+	def solveBatchBuffer(self, inputs, output):
+		''' Supply an (N, numSliders) input array to the solver,
+		and fill an (N, numShapes) output array
+		'''
+		output = np.asarray(output)
+		if output.ndim != 2:
+			raise ValueError("Output must have exactly 2 dimensions")
+		if len(output) != len(inputs):
+			raise ValueError("Input and output must have the same number of rows")
+		if output.shape[1] < len(self.shapes):
+			raise ValueError("Output must have enough space allocated")
+		output[:, :len(self.shapes)] = self.solveBatch(inputs)
+
@@ -0,0 +1,330 @@
+'''
+Copyright 2016, Blur Studio
+
+This file is part of Simplex.
+
+Simplex is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Simplex is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Simplex.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+""" A binary container for corrective deformation references
+
+The file is a fixed magic string and version, then a json header with the
+shape names and their reference indices, then the reference data itself.
+Every per-point reference matrix is affine, so the constant last column is
+dropped, and only a float32 4x3 block is stored.
+
+Most of the mesh doesn't move for any one pose, so if the file has a rest
+reference, each reference only stores the points where it differs from the
+rest, along with the indices of those points. The data is written one
+reference after another, so a single reference can be read straight out of
+a memmap without touching the rest of the file
+
+	magic      8 bytes   REFERENCE_MAGIC
+	version    uint32    REFERENCE_VERSION
+	headerLen  uint32    The length of the json header in bytes
+	header     json      names, refIdxs, numRefs, numVerts, hasRest, counts, dtype
+	padding    To a multiple of REFERENCE_ALIGN bytes
+	rest       dtype     (numVerts, 4, 3) if hasRest
+	Then for each reference
+		idxs   int32     (count,) if counts isn't null
+		blocks dtype     (count, 4, 3) where count is numVerts if counts is null
+
+The dtype is float32 unless the file was written with something else
+"""
+import os, json, struct
+import numpy as np
+
+REFERENCE_MAGIC = b'SMPXREF\0'
+REFERENCE_VERSION = 2
+REFERENCE_ALIGN = 64
+_PREFIX = struct.Struct('<II')
+
+
+def isReferenceFile(path):
+	''' Check if a file was written by writeReferences '''
+	try:
+		with open(path, 'rb') as f:
+			return f.read(len(REFERENCE_MAGIC)) == REFERENCE_MAGIC
+	except IOError:
+		return False
+
+
+def compressReference(ref):
+	''' Drop the constant last column from a (numVerts, 4, 4) reference '''
+	ref = np.asarray(ref)
+	if ref.shape[-2:] != (4, 4):
+		raise ValueError("References must be 4x4 matrices, got {0}".format(ref.shape[-2:]))
+	if np.any(ref[..., :3, 3] != 0.0) or np.any(ref[..., 3, 3] != 1.0):
+		raise ValueError("References must be affine to be compressed")
+	return ref[..., :3].astype('<f4')
+
+
+def expandReference(block):
+	''' Rebuild the full float64 (numVerts, 4, 4) reference from a 4x3 block '''
+	out = np.zeros(block.shape[:-1] + (4,), dtype=np.float64)
+	out[..., :3] = block
+	out[..., 3, 3] = 1.0
+	return out
+
+
+def sparsifyReference(ref, restBlock):
+	''' Get the indices and 4x3 blocks of the points where a reference differs from the rest
+
+	The comparison is done after the float32 conversion, so
+	nothing is lost compared to storing every point
+	'''
+	block = compressReference(ref)
+	same = (block == restBlock).reshape((len(block), -1)).all(axis=1)
+	idxs = np.flatnonzero(~same).astype(np.int32)
+	return idxs, block[idxs]
+
+
+def _applyBlocks(pts, blocks):
+	''' Multiply (..., numVerts, 3) row-vector points by affine 4x3 blocks '''
+	return np.einsum('...ij,ijk->...ik', pts, blocks[:, :3]) + blocks[:, 3]
+
+
+def _isShift(blocks):
+	''' Check if every 4x3 block is an identity with a translation '''
+	return bool(np.all(blocks[:, :3] == np.eye(3, dtype=blocks.dtype)[None, ...]))
+
+
+class References(object):
+	''' A set of per-point affine references, stored as 4x3 blocks
+
+	If there is a rest reference, each reference only stores the points where
+	it differs from the rest, and the indices of those points. Every other
+	point uses the rest. Without a rest, every reference stores every point
+
+	Arguments:
+		numVerts: The number of points in each reference
+		blocks: A (count, 4, 3) array per reference
+		idxs: An int32 array of count point indices per reference, or None
+			if every reference stores every point
+		rest: The (numVerts, 4, 3) rest block, or None
+		names: The shape names that the references correct
+		refIdxs: The reference index for each name
+	'''
+	def __init__(self, numVerts, blocks, idxs=None, rest=None, names=None, refIdxs=None):
+		if (idxs is None) != (rest is None):
+			raise ValueError("Sparse references need both indices and a rest")
+		self.numVerts = numVerts
+		self.blocks = blocks
+		self.idxs = idxs
+		self.rest = rest
+		self.names = names
+		self.refIdxs = refIdxs
+		self._restIsShift = None
+
+	@classmethod
+	def fromArray(cls, refs, rest=None, names=None, refIdxs=None):
+		''' Build references from full (numVerts, 4, 4) matrices
+		If a rest reference is given, only the points that differ from it are kept
+		'''
+		numVerts = len(rest) if rest is not None else (len(refs[0]) if len(refs) else 0)
+		if rest is None:
+			return cls(numVerts, [compressReference(r) for r in refs], names=names, refIdxs=refIdxs)
+
+		restBlock = compressReference(rest)
+		idxs, blocks = [], []
+		for ref in refs:
+			idx, block = sparsifyReference(ref, restBlock)
+			idxs.append(idx)
+			blocks.append(block)
+		return cls(numVerts, blocks, idxs, restBlock, names=names, refIdxs=refIdxs)
+
+	@property
+	def shape(self):
+		''' The shape of the full reference array '''
+		return (len(self.blocks), self.numVerts, 4, 4)
+
+	@property
+	def isSparse(self):
+		return self.rest is not None
+
+	@property
+	def count(self):
+		''' The total number of stored points, not counting the rest '''
+		return sum(len(b) for b in self.blocks)
+
+	def __len__(self):
+		return len(self.blocks)
+
+	def __getitem__(self, idx):
+		''' Get one full float64 (numVerts, 4, 4) reference '''
+		if self.rest is None:
+			return expandReference(self.blocks[idx])
+		out = expandReference(self.rest)
+		out[self.idxs[idx]] = expandReference(self.blocks[idx])
+		return out
+
+	def __iter__(self):
+		for i in xrange(len(self)):
+			yield self[i]
+
+	def invert(self):
+		''' Get the inverse of every stored point as a new References object
+		The inverse of an affine matrix is still affine, so the inverses can
+		be stored the same way. The rest only gets inverted once
+		'''
+		def inv(blocks):
+			if not len(blocks):
+				return np.zeros((0, 4, 3))
+			if _isShift(blocks):
+				ret = np.array(blocks, dtype=np.float64)
+				ret[:, 3] *= -1
+				return ret
+			return np.linalg.inv(expandReference(blocks))[..., :3]
+
+		rest = None if self.rest is None else inv(self.rest)
+		blocks = [inv(b) for b in self.blocks]
+		return References(self.numVerts, blocks, self.idxs, rest, names=self.names, refIdxs=self.refIdxs)
+
+	def applyTo(self, idx, pts):
+		''' Multiply (..., numVerts, 3) points by one reference
+		The points that use the rest are handled all at once, and
+		if the rest is just a translation they're only an addition
+		'''
+		pts = np.asarray(pts, dtype=np.float64)
+		if self.rest is None:
+			return _applyBlocks(pts, self.blocks[idx])
+
+		if self._restIsShift is None:
+			self._restIsShift = _isShift(self.rest)
+		if self._restIsShift:
+			out = pts + self.rest[:, 3]
+		else:
+			out = _applyBlocks(pts, self.rest)
+
+		idxs = self.idxs[idx]
+		if len(idxs):
+			out[..., idxs, :] = _applyBlocks(pts[..., idxs, :], self.blocks[idx])
+		return out
+
+
+def writeReferences(path, names, refIdxs, refs, dtype='<f4'):
+	''' Write the shape names, their reference indices, and the references
+
+	Arguments:
+		path: The output filepath
+		names: The name of every shape that gets corrected
+		refIdxs: The reference index for each name
+		refs: A References object, a (numRefs, numVerts, 4, 4) array,
+			or any sequence of (numVerts, 4, 4) references.
+			They're written one at a time
+		dtype: The datatype of the stored blocks
+	'''
+	dtype = np.dtype(dtype).newbyteorder('<')
+	names = list(names)
+	refIdxs = [int(i) for i in refIdxs]
+	if len(names) != len(refIdxs):
+		raise ValueError("Every name needs a reference index")
+	numRefs = len(refs)
+
+	sparse = isinstance(refs, References) and refs.isSparse
+	if isinstance(refs, References):
+		numVerts = refs.numVerts
+	else:
+		numVerts = len(refs[0]) if numRefs else 0
+
+	header = json.dumps({
+		'names': names,
+		'refIdxs': refIdxs,
+		'numRefs': numRefs,
+		'numVerts': numVerts,
+		'hasRest': sparse,
+		'counts': [len(i) for i in refs.idxs] if sparse else None,
+		'dtype': dtype.str,
+	}).encode('utf-8')
+	start = len(REFERENCE_MAGIC) + _PREFIX.size + len(header)
+	padding = -start % REFERENCE_ALIGN
+
+	with open(path, 'wb') as f:
+		f.write(REFERENCE_MAGIC)
+		f.write(_PREFIX.pack(REFERENCE_VERSION, len(header)))
+		f.write(header)
+		f.write(b'\0' * padding)
+		if sparse:
+			f.write(np.ascontiguousarray(refs.rest, dtype=dtype).tobytes())
+			for idxs, block in zip(refs.idxs, refs.blocks):
+				f.write(np.ascontiguousarray(idxs, dtype='<i4').tobytes())
+				f.write(np.ascontiguousarray(block, dtype=dtype).tobytes())
+		elif isinstance(refs, References):
+			for block in refs.blocks:
+				f.write(np.ascontiguousarray(block, dtype=dtype).tobytes())
+		else:
+			for ref in refs:
+				block = compressReference(ref)
+				if len(block) != numVerts:
+					raise ValueError("Every reference needs the same number of points")
+				f.write(np.ascontiguousarray(block, dtype=dtype).tobytes())
+
+
+def readReferenceHeader(path):
+	''' Read the header of a reference file
+
+	Returns:
+		dict: The json header
+		int: The byte offset of the reference data
+	'''
+	with open(path, 'rb') as f:
+		if f.read(len(REFERENCE_MAGIC)) != REFERENCE_MAGIC:
+			raise ValueError("Not a simplex reference file: {0}".format(path))
+		version, headerLen = _PREFIX.unpack(f.read(_PREFIX.size))
+		if version > REFERENCE_VERSION:
+			raise ValueError("Reference file version {0} is newer than this reader ({1})".format(version, REFERENCE_VERSION))
+		header = json.loads(f.read(headerLen).decode('utf-8'))
+	start = len(REFERENCE_MAGIC) + _PREFIX.size + headerLen
+	return header, start + (-start % REFERENCE_ALIGN)
+
+
+def loadReferences(path):
+	''' Load the names, reference indices, and memory-mapped references of a reference file '''
+	if not os.path.isfile(str(path)):
+		raise IOError("File does not exist: " + str(path))
+	header, offset = readReferenceHeader(str(path))
+	numRefs, numVerts = header['numRefs'], header['numVerts']
+	names, refIdxs = header['names'], header['refIdxs']
+
+	# Version 1 files are always dense float32, and don't have these keys
+	hasRest = header.get('hasRest', False)
+	counts = header.get('counts')
+	dtype = np.dtype(str(header.get('dtype', '<f4')))
+	if counts is None:
+		counts = [numVerts] * numRefs
+
+	if os.path.getsize(str(path)) > offset:
+		raw = np.memmap(str(path), dtype=np.uint8, mode='r')
+	else:
+		raw = np.zeros(offset, dtype=np.uint8)
+
+	def take(dt, shape):
+		size = int(np.prod(shape)) * np.dtype(dt).itemsize
+		ret = raw[take.offset:take.offset + size].view(dt).reshape(shape)
+		take.offset += size
+		return ret
+	take.offset = offset
+
+	rest, idxs = None, None
+	if hasRest:
+		rest = take(dtype, (numVerts, 4, 3))
+		idxs = []
+	blocks = []
+	for count in counts:
+		if hasRest:
+			idxs.append(take('<i4', (count,)))
+		blocks.append(take(dtype, (count, 4, 3)))
+
+	refs = References(numVerts, blocks, idxs, rest, names=names, refIdxs=refIdxs)
+	return names, refIdxs, refs
@@ -29,10 +29,10 @@ possible to invert the range if you think you've got it backwards
 """
 #pylint:disable=wrong-import-position
 import gc, os
-from alembic.Abc import IArchive, OArchive, OStringProperty
-from alembic.AbcGeom import IPolyMesh, OPolyMesh, IXform, OXform, OPolyMeshSchemaSample
+from alembic.Abc import IArchive, OArchive
+from alembic.AbcGeom import IPolyMesh, IXform
 
-from alembicCommon import mkSampleVertexPoints, mkSampleIntArray, getSampleArray
+from alembicCommon import mkSampleIntArray, writeSmpx
 
 
 import numpy as np
@@ -50,15 +50,6 @@ def loadJSString(iarch):
 	jsString = prop.getValue()
 	return jsString
 
-def getShapes(iarch):
-	''' Load the animated shape data from an alembic archive '''
-	top = iarch.getTop()
-	ixfo = IXform(top, top.children[0].getName())
-	mesh = IPolyMesh(ixfo, ixfo.children[0].getName())
-
-	shapes = getSampleArray(mesh)
-	return shapes
-
 def getMesh(iarch):
 	''' Load the static mesh data from an alembic archive '''
 	top = iarch.getTop()
@@ -75,55 +66,112 @@ def getMesh(iarch):
 	return faces, counts
 
 
-def _writeSimplex(oarch, name, jsString, faces, counts, newShapes):
-	''' Separate the writer from oarch creation so garbage
-	collection *hopefully* works as expected
+def getMeshObject(iarch):
+	''' Get the IPolyMesh out of a .smpx file '''
+	top = iarch.getTop()
+	ixfo = IXform(top, top.children[0].getName())
+	return IPolyMesh(ixfo, ixfo.children[0].getName())
+
+def loadCorrespondence(matchPath, invertMatch=False):
+	''' Load a correspondence file
+
+	Returns:
+		The index of the source point for every output point,
+		and the index of the output point for every source point
 	'''
-	par = OXform(oarch.getTop(), name)
-	props = par.getSchema().getUserProperties()
-	prop = OStringProperty(props, "simplex")
-	prop.setValue(str(jsString))
-	abcMesh = OPolyMesh(par, name)
-	schema = abcMesh.getSchema()
-	for i, newShape in enumerate(newShapes):
-		print "Writing {0: 3d} of {1}\r".format(i, len(newShapes)),
-
-		verts = mkSampleVertexPoints(newShape)
-		abcSample = OPolyMeshSchemaSample(verts, faces, counts)
-		schema.set(abcSample)
-	print "Writing {0: 3d} of {1}".format(len(newShapes), len(newShapes))
+	c = np.load(matchPath)
+	c = c[c[:, 0].argsort()].T[1]
+	ci = c.argsort()
+	if invertMatch:
+		ci, c = c, ci
+	return c, ci
 
-def reorderSimplexPoints(sourcePath, matchPath, outPath, invertMatch=False):
-	''' Transfer shape data from the sourcePath using the numpy int array
-	at matchPath to make the final output at outPath
+def iterReorderedShapes(mesh, order):
+	''' Yield the reordered points of each sample one at a time
+	Every sample is taken straight from the alembic buffer into the same
+	output array, so it must be written before the next one is read
+	'''
+	posProp = mesh.getSchema().getPositionsProperty()
+	out = None
+	for sample in posProp.samples:
+		pts = arrayToNumpy(sample)
+		if out is None:
+			out = np.empty((len(order), 3), dtype=pts.dtype)
+		np.take(pts, order, axis=0, out=out)
+		yield out
+
+def reorderSimplexFile(sourcePath, outPath, c, ci):
+	''' Reorder the points of the simplex at sourcePath into outPath
+	The shapes are streamed one at a time, so only a couple shapes
+	are ever in memory. The output is written to a temp file and moved
+	into place, so the source and output can be the same file
+
+	Args:
+		sourcePath: The input .smpx path
+		outPath: The output .smpx path
+		c: The index of the source point for every output point
+		ci: The index of the output point for every source point
 	'''
 	print "Loading Simplex"
 	if not os.path.isfile(str(sourcePath)):
 		raise IOError("File does not exist: " + str(sourcePath))
 	sourceArch = IArchive(str(sourcePath)) # because alembic hates unicode
-	sourceShapes = getShapes(sourceArch)
+	sourceMesh = getMeshObject(sourceArch)
 	jsString = loadJSString(sourceArch)
 	sFaces, counts = getMesh(sourceArch)
-	sFaces = np.array(sFaces)
-
-	print "Loading Correspondence"
-	c = np.load(matchPath)
-	c = c[c[:, 0].argsort()].T[1]
-	ci = c.argsort()
-	if invertMatch:
-		ci, c = c, ci
+	sFaces = arrayToNumpy(sFaces)
 
 	print "Reordering"
-	targetShapes = sourceShapes[:, c, :]
 	faces = mkSampleIntArray(ci[sFaces])
+	targetShapes = iterReorderedShapes(sourceMesh, c)
 
+	# The samples are streamed from the source, so write to a temp file
+	# in case the source and output are the same file
 	print "Writing"
-	oarch = OArchive(str(outPath)) # alembic does not like unicode filepaths
+	outPath = str(outPath) # alembic does not like unicode filepaths
+	tmpPath = '{0}.{1}.tmp'.format(outPath, os.getpid())
+	oarch = OArchive(tmpPath)
 	try:
-		_writeSimplex(oarch, 'Face', jsString, faces, counts, targetShapes)
-	finally:
+		writeSmpx(oarch, 'Face', jsString, faces, counts, targetShapes)
+	except Exception: #pylint: disable=broad-except
 		del oarch
 		gc.collect()
+		os.remove(tmpPath)
+		raise
+	del oarch
+
+	# Let go of the source before it can be replaced
+	del targetShapes, sourceMesh, sourceArch
+	gc.collect()
+	if os.path.exists(outPath):
+		os.remove(outPath)
+	os.rename(tmpPath, outPath)
+
+def reorderSimplexPoints(sourcePath, matchPath, outPath, invertMatch=False):
+	''' Transfer shape data from the sourcePath using the numpy int array
+	at matchPath to make the final output at outPath
+	'''
+	print "Loading Correspondence"
+	c, ci = loadCorrespondence(matchPath, invertMatch=invertMatch)
+	reorderSimplexFile(sourcePath, outPath, c, ci)
+
+def batchReorderSimplexPoints(jobs, invertMatch=False):
+	''' Reorder many simplex files in one process
+
+	Args:
+		jobs: A list of (sourcePath, matchPath, outPath). Characters that
+			share a correspondence file only load it once
+		invertMatch: Invert every correspondence
+	'''
+	matches = {}
+	for i, (sourcePath, matchPath, outPath) in enumerate(jobs):
+		print "Reordering {0} of {1}: {2}".format(i + 1, len(jobs), sourcePath)
+		key = os.path.abspath(str(matchPath))
+		if key not in matches:
+			print "Loading Correspondence"
+			matches[key] = loadCorrespondence(matchPath, invertMatch=invertMatch)
+		c, ci = matches[key]
+		reorderSimplexFile(sourcePath, outPath, c, ci)
 
 
 if __name__ == "__main__":
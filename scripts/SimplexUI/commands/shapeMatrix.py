@@ -0,0 +1,666 @@
+'''
+Copyright 2016, Blur Studio
+
+This file is part of Simplex.
+
+Simplex is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Simplex is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Simplex.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+""" Dense storage for the shapes of a simplex system
+
+All the shapes are kept as deltas from the rest shape in a single contiguous
+(numShapes, numVerts*3) block, with a name->row index. That means posing the
+mesh for a set of solver outputs is a single matrix multiply
+
+For systems where most shapes only move a small part of the mesh, there is
+also a sparse version that only stores the vertices each shape moves
+"""
+import itertools
+from collections import OrderedDict
+import numpy as np
+
+# Any offset with no component larger than this is considered unmoved
+SPARSE_TOLERANCE = 1.0e-6
+
+# Use sparse storage when fewer than this fraction of the vertices move
+SPARSE_DENSITY = 0.25
+
+# The number of shapes checked when choosing between sparse and dense storage
+SPARSE_SAMPLE_COUNT = 32
+
+# The number of decoded samples a LazyShapeMatrix keeps around
+LAZY_CACHE_SIZE = 64
+
+
+class ShapeMatrix(object):
+	''' A contiguous block of shape deltas with a name->row index
+
+	Arguments:
+		names: The shape names in row order
+		deltas: A (numShapes, numVerts, 3) array of offsets from the rest shape.
+			If None, all the offsets start at zero
+		rest: A (numVerts, 3) array of rest positions. If None, the first
+			shape that gets set will define the point count
+		restName: The name of the rest shape. Its delta row is always zero
+		dtype: The datatype of the delta block
+	'''
+	def __init__(self, names, deltas, rest, restName=None, dtype=np.float32):
+		self.dtype = dtype
+		self.rest = None if rest is None else np.array(rest, dtype=np.float64)
+		self.restName = restName
+		self._names = list(names)
+		self._index = {n: i for i, n in enumerate(self._names)}
+		self._initStorage(deltas)
+
+	def _initStorage(self, deltas):
+		self._flat = np.zeros((max(len(self._names), 1), self.numVerts * 3), dtype=self.dtype)
+		if self._names and deltas is not None:
+			self._flat[:len(self._names)] = np.asarray(deltas).reshape((len(self._names), -1))
+		if self.restName in self._index:
+			self._flat[self._index[self.restName]] = 0.0
+
+	def _setRow(self, idx, delta):
+		self._flat[idx] = np.asarray(delta).reshape(-1)
+
+	@classmethod
+	def fromPoints(cls, names, points, restIdx=0, dtype=np.float32):
+		''' Build a shape matrix from the full point positions of every shape '''
+		points = np.asarray(points)
+		rest = points[restIdx]
+		ret = cls(names, None, rest, restName=names[restIdx], dtype=dtype)
+		# Subtract straight into the block so we don't make an extra full copy
+		np.subtract(points.reshape((len(names), -1)), ret.rest.reshape(-1), out=ret.flat, casting='unsafe')
+		return ret
+
+	# Accessors
+	@property
+	def names(self):
+		return list(self._names)
+
+	@property
+	def numShapes(self):
+		return len(self._names)
+
+	@property
+	def numVerts(self):
+		if self.rest is None:
+			return 0
+		return len(self.rest)
+
+	@property
+	def flat(self):
+		''' The (numShapes, numVerts*3) delta block '''
+		return self._flat[:len(self._names)]
+
+	@property
+	def deltas(self):
+		''' The (numShapes, numVerts, 3) delta block. This is a view, not a copy '''
+		return self.flat.reshape((len(self._names), -1, 3))
+
+	def __len__(self):
+		return len(self._names)
+
+	def __contains__(self, name):
+		return name in self._index
+
+	def getRowIndex(self, name):
+		return self._index[name]
+
+	def getDelta(self, name):
+		return self.deltas[self._index[name]]
+
+	def getFlatRows(self, rows):
+		''' Get a (len(rows), numVerts*3) copy of some rows of the block '''
+		return self.flat[rows]
+
+	def getPoints(self, name):
+		return self.rest + self.deltas[self._index[name]]
+
+	def toPoints(self):
+		''' Get the full (numShapes, numVerts, 3) point positions '''
+		return self.rest[None, ...] + self.deltas
+
+	def toDeltas(self):
+		''' Get a dense (numShapes, numVerts, 3) copy of the offsets '''
+		return self.deltas.copy()
+
+	def toDense(self):
+		return self
+
+	def toSparse(self, tol=SPARSE_TOLERANCE):
+		''' Get a SparseShapeMatrix copy of this data '''
+		ret = SparseShapeMatrix(self._names, None, self.rest, restName=self.restName, dtype=self.dtype, tol=tol)
+		for i in xrange(len(self._names)):
+			ret._setRow(i, self._flat[i])
+		return ret
+
+	# Editing
+	def _grow(self, count):
+		''' Make sure there's room for count more rows
+		Grow by doubling so adding shapes one at a time doesn't
+		re-allocate the whole block every time
+		'''
+		need = len(self._names) + count
+		if need > len(self._flat):
+			newFlat = np.zeros((max(need, 2 * len(self._flat)), self._flat.shape[1]), dtype=self.dtype)
+			newFlat[:len(self._names)] = self.flat
+			self._flat = newFlat
+
+	def addShape(self, name, points=None):
+		''' Add a new row. If no points are given, the shape will match the rest '''
+		if name in self._index:
+			raise ValueError("Shape already exists: {0}".format(name))
+		self._grow(1)
+		idx = len(self._names)
+		self._names.append(name)
+		self._index[name] = idx
+		self._flat[idx] = 0.0
+		if points is not None:
+			self.setPoints(name, points)
+		return idx
+
+	def setDelta(self, name, delta):
+		if name == self.restName:
+			return
+		self.deltas[self._index[name]] = delta
+
+	def setPoints(self, name, points):
+		''' Set the full point positions of a shape, adding it if required '''
+		if self.rest is None:
+			# The first shape in an empty matrix defines the offsets
+			# Any rows that were already added have no points yet, so they start at zero
+			self.rest = np.array(points, dtype=np.float64)
+			self._flat = np.zeros((max(len(self._flat), 1), self.numVerts * 3), dtype=self.dtype)
+
+		if name not in self._index:
+			self.addShape(name)
+
+		if name == self.restName:
+			# Keep every other shape in the same place by
+			# moving the offsets along with the rest
+			points = np.asarray(points, dtype=np.float64)
+			shift = (points - self.rest).reshape(-1)
+			flat = self.flat
+			flat -= shift.astype(self.dtype)[None, :]
+			flat[self._index[name]] = 0.0
+			self.rest = points.copy()
+		else:
+			self.deltas[self._index[name]] = np.asarray(points) - self.rest
+
+	def zeroShape(self, name):
+		self.flat[self._index[name]] = 0.0
+
+	def removeShape(self, name):
+		''' Remove a row. Missing names are ignored '''
+		idx = self._index.pop(name, None)
+		if idx is None:
+			return
+		count = len(self._names)
+		self._flat[idx:count-1] = self._flat[idx+1:count]
+		self._names.pop(idx)
+		for i in range(idx, len(self._names)):
+			self._index[self._names[i]] = i
+
+	def renameShape(self, name, newName):
+		if name == newName or name not in self._index:
+			return
+		idx = self._index.pop(name)
+		self._names[idx] = newName
+		self._index[newName] = idx
+		if self.restName == name:
+			self.restName = newName
+
+	# Evaluation
+	def getWeights(self, weights):
+		''' Turn a name->weight dict or a per-row sequence into a weight vector '''
+		if isinstance(weights, dict):
+			vec = np.zeros(len(self._names), dtype=self.dtype)
+			for name, w in weights.iteritems():
+				vec[self._index[name]] = w
+			return vec
+		weights = np.asarray(weights, dtype=self.dtype)
+		if weights.shape[-1] != len(self._names):
+			raise ValueError("Expected {0} weights, got {1}".format(len(self._names), weights.shape[-1]))
+		return weights
+
+	def evaluateDeltas(self, weights):
+		''' Get the summed (numVerts, 3) offsets for a single set of shape weights '''
+		vec = self.getWeights(weights)
+		return np.dot(vec, self.flat).reshape((-1, 3))
+
+	def evaluate(self, weights):
+		''' Get the posed (numVerts, 3) points for a single set of shape weights '''
+		return self.rest + self.evaluateDeltas(weights)
+
+	def evaluateDeltasBatch(self, weights):
+		''' Get the summed (N, numVerts, 3) offsets for an (N, numShapes) weight matrix
+		This is a single matrix multiply against the whole block
+		'''
+		mat = self.getWeights(weights)
+		if mat.ndim != 2:
+			raise ValueError("Batch weights must be 2 dimensional")
+		return np.dot(mat, self.flat).reshape((len(mat), -1, 3))
+
+	def evaluateBatch(self, weights):
+		''' Get the posed (N, numVerts, 3) points for an (N, numShapes) weight matrix '''
+		out = self.evaluateDeltasBatch(weights)
+		out += self.rest[None, ...]
+		return out
+
+
+
+class SparseShapeMatrix(ShapeMatrix):
+	''' A ShapeMatrix that only stores the vertices each shape moves
+
+	Each row is kept CSR-style as an int32 array of the moved vertex indices
+	and a (k, 3) array of their offsets. Evaluation only touches the rows with
+	a non-zero weight, and only the vertices those rows move
+
+	Arguments:
+		tol: Offsets with no component larger than this are dropped
+	'''
+	def __init__(self, names, deltas, rest, restName=None, dtype=np.float32, tol=SPARSE_TOLERANCE):
+		self.tol = tol
+		super(SparseShapeMatrix, self).__init__(names, deltas, rest, restName=restName, dtype=dtype)
+
+	def _initStorage(self, deltas):
+		self._rows = [self._emptyRow() for _ in self._names]
+		if deltas is not None:
+			for i, d in enumerate(deltas):
+				self._setRow(i, d)
+		if self.restName in self._index:
+			self._rows[self._index[self.restName]] = self._emptyRow()
+
+	def _emptyRow(self):
+		return (np.zeros(0, dtype=np.int32), np.zeros((0, 3), dtype=self.dtype))
+
+	def _compress(self, delta):
+		delta = np.asarray(delta).reshape((-1, 3))
+		idxs = np.flatnonzero(np.abs(delta).max(axis=1) > self.tol).astype(np.int32)
+		return idxs, delta[idxs].astype(self.dtype)
+
+	def _setRow(self, idx, delta):
+		self._rows[idx] = self._compress(delta)
+
+	@classmethod
+	def fromPoints(cls, names, points, restIdx=0, dtype=np.float32, tol=SPARSE_TOLERANCE):
+		''' Build a sparse shape matrix from the full point positions of every shape '''
+		return buildShapeMatrix(names, points, restIdx=restIdx, sparse=True, dtype=dtype, tol=tol)
+
+	# Accessors
+	@property
+	def nnz(self):
+		''' The total number of stored vertex offsets '''
+		return sum(len(r[0]) for r in self._rows)
+
+	@property
+	def density(self):
+		''' The fraction of the full dense block that is actually stored '''
+		total = len(self._names) * self.numVerts
+		if not total:
+			return 0.0
+		return self.nnz / float(total)
+
+	def getRow(self, name):
+		''' Get the (indices, offsets) pair for a shape. These are not copies '''
+		return self._rows[self._index[name]]
+
+	def _expand(self, row, out=None):
+		if out is None:
+			out = np.zeros((self.numVerts, 3), dtype=self.dtype)
+		idxs, vals = row
+		out[idxs] = vals
+		return out
+
+	@property
+	def flat(self):
+		''' A dense (numShapes, numVerts*3) copy of the offsets '''
+		return self.toDeltas().reshape((len(self._names), -1))
+
+	@property
+	def deltas(self):
+		''' A dense (numShapes, numVerts, 3) copy of the offsets '''
+		return self.toDeltas()
+
+	def toDeltas(self):
+		out = np.zeros((len(self._names), self.numVerts, 3), dtype=self.dtype)
+		for i, row in enumerate(self._rows):
+			self._expand(row, out[i])
+		return out
+
+	def getDelta(self, name):
+		return self._expand(self._rows[self._index[name]])
+
+	def getFlatRows(self, rows):
+		out = np.zeros((len(rows), self.numVerts, 3), dtype=self.dtype)
+		for i, r in enumerate(rows):
+			self._expand(self._rows[r], out[i])
+		return out.reshape((len(rows), -1))
+
+	def getPoints(self, name):
+		idxs, vals = self._rows[self._index[name]]
+		ret = self.rest.copy()
+		ret[idxs] += vals
+		return ret
+
+	def toDense(self):
+		''' Get a dense ShapeMatrix copy of this data '''
+		ret = ShapeMatrix(self._names, None, self.rest, restName=self.restName, dtype=self.dtype)
+		# Expand straight into the block so we don't make an extra full copy
+		out = ret.deltas
+		for i, row in enumerate(self._rows):
+			self._expand(row, out[i])
+		return ret
+
+	def toSparse(self, tol=SPARSE_TOLERANCE):
+		return self
+
+	# Editing
+	def addShape(self, name, points=None):
+		if name in self._index:
+			raise ValueError("Shape already exists: {0}".format(name))
+		idx = len(self._names)
+		self._names.append(name)
+		self._index[name] = idx
+		self._rows.append(self._emptyRow())
+		if points is not None:
+			self.setPoints(name, points)
+		return idx
+
+	def setDelta(self, name, delta):
+		if name == self.restName:
+			return
+		self._setRow(self._index[name], delta)
+
+	def setPoints(self, name, points):
+		''' Set the full point positions of a shape, adding it if required '''
+		points = np.asarray(points, dtype=np.float64)
+		if self.rest is None:
+			# The first shape in an empty matrix defines the offsets
+			self.rest = points.copy()
+
+		if name not in self._index:
+			self.addShape(name)
+
+		if name == self.restName:
+			# Moving the rest changes the offsets of every other shape
+			# This is slow, but it keeps all the shapes in the same place
+			shift = points - self.rest
+			for i in xrange(len(self._rows)):
+				self._rows[i] = self._compress(self._expand(self._rows[i]) - shift)
+			self._rows[self._index[name]] = self._emptyRow()
+			self.rest = points.copy()
+		else:
+			self._setRow(self._index[name], points - self.rest)
+
+	def zeroShape(self, name):
+		self._rows[self._index[name]] = self._emptyRow()
+
+	def removeShape(self, name):
+		idx = self._index.pop(name, None)
+		if idx is None:
+			return
+		self._names.pop(idx)
+		self._rows.pop(idx)
+		for i in range(idx, len(self._names)):
+			self._index[self._names[i]] = i
+
+	# Evaluation
+	def evaluateDeltas(self, weights):
+		''' Get the summed (numVerts, 3) offsets for a single set of shape weights
+		Only the rows with a non-zero weight are touched
+		'''
+		vec = self.getWeights(weights)
+		out = np.zeros((self.numVerts, 3), dtype=np.float64)
+		active = np.flatnonzero(vec)
+		if not len(active):
+			return out
+
+		idxs = np.concatenate([self._rows[i][0] for i in active])
+		if not len(idxs):
+			return out
+		vals = np.concatenate([self._rows[i][1] for i in active])
+		counts = [len(self._rows[i][0]) for i in active]
+		rowWeights = np.repeat(vec[active], counts).astype(np.float64)
+		for c in range(3):
+			out[:, c] = np.bincount(idxs, weights=vals[:, c] * rowWeights, minlength=self.numVerts)
+		return out
+
+	def evaluateDeltasBatch(self, weights):
+		''' Get the summed (N, numVerts, 3) offsets for an (N, numShapes) weight matrix '''
+		mat = self.getWeights(weights)
+		if mat.ndim != 2:
+			raise ValueError("Batch weights must be 2 dimensional")
+		out = np.zeros((len(mat), self.numVerts, 3), dtype=np.float64)
+		for i in np.flatnonzero(np.any(mat, axis=0)):
+			idxs, vals = self._rows[i]
+			if len(idxs):
+				out[:, idxs] += mat[:, i, None, None] * vals[None, ...]
+		return out
+
+	def evaluateBatch(self, weights):
+		''' Get the posed (N, numVerts, 3) points for an (N, numShapes) weight matrix '''
+		out = self.evaluateDeltasBatch(weights)
+		out += self.rest[None, ...]
+		return out
+
+
+class LazyShapeMatrix(object):
+	''' Shape storage that only decodes a shape when something asks for it
+
+	Shapes are read by sample index through the loader, and the most recently
+	used samples are kept in a bounded cache. Any shape that gets set or added
+	is stored in full, and always wins over the loader
+
+	Arguments:
+		names: The shape names in sample order
+		loader: A callable that takes a sample index and returns (numVerts, 3) points
+		restIdx: The index of the rest shape
+		cacheSize: The max number of decoded samples to keep
+	'''
+	def __init__(self, names, loader, restIdx=0, cacheSize=LAZY_CACHE_SIZE):
+		self._names = list(names)
+		self._index = {n: i for i, n in enumerate(self._names)}
+		self._sampleByName = dict(self._index)
+		self._loader = loader
+		self._cacheSize = cacheSize
+		self._cache = OrderedDict()
+		self._edits = {}
+		self.restName = self._names[restIdx]
+		self.rest = np.array(loader(restIdx), dtype=np.float64)
+
+	@property
+	def names(self):
+		return list(self._names)
+
+	@property
+	def numShapes(self):
+		return len(self._names)
+
+	@property
+	def numVerts(self):
+		return len(self.rest)
+
+	def __len__(self):
+		return len(self._names)
+
+	def __contains__(self, name):
+		return name in self._index
+
+	def getRowIndex(self, name):
+		return self._index[name]
+
+	def _loadSample(self, idx):
+		pts = self._cache.pop(idx, None)
+		if pts is None:
+			pts = np.asarray(self._loader(idx))
+			while len(self._cache) >= self._cacheSize:
+				self._cache.popitem(last=False)
+		self._cache[idx] = pts
+		return pts
+
+	def getPoints(self, name):
+		if name in self._edits:
+			return self._edits[name]
+		if name == self.restName:
+			return self.rest
+		if name not in self._index:
+			raise KeyError(name)
+		return self._loadSample(self._sampleByName[name])
+
+	def getDelta(self, name):
+		return self.getPoints(name) - self.rest
+
+	def iterPoints(self):
+		''' Yield the points of every shape in row order without caching them '''
+		for name in self._names:
+			if name in self._edits:
+				yield self._edits[name]
+			elif name == self.restName:
+				yield self.rest
+			elif self._sampleByName[name] in self._cache:
+				yield self._cache[self._sampleByName[name]]
+			else:
+				yield self._loader(self._sampleByName[name])
+
+	def toShapeMatrix(self, sparse=None, dtype=np.float32):
+		''' Decode everything into a ShapeMatrix or SparseShapeMatrix '''
+		return buildShapeMatrix(self._names, self.iterPoints(), restIdx=self._index[self.restName], sparse=sparse, dtype=dtype)
+
+	# Editing
+	def addShape(self, name, points=None):
+		if name in self._index:
+			raise ValueError("Shape already exists: {0}".format(name))
+		idx = len(self._names)
+		self._names.append(name)
+		self._index[name] = idx
+		self.setPoints(name, self.rest if points is None else points)
+		return idx
+
+	def setPoints(self, name, points):
+		if name not in self._index:
+			self.addShape(name, points)
+			return
+		points = np.array(points)
+		if name == self.restName:
+			self.rest = np.array(points, dtype=np.float64)
+		self._edits[name] = points
+
+	def setDelta(self, name, delta):
+		if name == self.restName:
+			return
+		self.setPoints(name, self.rest + delta)
+
+	def zeroShape(self, name):
+		self.setPoints(name, self.rest)
+
+	def removeShape(self, name):
+		idx = self._index.pop(name, None)
+		if idx is None:
+			return
+		self._names.pop(idx)
+		self._edits.pop(name, None)
+		self._sampleByName.pop(name, None)
+		for i in range(idx, len(self._names)):
+			self._index[self._names[i]] = i
+
+	def renameShape(self, name, newName):
+		if name == newName or name not in self._index:
+			return
+		idx = self._index.pop(name)
+		self._names[idx] = newName
+		self._index[newName] = idx
+		if name in self._edits:
+			self._edits[newName] = self._edits.pop(name)
+		if name in self._sampleByName:
+			self._sampleByName[newName] = self._sampleByName.pop(name)
+		if self.restName == name:
+			self.restName = newName
+
+
+def _sampleDensity(rest, samples, tol=SPARSE_TOLERANCE):
+	''' Get the fraction of the vertices that some shapes move '''
+	rest = np.asarray(rest).reshape((-1, 3))
+	moved, total = 0, 0
+	for pts in samples:
+		delta = np.asarray(pts).reshape((-1, 3)) - rest
+		moved += np.count_nonzero(np.abs(delta).max(axis=1) > tol)
+		total += len(rest)
+	if not total:
+		return 0.0
+	return moved / float(total)
+
+def buildShapeMatrix(names, samples, restIdx=0, sparse=None, dtype=np.float32, tol=SPARSE_TOLERANCE):
+	''' Build a shape matrix from an iterable of full point positions
+
+	The samples are consumed one at a time, so a sparse matrix never needs the
+	whole dense stack in memory at once
+
+	Arguments:
+		names: The shape names in sample order
+		samples: An iterable of (numVerts, 3) point positions, one per name
+		restIdx: The index of the rest shape
+		sparse: True for a SparseShapeMatrix, False for a dense ShapeMatrix,
+			or None to choose based on how many vertices a sample of the shapes move.
+			Shapes are spread across the whole list if samples can be indexed,
+			otherwise the first few are used
+		dtype: The datatype of the offsets
+		tol: The sparse tolerance
+
+	Returns:
+		ShapeMatrix or SparseShapeMatrix
+	'''
+	names = list(names)
+	if sparse is None:
+		density = 0.0
+		if hasattr(samples, '__getitem__') and hasattr(samples, '__len__'):
+			if len(samples) > restIdx:
+				picks = np.linspace(0, len(samples) - 1, SPARSE_SAMPLE_COUNT + 1).astype(int)
+				picks = sorted(set(picks.tolist()) - set([restIdx]))
+				density = _sampleDensity(samples[restIdx], (samples[i] for i in picks), tol=tol)
+		else:
+			# Peek at the first few shapes, then put them back on the front of the stream
+			samples = iter(samples)
+			head = list(itertools.islice(samples, restIdx + 1 + SPARSE_SAMPLE_COUNT))
+			samples = itertools.chain(head, samples)
+			if len(head) > restIdx:
+				density = _sampleDensity(head[restIdx], head[:restIdx] + head[restIdx + 1:], tol=tol)
+		sparse = density <= SPARSE_DENSITY
+
+	if sparse:
+		cls = SparseShapeMatrix
+		kwargs = {'tol': tol}
+	else:
+		cls = ShapeMatrix
+		kwargs = {}
+
+	ret = None
+	pending = []
+	for i, pts in enumerate(samples):
+		if i < restIdx:
+			# Only happens when the rest isn't the first shape
+			pending.append(pts)
+			continue
+
+		if i == restIdx:
+			ret = cls(names, None, pts, restName=names[restIdx], dtype=dtype, **kwargs)
+			for j, p in enumerate(pending):
+				ret._setRow(j, np.asarray(p) - ret.rest)
+			pending = None
+		else:
+			ret._setRow(i, np.asarray(pts) - ret.rest)
+
+	if ret is None:
+		raise ValueError("The rest shape is missing from the samples")
+	return ret
@@ -0,0 +1,416 @@
+'''
+Copyright 2016, Blur Studio
+
+This file is part of Simplex.
+
+Simplex is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Simplex is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Simplex.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+""" Split a simplex system without copying any of the interface objects
+
+The system is handled as its (v2) definition dictionary, and the shapes as a
+ShapeMatrix. Every split shape is just a row of the original matrix times a
+product of falloff weights, so the new shape block is built once at the very
+end with one broadcast multiply per unique set of falloffs
+"""
+import os
+import multiprocessing
+from collections import OrderedDict
+from functools import partial
+from itertools import izip
+from multiprocessing.pool import ThreadPool
+from SimplexUI.commands.shapeMatrix import SparseShapeMatrix
+from SimplexUI.Qt.QtWidgets import QApplication
+
+# The number of rows to multiply at once when building the new shape block
+SPLIT_CHUNK = 64
+
+# Set this environment variable to the number of threads used to build the
+# split shapes. By default, one thread per cpu is used
+SPLIT_WORKERS_ENV = 'SIMPLEX_SPLIT_WORKERS'
+
+
+def _link(simpDict):
+	''' Copy the definition entries, and turn their index references into object references '''
+	shapes = []
+	for s in simpDict['shapes']:
+		x = dict(s)
+		x['_src'] = s['name'] # The row this shape's data comes from
+		x['_mul'] = () # The (falloffIndex, side) pairs applied to the row
+		x['_kind'] = 'Shape'
+		shapes.append(x)
+
+	progs = []
+	for p in simpDict['progressions']:
+		x = dict(p)
+		x['pairs'] = [[shapes[s], v] for s, v in p['pairs']]
+		x['falloffs'] = list(p.get('falloffs', []))
+		x['_kind'] = 'Progression'
+		progs.append(x)
+
+	sliders = []
+	for s in simpDict['sliders']:
+		x = dict(s)
+		x['prog'] = progs[s['prog']]
+		x['_kind'] = 'Slider'
+		sliders.append(x)
+
+	combos = []
+	for c in simpDict['combos']:
+		x = dict(c)
+		x['prog'] = progs[c['prog']]
+		x['pairs'] = [[sliders[s], v] for s, v in c['pairs']]
+		x['_kind'] = 'Combo'
+		combos.append(x)
+
+	travs = []
+	for t in simpDict['traversals']:
+		x = dict(t)
+		x['prog'] = progs[t['prog']]
+		for key in ('progress', 'multiplier'):
+			ctrls = sliders if t[key + 'Type'].lower() == 'slider' else combos
+			x[key + 'Control'] = ctrls[t[key + 'Control']]
+		x['_kind'] = 'Traversal'
+		travs.append(x)
+
+	return shapes, progs, sliders, combos, travs
+
+
+def _clean(entry):
+	''' Copy an entry without the private keys used while splitting '''
+	return {k: v for k, v in entry.iteritems() if not k.startswith('_')}
+
+
+def _unlink(simpDict, shapes, sliders, combos, travs):
+	''' Turn the object references back into indices, and build a new definition
+
+	Any entry that was replaced by a split, but is still referenced by something
+	that couldn't be split, is appended to the end of its list so the new
+	definition is always valid
+	'''
+	shapeIdx = {id(s): i for i, s in enumerate(shapes)}
+	sliderIdx = {id(s): i for i, s in enumerate(sliders)}
+	comboIdx = {id(c): i for i, c in enumerate(combos)}
+	progIdx = {}
+	progs = []
+	outShapes = list(shapes)
+	outSliders = list(sliders)
+	outCombos = list(combos)
+
+	def getIndex(entry, idxs, lst):
+		if id(entry) not in idxs:
+			idxs[id(entry)] = len(lst)
+			lst.append(entry)
+		return idxs[id(entry)]
+
+	def getProgIndex(prog):
+		if id(prog) not in progIdx:
+			x = _clean(prog)
+			x['pairs'] = [[getIndex(s, shapeIdx, outShapes), v] for s, v in prog['pairs']]
+			progIdx[id(prog)] = len(progs)
+			progs.append(x)
+		return progIdx[id(prog)]
+
+	def getCtrlIndex(ctrl):
+		if ctrl['_kind'] == 'Slider':
+			return getIndex(ctrl, sliderIdx, outSliders)
+		return getIndex(ctrl, comboIdx, outCombos)
+
+	newSliders, newCombos, newTravs = [], [], []
+	def flush():
+		# Loop until nothing new gets appended
+		grew = True
+		while grew:
+			grew = False
+			while len(newSliders) < len(outSliders):
+				sl = outSliders[len(newSliders)]
+				x = _clean(sl)
+				x['prog'] = getProgIndex(sl['prog'])
+				newSliders.append(x)
+				grew = True
+			while len(newCombos) < len(outCombos):
+				c = outCombos[len(newCombos)]
+				x = _clean(c)
+				x['prog'] = getProgIndex(c['prog'])
+				x['pairs'] = [[getIndex(cs, sliderIdx, outSliders), v] for cs, v in c['pairs']]
+				newCombos.append(x)
+				grew = True
+
+	flush()
+	for t in travs:
+		x = _clean(t)
+		x['prog'] = getProgIndex(t['prog'])
+		for key in ('progress', 'multiplier'):
+			ctrl = t[key + 'Control']
+			x[key + 'Type'] = ctrl['_kind']
+			x[key + 'Control'] = getCtrlIndex(ctrl)
+		newTravs.append(x)
+	flush()
+
+	newShapes = [_clean(sh) for sh in outShapes]
+
+	ret = dict(simpDict)
+	ret['encodingVersion'] = 2
+	ret['shapes'] = newShapes
+	ret['progressions'] = progs
+	ret['sliders'] = newSliders
+	ret['combos'] = newCombos
+	ret['traversals'] = newTravs
+	return ret, outShapes
+
+
+def _splitAxis(lists, foList, falloffs):
+	''' Split all the entries affected by a list of falloffs that share an axis '''
+	shapes, progs, sliders, combos, travs = lists
+
+	owner = {}
+	for ctrl in sliders + combos + travs:
+		owner[id(ctrl['prog'])] = ctrl
+
+	downCombos = {}
+	for c in combos:
+		for s, _ in c['pairs']:
+			downCombos.setdefault(id(s), []).append(c)
+	downTravs = {}
+	for t in travs:
+		downTravs.setdefault(id(t['progressControl']), []).append(t)
+		if t['multiplierControl'] is not t['progressControl']:
+			downTravs.setdefault(id(t['multiplierControl']), []).append(t)
+
+	# Figure out which falloff each entry gets split by
+	# If there's more than one option, the first falloff in the list wins
+	splitBySet = OrderedDict()
+	def add(entry, fo):
+		splitBySet.setdefault(id(entry), (entry, set()))[1].add(fo)
+
+	for prog in progs:
+		sect = [f for f in foList if f in prog['falloffs']]
+		if not sect:
+			continue
+		fo = sect[0]
+		ctrl = owner.get(id(prog))
+		add(prog, fo)
+		for s, _ in prog['pairs']:
+			add(s, fo)
+		if ctrl is None:
+			continue
+		add(ctrl, fo)
+
+		dss = []
+		if ctrl['_kind'] == 'Slider':
+			dss.extend(downCombos.get(id(ctrl), []))
+		if ctrl['_kind'] in ('Slider', 'Combo'):
+			dss.extend(downTravs.get(id(ctrl), []))
+		for ds in dss:
+			add(ds, fo)
+			add(ds['prog'], fo)
+			for s, _ in ds['prog']['pairs']:
+				add(s, fo)
+
+	namer = falloffs[foList[0]]
+	rest = shapes[0]
+	splitBy = {}
+	for key, (entry, foSet) in splitBySet.iteritems():
+		if entry is rest:
+			continue
+		# If I can't apply a sided name to this item, then it can't be split
+		if namer.getSidedName(entry['name'], 0) == entry['name']:
+			continue
+		splitBy[key] = min(foSet, key=foList.index)
+
+	if not splitBy:
+		return lists
+
+	# Make the left and right copies
+	sides = ({}, {})
+	for key, foIdx in splitBy.iteritems():
+		entry = splitBySet[key][0]
+		fo = falloffs[foIdx]
+		for sIdx, side in enumerate(sides):
+			x = dict(entry)
+			x['name'] = fo.getSidedName(entry['name'], sIdx)
+			if '_mul' in entry:
+				x['_mul'] = entry['_mul'] + ((foIdx, sIdx),)
+			side[key] = x
+
+	# Point the copies at the other copies on the same side
+	for side in sides:
+		def get(entry):
+			return side.get(id(entry), entry)
+		for x in side.itervalues():
+			if 'prog' in x:
+				x['prog'] = get(x['prog'])
+			if x['_kind'] in ('Combo', 'Progression'):
+				x['pairs'] = [[get(s), v] for s, v in x['pairs']]
+			if x['_kind'] == 'Traversal':
+				x['progressControl'] = get(x['progressControl'])
+				x['multiplierControl'] = get(x['multiplierControl'])
+
+	# Put the copies in place of the originals
+	def replace(lst):
+		out = []
+		for entry in lst:
+			if id(entry) in splitBy:
+				out.append(sides[0][id(entry)])
+				out.append(sides[1][id(entry)])
+			else:
+				out.append(entry)
+		return out
+
+	return [replace(lst) for lst in lists]
+
+
+def getSplitWorkers(workers=None):
+	''' Get the number of threads to build the split shapes with
+	If workers isn't given, use the SIMPLEX_SPLIT_WORKERS environment
+	variable, or the number of cpus
+	'''
+	if workers is None:
+		workers = os.environ.get(SPLIT_WORKERS_ENV)
+	if workers is None:
+		try:
+			workers = multiprocessing.cpu_count()
+		except NotImplementedError:
+			workers = 1
+	return max(int(workers), 1)
+
+
+def _splitChunk(matrix, out, task):
+	''' Weight one chunk of source rows into the output matrix
+	Dense chunks are written straight into their own rows of the output
+	Sparse chunks are compressed here, but returned so they can be stored in order
+	'''
+	oRows, srcRows, weights = task
+	block = matrix.getFlatRows(srcRows)
+	if weights is not None:
+		block = block.reshape((len(oRows), -1, 3))
+		block *= weights[None, :, None]
+		block = block.reshape((len(oRows), -1))
+	if isinstance(out, SparseShapeMatrix):
+		return [out._compress(data) for data in block]
+	out.flat[oRows] = block
+	return None
+
+
+def _buildMatrix(shapes, matrix, falloffs, weights, workers=1, pBar=None):
+	''' Build the new shape block with one broadcast multiply per set of falloffs
+
+	The work is split into chunks of rows that never overlap, so they can be
+	handed out to a pool of threads. Numpy releases the GIL for the multiplies
+	and the results are always stored in row order
+	'''
+	names = [s['name'] for s in shapes]
+	if isinstance(matrix, SparseShapeMatrix):
+		out = SparseShapeMatrix(names, None, matrix.rest, restName=names[0], dtype=matrix.dtype, tol=matrix.tol)
+	else:
+		out = type(matrix)(names, None, matrix.rest, restName=names[0], dtype=matrix.dtype)
+
+	groups = OrderedDict()
+	for i, s in enumerate(shapes):
+		outRows, srcRows = groups.setdefault(s['_mul'], ([], []))
+		outRows.append(i)
+		srcRows.append(matrix.getRowIndex(s['_src']))
+
+	tasks = []
+	for mul, (outRows, srcRows) in groups.iteritems():
+		mulWeights = None
+		for foIdx, sIdx in mul:
+			w = weights[falloffs[foIdx]]
+			if sIdx == 1:
+				w = 1 - w
+			mulWeights = w if mulWeights is None else mulWeights * w
+		if mulWeights is not None:
+			mulWeights = mulWeights.astype(out.dtype)
+
+		for start in xrange(0, len(outRows), SPLIT_CHUNK):
+			tasks.append((outRows[start:start + SPLIT_CHUNK], srcRows[start:start + SPLIT_CHUNK], mulWeights))
+
+	if pBar is not None:
+		pBar.setMaximum(len(tasks))
+		pBar.setValue(0)
+
+	func = partial(_splitChunk, matrix, out)
+	pool = None
+	if workers > 1 and len(tasks) > 1:
+		pool = ThreadPool(min(workers, len(tasks)))
+		results = pool.imap(func, tasks)
+	else:
+		results = (func(t) for t in tasks)
+
+	try:
+		for i, (task, rows) in enumerate(izip(tasks, results)):
+			if rows is not None:
+				for row, data in izip(task[0], rows):
+					out._rows[row] = data
+			if pBar is not None:
+				pBar.setValue(i + 1)
+				QApplication.processEvents()
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+	return out
+
+
+def splitDefinition(simpDict, matrix, falloffs, weights=None, pBar=None, workers=None):
+	''' Split a simplex definition and its shapes along all of its falloffs
+
+	Arguments:
+		simpDict: A version 2 simplex definition dictionary. This isn't modified
+		matrix: A ShapeMatrix (or SparseShapeMatrix) with a row for every shape
+		falloffs: Objects matching the definition's falloff list that have
+			an .axis and a .getSidedName(name, sideIndex) method.
+			The Falloff class works
+		weights: An optional {falloff: weights} dictionary with the weights of
+			every planar falloff on the rest shape. Defaults to each falloff's
+			own .weights
+		pBar: An optional progress bar
+		workers: The number of threads to build the split shapes with.
+			See getSplitWorkers for the default
+
+	Returns:
+		dict: The new definition
+		ShapeMatrix: The new shapes, in the same order as the definition
+	'''
+	if simpDict['encodingVersion'] != 2:
+		raise ValueError("Splitting requires a version 2 definition")
+
+	if weights is None:
+		weights = {fo: fo.weights for fo in falloffs if fo.axis is not None}
+
+	lists = list(_link(simpDict))
+
+	foByAxis = OrderedDict()
+	for i, fo in enumerate(falloffs):
+		if fo.axis is None:
+			continue
+		foByAxis.setdefault(fo.axis.lower(), []).append(i)
+
+	for axis, foList in foByAxis.iteritems():
+		if pBar is not None:
+			pBar.setLabelText("Splitting On {0} axis".format(axis))
+			QApplication.processEvents()
+		else:
+			print "Splitting On {0} axis".format(axis)
+		lists = _splitAxis(lists, foList, falloffs)
+
+	shapes, progs, sliders, combos, travs = lists
+	newDict, shapes = _unlink(simpDict, shapes, sliders, combos, travs)
+
+	if pBar is not None:
+		pBar.setLabelText("Building Split Shapes")
+		QApplication.processEvents()
+	newMatrix = _buildMatrix(shapes, matrix, falloffs, weights, workers=getSplitWorkers(workers), pBar=pBar)
+	return newDict, newMatrix
+
@@ -23,232 +23,343 @@ Basically, I just delete the unused vertices and edges. I *don't* try to
 re-create what the input geometry would have been before subdividing, I'm
 just making it easy to get a quick low-res mesh for animation use.
 """
-import json
+import os, json
+import numpy as np
 
 from alembic.Abc import IArchive, OArchive, OStringProperty
 from alembic.AbcGeom import IPolyMesh, OPolyMesh, IXform, OXform, OPolyMeshSchemaSample
 
-from alembicCommon import mkSampleVertexPoints, getSampleArray, mkArray
+from alembicCommon import mkSampleVertexPoints, getFaceArrays, iterSampleArrays, mkArray
 from imath import IntArray
 
 from SimplexUI.Qt.QtWidgets import QApplication
 
-def parseAbc(path):
-	""" Read an .abc file and produce a Mesh object
+def loadAbc(path):
+	""" Open an .abc file and get its simplex xform and mesh
 
 	Args:
 		path: The path to the .abc formatted file
 
 	Returns:
-		A list of vertices and the face connectivity
+		The archive, the xform, and the mesh. Keep the archive
+		around for as long as the others are in use
 
 	Raises:
 		IOError: If the file cannot be opened
 	"""
-
 	iarch = IArchive(str(path)) # because alembic hates unicode
 	top = iarch.getTop()
 	ixfo = IXform(top, top.children[0].getName())
-	mesh = IPolyMesh(ixfo, ixfo.children[0].getName())
-
-	sch = mesh.getSchema()
-	rawVerts = sch.getPositionsProperty().samples[0]
-	rawFaces = sch.getFaceIndicesProperty().samples[0]
-	rawCounts = sch.getFaceCountsProperty().samples[0]
-
-	faces = []
-	faceCounter = 0
-	for count in rawCounts:
-		f = list(rawFaces[faceCounter: faceCounter+count])
-		# Ignoring UV/Normal data for now
-		faces.append(f)
-		faceCounter += count
-
-	verts = []
-	for v in rawVerts:
-		verts.append(list(v))
-
-	return verts, faces
-
-def buildEdgeAdjacency(faces):
-	''' Build a dictionary with vert indices as keys,
-	and a list of edge-adjacent vert indices as the value
+	imesh = IPolyMesh(ixfo, ixfo.children[0].getName())
+	return iarch, ixfo, imesh
+
+def parseAbc(imesh):
+	""" Read the topology of an alembic mesh
+
+	Args:
+		imesh: The IPolyMesh to read
+
+	Returns:
+		The number of vertices, and the flat face vertex indices,
+		face vertex counts, and face offsets
+	"""
+	# Ignoring UV/Normal data for now
+	numVerts = len(imesh.getSchema().getPositionsProperty().samples[0])
+	faceIdxs, faceCounts, offsets = getFaceArrays(imesh)
+	return numVerts, faceIdxs, faceCounts, offsets
+
+def _faceOffsets(faceCounts, offsets):
+	''' Get the face index of every face-vertex, and the
+	offset of every face-vertex from the start of its face
+	'''
+	faceOf = np.repeat(np.arange(len(faceCounts)), faceCounts)
+	local = np.arange(len(faceOf)) - offsets[faceOf]
+	return faceOf, local
+
+def _shiftFaces(faceCounts, offsets, shift):
+	''' Get the flat index of the face-vertex `shift` places
+	around the face from every face-vertex
+	'''
+	faceOf, local = _faceOffsets(faceCounts, offsets)
+	return offsets[faceOf] + (local + shift) % faceCounts[faceOf]
+
+def _buildCsr(src, dst, numVerts):
+	''' Build a symmetric CSR adjacency from pairs of vert indices
+
+	Returns:
+		indptr: The (numVerts + 1,) row offsets into the indices
+		indices: The sorted neighbors of each vert
+	'''
+	src = np.asarray(src, dtype=np.int64)
+	dst = np.asarray(dst, dtype=np.int64)
+	keys = np.unique(np.concatenate((src * numVerts + dst, dst * numVerts + src)))
+	rows = keys // numVerts
+	indptr = np.zeros(numVerts + 1, dtype=np.int64)
+	np.cumsum(np.bincount(rows, minlength=numVerts), out=indptr[1:])
+	return indptr, (keys % numVerts).astype(np.int32)
+
+def buildEdgeAdjacency(faceIdxs, faceCounts, offsets, numVerts):
+	''' Build a CSR adjacency of the edge-adjacent vert indices
+	as an (indptr, indices) pair
+	'''
+	pre = _shiftFaces(faceCounts, offsets, -1)
+	return _buildCsr(faceIdxs, faceIdxs[pre], numVerts)
+
+def buildDiagonalAdjacency(faceIdxs, faceCounts, offsets, numVerts):
+	''' Build a CSR adjacency of the quad-diagonal vert indices
+	as an (indptr, indices) pair
 	'''
-	adj = {}
-	for face in faces:
-		for i in range(len(face)):
-			adj.setdefault(face[i], set()).add(face[i-1])
-			adj.setdefault(face[i-1], set()).add(face[i])
-	return adj
-
-def buildDiagonalAdjacency(faces):
-	''' Build a dictionary with vert indices as keys,
-	and a list of quad-diagonal vert indices as the value
+	quads = np.repeat(faceCounts == 4, faceCounts)
+	opp = _shiftFaces(faceCounts, offsets, 2)
+	return _buildCsr(faceIdxs[quads], faceIdxs[opp[quads]], numVerts)
+
+def getNeighbors(verts, adj):
+	''' Get the concatenated neighbors of an array of verts
+	This is the column gather of a sparse matrix-vector product
 	'''
-	adj = {}
-	for face in faces:
-		if len(face) != 4:
-			continue
-		for i in range(len(face)):
-			adj.setdefault(face[i], set()).add(face[i-2])
-			adj.setdefault(face[i-2], set()).add(face[i])
-	return adj
+	indptr, indices = adj
+	verts = np.asarray(verts, dtype=np.int64)
+	starts = indptr[verts]
+	lens = indptr[verts + 1] - starts
+	total = lens.sum()
+	if not total:
+		return np.zeros(0, dtype=indices.dtype)
+	offsets = np.repeat(starts - (np.cumsum(lens) - lens), lens)
+	return indices[offsets + np.arange(total)]
 
 def growByAdjacency(growSet, exclude, adj):
-	''' Grow a set of verts along an adjacency dict
+	''' Grow an array of verts along a CSR adjacency
 	Args:
-		growSet: A set of Vertices to grow.
-		exclude: A set of Vertices to exclude from
-			the growth
+		growSet: An array of Vertices to grow.
+		exclude: A boolean mask of Vertices to exclude from
+			the growth. This is updated in place
 
 	Returns:
-		newGrowSet: the grown verts
-		newExclude: the next set of verts to exclude
+		newGrowSet: the sorted grown verts
+		newExclude: the next mask of verts to exclude
 	'''
-	grown = set()
-	for vert in growSet:
-		grown.update(adj.get(vert, []))
-	newgrown = grown - exclude
-	newexclude = exclude | growSet
-	return newgrown, newexclude
+	grown = getNeighbors(growSet, adj)
+	newgrown = np.unique(grown[~exclude[grown]])
+	exclude[growSet] = True
+	return newgrown, exclude
 
 def partitionVerts(hints, adj, diag):
 	''' Partition a subdivided mesh's vertices into
 	originals , Added edge verts, and added center verts
+	Only the newly found verts are grown on each step,
+	the verts from earlier steps can only reach excluded verts
 	'''
-	originals = set(hints)
-	centers = set()
-	exclude = set(hints)
-
+	numVerts = len(adj[0]) - 1
+	hints = np.unique(np.asarray(hints, dtype=np.int64))
+	originals = np.zeros(numVerts, dtype=bool)
+	centers = np.zeros(numVerts, dtype=bool)
+	exclude = np.zeros(numVerts, dtype=bool)
+	originals[hints] = True
+	exclude[hints] = True
+
+	front = hints
 	while True:
-		newCorners, exclude = growByAdjacency(originals, exclude, diag)
-		if not newCorners:
+		newCorners, exclude = growByAdjacency(front, exclude, diag)
+		if not len(newCorners):
 			break
-		centers.update(newCorners)
+		centers[newCorners] = True
 
-		newCenters, exclude = growByAdjacency(centers, exclude, diag)
-		if not newCenters:
+		newCenters, exclude = growByAdjacency(newCorners, exclude, diag)
+		if not len(newCenters):
 			break
-		originals.update(newCenters)
+		originals[newCenters] = True
+		front = newCenters
 
+	originals = np.flatnonzero(originals)
 	edges, exc = growByAdjacency(originals, exclude, adj)
 
-	if edges & centers:
+	if centers[edges].any():
 		raise ValueError("The input mesh was not a perfect subdivision")
 
-	return originals, edges, centers
+	return originals, edges, np.flatnonzero(centers)
 
-def buildNewFaces(faces, centers, diag):
+def buildNewFaces(faceIdxs, faceCounts, offsets, centers):
 	''' Build a new set of faces by removing
 	center verts and the adjacent edgeVerts
+
+	Every face around a center is a quad that goes (center, edge, corner, edge).
+	The next face around the center is the one whose first edge vert is this
+	face's last edge vert, so each new face is those corners in that order.
+	The new faces are ordered by their center vert
+
+	Returns:
+		The flat face vertex indices, face vertex counts, and face offsets of the new faces
 	'''
-	faceIdxsByVert = {}
-	for i, face in enumerate(faces):
-		for f in face:
-			faceIdxsByVert.setdefault(f, set()).add(i)
-
-	newFaces = []
-	for center in centers:
-		corners = diag[center]
-		centerFaceIdxs = faceIdxsByVert[center]
-
-		newFace = []
-		c = corners.pop()
-		while c not in newFace:
-			newFace.append(c)
-			cornerFaceIdxs = faceIdxsByVert[c] & centerFaceIdxs
-			cornerFaceIdx = cornerFaceIdxs.pop()
-			face = faces[cornerFaceIdx]
-
-			pre = face[face.index(c) - 1]
-			edgeFaceIdxs = faceIdxsByVert[pre] & centerFaceIdxs
-			edgeFaceIdxs.remove(cornerFaceIdx)
-			preFaceIdx = edgeFaceIdxs.pop()
-			preFace = faces[preFaceIdx]
-
-			c = preFace[preFace.index(pre) - 1]
-		newFace.reverse()
-		newFaces.append(newFace)
-
-	return newFaces
-
-def squashFaces(faces):
-	''' Take a list of unsubdivided faces and
-	squash the indices into a continuous range
-	'''
-	kept = set()
-	for f in faces:
-		kept |= set(f)
-	kept = sorted(list(kept))
+	numVerts = max(faceIdxs.max(), centers.max()) + 1 if len(centers) else 0
+	isCenter = np.zeros(numVerts, dtype=bool)
+	isCenter[centers] = True
 
-	# build the reverse accessor
-	rev = {k: i for i, k in enumerate(kept)}
+	recs = np.flatnonzero(isCenter[faceIdxs])
+	faceOf, local = _faceOffsets(faceCounts, offsets)
+	if np.any(faceCounts[faceOf[recs]] != 4):
+		raise ValueError("The input mesh was not a perfect subdivision")
+	base = offsets[faceOf[recs]]
+	local = local[recs]
+	center = faceIdxs[recs].astype(np.int64)
+	edgeA = faceIdxs[base + (local + 1) % 4]
+	corner = faceIdxs[base + (local + 2) % 4]
+	edgeB = faceIdxs[base + (local + 3) % 4]
+
+	# Find the next face around each center
+	keys = center * numVerts + edgeA
+	order = np.argsort(keys, kind='mergesort')
+	sKeys = keys[order]
+	query = center * numVerts + edgeB
+	found = np.minimum(np.searchsorted(sKeys, query), len(sKeys) - 1)
+	if np.any(sKeys[found] != query):
+		raise ValueError("The input mesh was not a perfect subdivision")
+	nxt = order[found]
+
+	# Walk around every center at the same time
+	order = np.argsort(center, kind='mergesort')
+	uCenters, firstIdx, sizes = np.unique(center[order], return_index=True, return_counts=True)
+	first = order[firstIdx]
+	newOffsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+	np.cumsum(sizes, out=newOffsets[1:])
+	outStarts = newOffsets[:-1]
+	newIdxs = np.empty(newOffsets[-1], dtype=np.int32)
+
+	cur = first.copy()
+	for step in range(sizes.max() if len(sizes) else 0):
+		active = sizes > step
+		newIdxs[outStarts[active] + step] = corner[cur[active]]
+		cur[active] = nxt[cur[active]]
+	if np.any(cur != first):
+		raise ValueError("The input mesh was not a perfect subdivision")
 
-	newFaces = []
-	for face in faces:
-		nf = []
-		for f in face:
-			nf.append(rev[f])
-		newFaces.append(nf)
+	return newIdxs, sizes.astype(np.int32), newOffsets
 
-	return newFaces, kept
+def squashFaces(faceIdxs):
+	''' Take the flat indices of the unsubdivided faces and
+	squash them into a continuous range
+	'''
+	kept = np.unique(faceIdxs)
+	newIdxs = np.searchsorted(kept, faceIdxs).astype(np.int32)
+	return newIdxs, kept
 
 def findBoundaryVerts(adj, diag):
-	''' Return a list of Vertices along the edge of a mesh '''
-	edges = []	
-	keys = list(set(adj.keys() + diag.keys()))
-	for k in keys:
-		if len(adj[k]) == 3 and len(diag[k]) == 2:
-			edges.append(k)
-		elif len(adj[k]) == 2 and len(diag[k]) == 1:
-			edges.append(k)
-	return edges
+	''' Return a boolean mask of the Vertices along the edge of a mesh '''
+	aVal = np.diff(adj[0])
+	dVal = np.diff(diag[0])
+	return ((aVal == 3) & (dVal == 2)) | ((aVal == 2) & (dVal == 1))
+
+def findIslands(adj):
+	''' Label the connected components of a CSR adjacency
+
+	Returns:
+		labels: The island index of every vert
+		count: The number of islands
+	'''
+	numVerts = len(adj[0]) - 1
+	labels = np.full(numVerts, -1, dtype=np.int64)
+	count = 0
+	seed = 0
+	while True:
+		unlabeled = labels[seed:] < 0
+		if not unlabeled.any():
+			break
+		seed += int(np.argmax(unlabeled))
+		front = np.array([seed])
+		labels[seed] = count
+		while len(front):
+			grown = getNeighbors(front, adj)
+			front = np.unique(grown[labels[grown] < 0])
+			labels[front] = count
+		count += 1
+	return labels, count
 
 def partitionIslands(adj, numVerts):
-	''' Return a list of connected island sets '''
-	allVerts = set(range(numVerts))
-	islands = []
-	while allVerts:
-		seed = set([allVerts.pop()])
-		island = set()
-		while seed:
-			seed, island = growByAdjacency(seed, island, adj)
-		islands.append(island)
-		allVerts.difference_update(island)
-	return islands
+	''' Return a list of sorted arrays of connected island verts '''
+	if len(adj[0]) - 1 != numVerts:
+		raise ValueError("The adjacency doesn't match the number of verts")
+	labels, count = findIslands(adj)
+	order = np.argsort(labels, kind='mergesort')
+	splits = np.cumsum(np.bincount(labels, minlength=count))[:-1]
+	return np.split(order, splits)
 
 def buildHints(island, edges, adj):
-	''' Find star points that are an even number of grows from an edge '''
-	edgeSet = set(edges)
-	boundaries = island  & edgeSet
-	if not boundaries:
+	''' Find star points that are an even number of grows from an edge
+
+	Args:
+		island: An array of the verts in an island
+		edges: A boolean mask of the boundary verts
+		adj: The CSR edge adjacency
+	'''
+	valence = np.diff(adj[0])
+	boundaries = island[edges[island]]
+	if not len(boundaries):
 		# Well ... we don't have any good way of dealing with this
 		# Best thing I can do is search for the highest valence verts
 		# and use one of those as the hint.
-		d = {}
-		for v in island:
-			d.setdefault(len(adj[v]), []).append(v)
-		mkey = max(d.keys())
-		return d[mkey][0]
-
-	exclude = set()
-	while boundaries:
-		for b in boundaries:
-			if len(adj[b]) != 4:
-				if b not in edgeSet:
-					return b
+		return island[np.argmax(valence[island])]
+
+	exclude = np.zeros(len(edges), dtype=bool)
+	while len(boundaries):
+		stars = boundaries[(valence[boundaries] != 4) & ~edges[boundaries]]
+		if len(stars):
+			return stars[0]
 		boundaries, exclude = growByAdjacency(boundaries, exclude, adj)
 		boundaries, exclude = growByAdjacency(boundaries, exclude, adj)
 	raise ValueError("Somehow, a mesh has boundaries, but no vert with a non-4 valence")
 
 
+def unsubdivideTopology(numVerts, faceIdxs, faceCounts, offsets):
+	''' Remove one level of subdivision from a mesh's topology
+
+	Returns:
+		The flat face vertex indices, face vertex counts, and face
+		offsets of the new faces, and the indices of the kept verts
+	'''
+	adj = buildEdgeAdjacency(faceIdxs, faceCounts, offsets, numVerts)
+	diag = buildDiagonalAdjacency(faceIdxs, faceCounts, offsets, numVerts)
+	bound = findBoundaryVerts(adj, diag)
+	islands = partitionIslands(adj, numVerts)
+	hints = [buildHints(isle, bound, adj) for isle in islands]
+
+	originals, edges, centers = partitionVerts(hints, adj, diag)
+	delIdxs, newCounts, newOffsets = buildNewFaces(faceIdxs, faceCounts, offsets, centers)
+	newIdxs, kept = squashFaces(delIdxs)
+	return newIdxs, newCounts, newOffsets, kept
+
+def unsubdivideLevels(numVerts, faceIdxs, faceCounts, offsets, levels=1):
+	''' Remove several levels of subdivision from a mesh's topology in memory
+
+	Returns:
+		A list with the (faceIdxs, faceCounts, offsets, kept) of every level.
+		Each kept array indexes into the verts of the original mesh
+	'''
+	ret = []
+	kept = np.arange(numVerts)
+	for level in range(levels):
+		print "Unsubdividing Level {0}".format(level + 1)
+		faceIdxs, faceCounts, offsets, lvlKept = unsubdivideTopology(len(kept), faceIdxs, faceCounts, offsets)
+		kept = kept[lvlKept]
+		ret.append((faceIdxs, faceCounts, offsets, kept))
+	return ret
+
+def getLodPath(outPath, level):
+	''' Get the output path of an intermediate unsubdivision level '''
+	base, ext = os.path.splitext(outPath)
+	return "{0}_lod{1}{2}".format(base, level, ext)
+
 # TODO Make this work with UV's 
-def exportUnsub(inPath, outPath, newFaces, kept, shapePrefix=None, pBar=None):
-	''' Export the unsubdivided simplex '''
-	iarch = IArchive(str(inPath)) # because alembic hates unicode
-	top = iarch.getTop()
-	ixfo = IXform(top, top.children[0].getName())
+def exportUnsub(ixfo, imesh, outputs, shapePrefix=None, pBar=None):
+	''' Export the unsubdivided simplex
+	The shapes are streamed from the already open input mesh one at a time,
+	and each one is written to every output before the next one is read
 
+	Args:
+		ixfo: The input IXform
+		imesh: The input IPolyMesh
+		outputs: A list of (outPath, faceIdxs, faceCounts, kept)
+		shapePrefix: A prefix to add to the shape names
+		pBar: An optional progress bar
+	'''
 	iprops = ixfo.getSchema().getUserProperties()
 	iprop = iprops.getProperty("simplex")
 	jsString = iprop.getValue()
@@ -262,69 +373,74 @@ def exportUnsub(inPath, outPath, newFaces, kept, shapePrefix=None, pBar=None):
 			d['shapes'] = [shapePrefix + i for i in d['shapes']]
 		jsString = json.dumps(d)
 
-	imesh = IPolyMesh(ixfo, ixfo.children[0].getName())
-
-	verts = getSampleArray(imesh)
-	verts = verts[:, kept]
-
-	indices = []
-	counts = []
-	for f in newFaces:
-		indices.extend(f)
-		counts.append(len(f))
-
-	abcCounts = mkArray(IntArray, counts)
-	abcIndices = mkArray(IntArray, indices)
-
-	# `False` for HDF5 `True` for Ogawa
-	oarch = OArchive(str(outPath), False)
-	oxfo = OXform(oarch.getTop(), ixfo.getName())
-	oprops = oxfo.getSchema().getUserProperties()
-	oprop = OStringProperty(oprops, "simplex")
-	oprop.setValue(str(jsString))
-	omesh = OPolyMesh(oxfo, imesh.getName())
-	osch = omesh.getSchema()
-
+	oarchs, writers = [], []
+	for outPath, faceIdxs, faceCounts, kept in outputs:
+		abcCounts = mkArray(IntArray, faceCounts)
+		abcIndices = mkArray(IntArray, faceIdxs)
+
+		# `False` for HDF5 `True` for Ogawa
+		oarch = OArchive(str(outPath), False)
+		oxfo = OXform(oarch.getTop(), ixfo.getName())
+		oprops = oxfo.getSchema().getUserProperties()
+		oprop = OStringProperty(oprops, "simplex")
+		oprop.setValue(str(jsString))
+		omesh = OPolyMesh(oxfo, imesh.getName())
+		oarchs.append(oarch)
+		writers.append((omesh.getSchema(), abcIndices, abcCounts, kept))
+
+	numShapes = len(imesh.getSchema().getPositionsProperty().samples)
 	if pBar is not None:
 		pBar.setValue(0)
-		pBar.setMaximum(len(verts))
+		pBar.setMaximum(numShapes)
 		pBar.setLabelText("Exporting Unsubdivided Shapes")
 		QApplication.processEvents()
 
-	for i, v in enumerate(verts):
+	for i, verts in enumerate(iterSampleArrays(imesh)):
 		if pBar is not None:
 			pBar.setValue(i)
 			QApplication.processEvents()
 		else:
 			print "Exporting Unsubdivided Shape {0: <4}\r".format(i+1),
-		sample = OPolyMeshSchemaSample(mkSampleVertexPoints(v), abcIndices, abcCounts)
-		osch.set(sample)
-	if pBar is None:
-		print "Exporting Unsubdivided Shape {0: <4}".format(len(verts))
-
-
 
+		for osch, abcIndices, abcCounts, kept in writers:
+			pts = mkSampleVertexPoints(verts[kept])
+			if i == 0:
+				sample = OPolyMeshSchemaSample(pts, abcIndices, abcCounts)
+			else:
+				sample = OPolyMeshSchemaSample()
+				sample.setPositions(pts)
+			osch.set(sample)
+	if pBar is None:
+		print "Exporting Unsubdivided Shape {0: <4}".format(numShapes)
 
+def unsubdivideSimplex(inPath, outPath, shapePrefix=None, pBar=None, levels=1, lods=False):
+	''' Unsubdivide a simplex file
 
-def unsubdivideSimplex(inPath, outPath, shapePrefix=None, pBar=None):
-	''' Unsubdivide a simplex file '''
+	Args:
+		inPath: The input .smpx path
+		outPath: The output .smpx path
+		shapePrefix: A prefix to add to the shape names
+		pBar: An optional progress bar
+		levels: The number of subdivision levels to remove
+		lods: Also write every intermediate level next to the output.
+			See getLodPath for their names
+	'''
 	print "Loading"
-	verts, faces = parseAbc(inPath)
+	iarch, ixfo, imesh = loadAbc(inPath)
+	numVerts, faceIdxs, faceCounts, offsets = parseAbc(imesh)
 
 	print "Parsing"
-	adj = buildEdgeAdjacency(faces)
-	diag = buildDiagonalAdjacency(faces)
-	bound = findBoundaryVerts(adj, diag)
-	islands = partitionIslands(adj, len(verts))
-	hints = [buildHints(isle, bound, adj) for isle in islands]
+	results = unsubdivideLevels(numVerts, faceIdxs, faceCounts, offsets, levels=levels)
 
-	print "Unsubdividing"
-	originals, edges, centers = partitionVerts(hints, adj, diag)
-	delFaces = buildNewFaces(faces, centers, diag)
-	newFaces, kept = squashFaces(delFaces)
+	outputs = []
+	for level, (newIdxs, newCounts, newOffsets, kept) in enumerate(results, 1):
+		if level == levels:
+			outputs.append((outPath, newIdxs, newCounts, kept))
+		elif lods:
+			outputs.append((getLodPath(outPath, level), newIdxs, newCounts, kept))
 
 	print "Exporting"
-	exportUnsub(inPath, outPath, newFaces, kept, shapePrefix=shapePrefix, pBar=pBar)
+	exportUnsub(ixfo, imesh, outputs, shapePrefix=shapePrefix, pBar=pBar)
 
 	print "Done"
 
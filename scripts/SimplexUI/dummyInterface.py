@@ -21,6 +21,7 @@ along with Simplex.  If not, see <http://www.gnu.org/licenses/>.
 """ A placeholder interface that takes arguments and does nothing with them """
 import json, copy
 from contextlib import contextmanager
+from functools import partial
 from SimplexUI.Qt import QtCore
 from SimplexUI.Qt.QtCore import Signal
 from functools import wraps
@@ -28,9 +29,10 @@ try:
 	import numpy as np
 except ImportError:
 	np = None
-from SimplexUI.commands.alembicCommon import getSampleArray, mkSampleIntArray, getStaticMeshData, getUvArray, getUvSample, mkSampleVertexPoints
+from SimplexUI.commands.alembicCommon import getSampleAt, getCachedSampleArray, mkSampleIntArray, getStaticMeshData, getUvArray, getUvSample, writeSmpxSamples
+from SimplexUI.commands.shapeMatrix import ShapeMatrix, LazyShapeMatrix, buildShapeMatrix
 from SimplexUI.Qt.QtWidgets import QApplication
-from alembic.AbcGeom import OPolyMeshSchemaSample, OV2fGeomParamSample, GeometryScope
+from alembic.AbcGeom import OV2fGeomParamSample, GeometryScope
 
 # UNDO STACK INTEGRATION
 @contextmanager
@@ -74,7 +76,9 @@ class DCC(object):
 		self.mesh = DummyNode(self.name)
 		self._live = True
 		self._revision = 0
-		self._shapes = {} # hold the shapes from the .smpx file as a dict
+		self._shapes = ShapeMatrix([], None, None) # hold the shapes from the .smpx file as deltas
+		self._sparse = None # Force sparse or dense shape storage. None picks automatically
+		self._fromArchive = False # The lazy shapes are read straight out of the loaded .smpx
 		self._faces = None # Faces for the mesh (Alembic-style)
 		self._counts = None # Face counts for the mesh (Alembic-style)
 		self._uvs = None # UV data for the mesh
@@ -99,9 +103,15 @@ class DCC(object):
 	def getShapeThing(self, shapeName):
 		return DummyNode(shapeName)
 
+	def getShapeThings(self, shapeNames):
+		return {n: DummyNode(n) for n in shapeNames}
+
 	def getSliderThing(self, sliderName):
 		return DummyNode(sliderName)
 
+	def getSliderThings(self, sliderNames):
+		return {n: DummyNode(n) for n in sliderNames}
+
 	@staticmethod
 	@undoable
 	def buildRestAbc(abcMesh, name):
@@ -109,12 +119,18 @@ class DCC(object):
 
 	@undoable
 	def loadAbc(self, abcMesh, js, pBar=None):
-		shapeVerts = getSampleArray(abcMesh)
 		shapeKeys = js['shapes']
 		if js['encodingVersion'] > 1:
 			shapeKeys = [i['name'] for i in shapeKeys]
-		self._numVerts = len(shapeVerts[0])
-		self._shapes = dict(zip(shapeKeys, shapeVerts))
+		samples = getCachedSampleArray(abcMesh, write=False)
+		if samples is None:
+			# Hold onto the mesh so the shapes can be read as they're needed
+			loader = partial(getSampleAt, abcMesh)
+		else:
+			loader = samples.__getitem__
+		self._shapes = LazyShapeMatrix(shapeKeys, loader)
+		self._fromArchive = samples is None
+		self._numVerts = self._shapes.numVerts
 		self._faces, self._counts = getStaticMeshData(abcMesh)
 		self._uvs = getUvSample(abcMesh)
 
@@ -124,14 +140,46 @@ class DCC(object):
 			shape.verts = verts
 
 	def getShapeVertices(self, shape):
-		return self._shapes[shape.name]
+		return self._shapes.getPoints(shape.name)
 
 	def pushAllShapeVertices(self, shapes, pBar=None):
+		if not self._shapes and shapes:
+			# Build the whole block at once if we're starting from nothing
+			names = [s.name for s in shapes]
+			restIdx = 0
+			for i, s in enumerate(shapes):
+				if s.isRest:
+					restIdx = i
+					break
+			self._shapes = buildShapeMatrix(names, (s.verts for s in shapes), restIdx=restIdx, sparse=self._sparse)
+			self._numVerts = self._shapes.numVerts
+			return
+
 		for shape in shapes:
 			self.pushShapeVertices(shape)
 
 	def pushShapeVertices(self, shape):
-		self._shapes[shape.name] = shape.verts
+		if self._shapes.restName is None and self.simplex.restShape is not None:
+			# Make sure pushing the rest moves the offsets instead of
+			# being treated as just another shape
+			self._shapes.restName = self.simplex.restShape.name
+		self._shapes.setPoints(shape.name, shape.verts)
+
+	def getShapeMatrix(self):
+		''' Get the delta storage for all the shapes
+		This decodes any shapes that haven't been read yet
+		'''
+		if isinstance(self._shapes, LazyShapeMatrix):
+			self._shapes = self._shapes.toShapeMatrix(sparse=self._sparse)
+			self._fromArchive = False
+		return self._shapes
+
+	def releaseArchive(self):
+		''' Decode any shapes that are still read out of the loaded .smpx
+		so it isn't held open. This has to happen before that file is written over
+		'''
+		if self._fromArchive:
+			self.getShapeMatrix()
 
 	def loadMeshTopology(self):
 		# I either have the data or I don't, I can't really get it from anywhere
@@ -142,7 +190,7 @@ class DCC(object):
 		if dccMesh is None:
 			dccMesh = self.mesh
 
-		shapeDict = {i.name:i for i in self.simplex.shapes}
+		shapeDict = self.simplex.shapesByName
 
 		shapeNames = js['shapes']
 		if js['encodingVersion'] > 1:
@@ -158,20 +206,17 @@ class DCC(object):
 			pBar.setLabelText('Exporting:\n{0}'.format(spacerName))
 			QApplication.processEvents()
 
-		for i, shape in enumerate(shapes):
-			if pBar is not None:
-				pBar.setLabelText('Exporting:\n{0}'.format(shape.name))
-				pBar.setValue(i)
-				QApplication.processEvents()
-				if pBar.wasCanceled():
-					return
-			verts = mkSampleVertexPoints(self._shapes[shape.name])
-			if self._uvs is not None:
-				# Alembic doesn't allow for self._uvs=None for some reason
-				abcSample = OPolyMeshSchemaSample(verts, self._faces, self._counts, self._uvs)
-			else:
-				abcSample = OPolyMeshSchemaSample(verts, self._faces, self._counts)
-			schema.set(abcSample)
+		def shapeIter():
+			for i, shape in enumerate(shapes):
+				if pBar is not None:
+					pBar.setLabelText('Exporting:\n{0}'.format(shape.name))
+					pBar.setValue(i)
+					QApplication.processEvents()
+					if pBar.wasCanceled():
+						return
+				yield self._shapes.getPoints(shape.name)
+
+		writeSmpxSamples(schema, shapeIter(), self._faces, self._counts, uvs=self._uvs, verbose=pBar is None)
 
 	# Revision tracking
 	def getRevision(self):
@@ -196,8 +241,14 @@ class DCC(object):
 	# Shapes
 	@undoable
 	def createShape(self, shape, live=False, offset=10):
-		restVerts = self.getShapeVertices(self.simplex.restShape)
-		self._shapes[shape.name] = copy.copy(restVerts)
+		self._zeroShape(shape.name)
+
+	def _zeroShape(self, name):
+		''' Set a shape to the rest, adding it if it doesn't exist yet '''
+		if name in self._shapes:
+			self._shapes.zeroShape(name)
+		else:
+			self._shapes.addShape(name)
 
 	@undoable
 	def extractWithDeltaShape(self, shape, live=True, offset=10.0):
@@ -238,16 +289,20 @@ class DCC(object):
 
 	@undoable
 	def zeroShape(self, shape):
-		restVerts = self.getShapeVertices(self.simplex.restShape)
-		self._shapes[shape.name] = copy.copy(restVerts)
+		self._zeroShape(shape.name)
+
+	@undoable
+	def zeroShapes(self, shapes):
+		for shape in shapes:
+			self._zeroShape(shape.name)
 
 	@undoable
 	def deleteShape(self, toDelShape):
-		self._shapes.pop(toDelShape.name, None)
+		self._shapes.removeShape(toDelShape.name)
 
 	@undoable
 	def renameShape(self, shape, name):
-		self._shapes[name] = self._shapes.pop(shape.name, None)
+		self._shapes.renameShape(shape.name, name)
 
 	@undoable
 	def convertShapeToCorrective(self, shape):
@@ -19,7 +19,7 @@ along with Simplex.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 #pylint:disable=missing-docstring,unused-argument,no-self-use
-import copy, json, itertools, math, os
+import copy, json, itertools, math, os, hashlib, zlib, time
 try:
 	import numpy as np
 except ImportError:
@@ -34,21 +34,255 @@ from collections import OrderedDict
 from functools import wraps
 from interface import DCC, rootWindow, undoContext
 from dummyInterface import DCC as DummyDCC
+from SimplexUI.commands.shapeMatrix import ShapeMatrix
+from SimplexUI.commands.splitSystem import splitDefinition
 try:
 	# This module is unique to Blur Studio
 	import blurdev
 except ImportError:
 	blurdev = None
 
+# Set these environment variables to change the default undo budget
+# The maximum number of revisions kept on the undo stack
+UNDO_ENTRIES_ENV = 'SIMPLEX_UNDO_ENTRIES'
+UNDO_ENTRIES = 200
+# The maximum number of bytes the undo stack can use
+UNDO_BYTES_ENV = 'SIMPLEX_UNDO_BYTES'
+UNDO_BYTES = 256 * 1024 * 1024
+# The number of newest revisions that aren't compressed
+UNDO_LIVE_ENV = 'SIMPLEX_UNDO_LIVE'
+UNDO_LIVE = 8
+
+# The minimum number of seconds between progress bar updates while loading
+PBAR_INTERVAL = 0.1
+
+_colorCache = {}
+def loadColor(rgb):
+	''' Get a QColor for an rgb triple from a definition
+	Item colors are always replaced, never edited in place,
+	so the same color object can be shared by every item
+	'''
+	rgb = tuple(rgb)
+	color = _colorCache.get(rgb)
+	if color is None:
+		color = _colorCache[rgb] = QColor(*rgb)
+	return color
+
 
 # UNDO STACK SETUP
+class Revision(object):
+	''' An immutable record of a simplex system for the undo stack
+
+	Every item is kept as the json string of its definition, and any string
+	that didn't change since the previous revision is shared with it. Vertex
+	arrays, falloff weights, and DCC references are kept by reference and are
+	never copied, so a revision only costs the items that actually changed
+
+	Once a revision gets old, it can be compressed. Then its whole definition
+	is kept as a single zlib compressed json string, and only decompressed
+	when it's built
+	'''
+	LIST_KEYS = ("falloffs", "combos", "shapes", "sliders", "groups", "progressions", "traversals")
+
+	def __init__(self, system, lists, shapeData, sliderData, falloffData, legacy, sliderMul):
+		self.system = system # json string of the top level keys
+		self.lists = lists # (key, tuple of json strings) for each item list
+		self.shapeData = shapeData # (thingRepr, verts) for each shape
+		self.sliderData = sliderData # (thingRepr, value) for each slider
+		self.falloffData = falloffData # weights for each falloff
+		self.legacy = legacy
+		self.sliderMul = sliderMul
+		self.blob = None # The compressed definition
+		self.size = 0 # The bytes freed by removing this revision from the stack
+		self.lastUsed = 0 # The stack clock when this revision was last touched
+
+	@property
+	def compressed(self):
+		return self.blob is not None
+
+	@classmethod
+	def fromSimplex(cls, simplex, previous=None):
+		''' Record the current state of a simplex system
+		Strings are shared with the previous revision wherever they match
+		'''
+		legacy = simplex._legacy
+		simplex._legacy = False
+		try:
+			simpDict = simplex.buildDefinition()
+		finally:
+			simplex._legacy = legacy
+
+		pool = {}
+		if previous is not None and not previous.compressed:
+			pool[previous.system] = previous.system
+			for _, strs in previous.lists:
+				for js in strs:
+					pool[js] = js
+
+		lists = []
+		for key in cls.LIST_KEYS:
+			# Don't sort the keys. Python's json can't use its fast encoder when sorting
+			# and buildDefinition always builds the keys of an item in the same order
+			strs = (json.dumps(item) for item in simpDict.pop(key))
+			lists.append((key, tuple(pool.setdefault(js, js) for js in strs)))
+		system = json.dumps(simpDict)
+		system = pool.get(system, system)
+
+		shapeData = tuple((shape._thingRepr, shape._verts) for shape in simplex.shapes)
+		sliderData = tuple((slider._thingRepr, slider._value) for slider in simplex.sliders)
+		falloffData = tuple(fo._weights for fo in simplex.falloffs)
+		return cls(system, tuple(lists), shapeData, sliderData, falloffData, legacy, simplex.sliderMul)
+
+	def compress(self):
+		''' Replace the shared json strings with one compressed string '''
+		if self.compressed:
+			return
+		self.blob = zlib.compress(json.dumps(self.buildDefinition()))
+		self.system = None
+		self.lists = None
+
+	def _strings(self):
+		if self.compressed:
+			return [self.blob]
+		return [self.system] + [js for _, strs in self.lists for js in strs]
+
+	def _arrays(self):
+		arrays = [verts for _, verts in self.shapeData]
+		arrays.extend(self.falloffData)
+		return [a for a in arrays if a is not None]
+
+	def updateSize(self, newer=None):
+		''' Count the bytes that would be freed by removing this revision
+		Anything shared with the next newer revision isn't counted. The
+		arrays of the newest revision are the current data, so they're free
+		'''
+		if newer is None:
+			self.size = sum(len(js) for js in self._strings())
+			return self.size
+
+		newStrs = set(id(js) for js in newer._strings())
+		newArrays = set(id(a) for a in newer._arrays())
+		size = sum(len(js) for js in self._strings() if id(js) not in newStrs)
+		size += sum(getattr(a, 'nbytes', 0) for a in self._arrays() if id(a) not in newArrays)
+		self.size = size
+		return size
+
+	def buildDefinition(self):
+		''' Rebuild the definition dictionary of this revision '''
+		if self.compressed:
+			return json.loads(zlib.decompress(self.blob))
+		simpDict = json.loads(self.system)
+		for key, strs in self.lists:
+			simpDict[key] = [json.loads(js) for js in strs]
+		return simpDict
+
+	def build(self):
+		''' Build a disconnected simplex system from this revision
+		Like a deepcopy, the new system uses a dummy DCC, and reconnects
+		to the DCC objects through their persistent representations
+		'''
+		simpDict = self.buildDefinition()
+		smpx = Simplex(simpDict["systemName"], forceDummy=True, sliderMul=self.sliderMul)
+		smpx.stack.enabled = False
+		smpx.loadDefinition(simpDict)
+		smpx.setLegacy(self.legacy)
+
+		for shape, (thingRepr, verts) in zip(smpx.shapes, self.shapeData):
+			shape._thing = None
+			shape._thingRepr = thingRepr
+			shape._verts = verts
+		for slider, (thingRepr, value) in zip(smpx.sliders, self.sliderData):
+			slider._thing = None
+			slider._thingRepr = thingRepr
+			slider._value = value
+		for fo, weights in zip(smpx.falloffs, self.falloffData):
+			fo._weights = weights
+		return smpx
+
+
 class Stack(object):
-	''' Integrate simplex into the DCC undo stack '''
-	def __init__(self):
+	''' Integrate simplex into the DCC undo stack
+
+	The stack is kept within a budget of revisions and bytes. When it goes
+	over, the least recently used revisions are thrown away. The newest
+	revisions are kept ready to build, and older ones are compressed
+
+	Arguments:
+		maxEntries: The maximum number of revisions to keep. Defaults to the
+			SIMPLEX_UNDO_ENTRIES environment variable, or UNDO_ENTRIES
+		maxBytes: The maximum number of bytes to keep. Defaults to the
+			SIMPLEX_UNDO_BYTES environment variable, or UNDO_BYTES
+		liveEntries: The number of newest revisions that aren't compressed.
+			Defaults to the SIMPLEX_UNDO_LIVE environment variable, or UNDO_LIVE
+	'''
+	def __init__(self, maxEntries=None, maxBytes=None, liveEntries=None):
 		self._stack = OrderedDict()
 		self.depth = 0
 		self.currentRevision = 0
 		self.enabled = True
+		self._clock = 0
+		self.setBudget(maxEntries, maxBytes, liveEntries)
+
+	def setBudget(self, maxEntries=None, maxBytes=None, liveEntries=None):
+		''' Set the limits of the undo stack, and evict anything over them '''
+		def get(value, env, default):
+			if value is None:
+				value = os.environ.get(env, default)
+			return max(int(value), 1)
+		self.maxEntries = get(maxEntries, UNDO_ENTRIES_ENV, UNDO_ENTRIES)
+		self.maxBytes = get(maxBytes, UNDO_BYTES_ENV, UNDO_BYTES)
+		self.liveEntries = get(liveEntries, UNDO_LIVE_ENV, UNDO_LIVE)
+		self._trim()
+
+	@property
+	def size(self):
+		''' The number of bytes used by the stack '''
+		return sum(rev.size for rev in self._stack.itervalues())
+
+	def _touch(self, revision):
+		self._clock += 1
+		revision.lastUsed = self._clock
+
+	def _updateSizes(self, keys):
+		''' Update the size of the revisions at these keys, which depends on the next newer revision '''
+		order = list(self._stack)
+		for key in keys:
+			if key not in self._stack:
+				continue
+			idx = order.index(key)
+			newer = self._stack[order[idx + 1]] if idx + 1 < len(order) else None
+			self._stack[key].updateSize(newer)
+
+	def _trim(self):
+		''' Compress the old revisions, and evict revisions until the stack fits the budget '''
+		order = list(self._stack)
+		if not order:
+			return
+
+		changed = []
+		for key in order[:-self.liveEntries]:
+			if not self._stack[key].compressed:
+				self._stack[key].compress()
+				changed.append(key)
+		self._updateSizes(changed)
+
+		# Never evict the newest revision, or the one the DCC is currently at
+		keep = set([order[-1], self.currentRevision])
+		total = self.size
+		while len(self._stack) > self.maxEntries or total > self.maxBytes:
+			candidates = [k for k in self._stack if k not in keep]
+			if not candidates:
+				break
+			key = min(candidates, key=lambda k: self._stack[k].lastUsed)
+			order = list(self._stack)
+			idx = order.index(key)
+			total -= self._stack.pop(key).size
+			if idx > 0:
+				# The older neighbor now shares with a different revision
+				older = order[idx - 1]
+				total -= self._stack[older].size
+				self._updateSizes([older])
+				total += self._stack[older].size
 
 	def __setitem__(self, key, value):
 		gt = []
@@ -64,6 +298,11 @@ class Stack(object):
 			del self._stack[k]
 		#traceback.print_stack()
 		self._stack[key] = value
+		self._touch(value)
+		value.updateSize()
+		older = list(self._stack)[-2:-1]
+		self._updateSizes(older)
+		self._trim()
 
 	def getRevision(self, revision):
 		''' Every time a change is made to the simplex definition,
@@ -74,7 +313,8 @@ class Stack(object):
 		# Seriously, don't call this yourself
 		if revision != self.currentRevision:
 			if revision in self._stack:
-				data = self._stack[revision]
+				self._touch(self._stack[revision])
+				data = self._stack[revision].build()
 				self.currentRevision = revision
 				return data
 		return None
@@ -100,7 +340,8 @@ class Stack(object):
 					srevision = wrapObj.DCC.incrementRevision()
 					if not isinstance(wrapObj, Simplex):
 						wrapObj = wrapObj.simplex
-					self[srevision] = copy.deepcopy(wrapObj)
+					previous = self._stack[next(reversed(self._stack))] if self._stack else None
+					self[srevision] = Revision.fromSimplex(wrapObj, previous)
 		else:
 			yield
 
@@ -124,7 +365,6 @@ def stackable(method):
 class SimplexAccessor(object):
 	def __init__(self, simplex):
 		self.simplex = simplex
-		self._splitApplied = set()
 
 	@property
 	def models(self):
@@ -193,6 +433,11 @@ class Falloff(SimplexAccessor):
 
 	UNSPLIT_GUESS_TOLERANCE = 0.33
 
+	# Planar weights are shared between falloffs with the same parameters
+	# and rest shape, like the deepcopies made while splitting
+	WEIGHT_CACHE_SIZE = 16
+	_weightCache = OrderedDict()
+
 	def __init__(self, name, simplex, *data):
 		super(Falloff, self).__init__(simplex)
 		with self.stack.store(self):
@@ -346,6 +591,7 @@ class Falloff(SimplexAccessor):
 		self.maxHandle = maxHandle
 		self.maxVal = maxVal
 		self.mapName = None
+		self._bezier = None
 		self._updateDCC()
 
 	@stackable
@@ -408,6 +654,43 @@ class Falloff(SimplexAccessor):
 		t1 = 1-t
 		return 3*t1*t**2*1 + t**3*1
 
+	def getMultipliers(self, xVals):
+		''' Get the multipliers for a whole array of values at once '''
+		xVals = np.asarray(xVals, dtype=np.float64)
+		out = np.zeros(xVals.shape)
+		low = xVals <= self.minVal
+		out[~low & (xVals >= self.maxVal)] = 1.0
+		mid = ~low & (xVals < self.maxVal)
+		if not mid.any():
+			return out
+
+		tVal = (xVals[mid] - self.minVal) / float(self.maxVal - self.minVal)
+		qq, r, d, n = self.bezier
+		q = qq - tVal/d
+		discriminant = q*q - 4*r*r*r
+		u = np.empty(q.shape)
+
+		pos = discriminant >= 0
+		if pos.any():
+			pm = np.sqrt(discriminant[pos])/2
+			w = -q[pos]/2 + pm
+			# np.cbrt needs numpy 1.10, which maya doesn't ship
+			w = np.sign(w) * np.abs(w) ** (1.0 / 3)
+			with np.errstate(divide='ignore', invalid='ignore'):
+				u[pos] = np.where(w != 0, w + r/w, 0.0)
+
+		neg = ~pos
+		if neg.any():
+			# r is always positive here because the discriminant is negative
+			theta = np.arccos(np.clip(-q[neg] / (2*r**(3/2.0)), -1.0, 1.0))
+			phi = theta/3 + 4*math.pi/3
+			u[neg] = 2 * r**(0.5) * np.cos(phi)
+
+		t = u + n/d
+		t1 = 1-t
+		out[mid] = 3*t1*t**2 + t**3
+		return out
+
 	def _setSearchRep(self):
 		if self.axis.lower() == self.HORIZONTAL_AXIS.lower():
 			self._search = self.HORIZONTAL_SPLIT
@@ -432,17 +715,36 @@ class Falloff(SimplexAccessor):
 		return self._rep
 
 	def setVerts(self, verts):
-		if self.axis.lower() == self.HORIZONTAL_AXIS.lower():
+		self._weights = self.getWeights(verts)
+
+	def getWeights(self, verts):
+		''' Get the weights of this falloff for the given rest verts without
+		storing them. Map falloffs just return the weights they already have
+		'''
+		axis = (self.axis or '').lower()
+		if axis == self.HORIZONTAL_AXIS.lower():
 			component = 0
-		elif self.axis.lower() == self.VERTICAL_AXIS.lower():
+		elif axis == self.VERTICAL_AXIS.lower():
 			component = 1
-		elif self.axis.lower() == self.DEPTH_AXIS.lower():
+		elif axis == self.DEPTH_AXIS.lower():
 			component = 2
 		elif self._weights is None:
 			raise ValueError("Non-Planar Falloff found with no weights set")
 		else:
-			return
-		self._weights = np.array([self.getMultiplier(v[component]) for v in verts])
+			return self._weights
+
+		column = np.ascontiguousarray(np.asarray(verts)[:, component], dtype=np.float64)
+		key = (self.minVal, self.minHandle, self.maxHandle, self.maxVal, hashlib.sha1(column).hexdigest())
+		cache = Falloff._weightCache
+		weights = cache.pop(key, None)
+		if weights is None:
+			weights = self.getMultipliers(column)
+			# This array is shared, so don't let anybody change it in place
+			weights.flags.writeable = False
+			while len(cache) >= self.WEIGHT_CACHE_SIZE:
+				cache.popitem(last=False)
+		cache[key] = weights
+		return weights
 
 	@property
 	def weights(self):
@@ -496,7 +798,7 @@ class Falloff(SimplexAccessor):
 
 class Shape(SimplexAccessor):
 	classDepth = 9
-	def __init__(self, name, simplex, create=True, color=QColor(128, 128, 128)):
+	def __init__(self, name, simplex, create=True, color=QColor(128, 128, 128), thing=None):
 		super(Shape, self).__init__(simplex)
 		with self.stack.store(self):
 			self._thing = None
@@ -504,12 +806,12 @@ class Shape(SimplexAccessor):
 			self._thingRepr = None
 			self._name = name
 			self._buildIdx = None
-			simplex.shapes.append(self)
+			simplex._addItem(self)
 			self.isRest = False
 			self.expanded = {}
 			self.color = color
 
-			newThing = self.DCC.getShapeThing(self._name)
+			newThing = thing if thing is not None else self.DCC.getShapeThing(self._name)
 			if newThing is None:
 				if create:
 					self.thing = self.DCC.createShape(self)
@@ -557,7 +859,8 @@ class Shape(SimplexAccessor):
 		if value == self._name:
 			return
 		self.DCC.renameShape(self, value)
-		self._name = value
+		oldName, self._name = self._name, value
+		self.simplex._renameItem(self, oldName)
 		for model in self.models:
 			model.itemDataChanged(self)
 
@@ -575,8 +878,8 @@ class Shape(SimplexAccessor):
 		self._thingRepr = self.DCC.getPersistentShape(value)
 
 	@classmethod
-	def loadV2(cls, simplex, data, create):
-		return cls(data['name'], simplex, create, QColor(*data.get('color', (0, 0, 0))))
+	def loadV2(cls, simplex, data, create, thing=None):
+		return cls(data['name'], simplex, create, loadColor(data.get('color', (0, 0, 0))), thing=thing)
 
 	def buildDefinition(self, simpDict, legacy):
 		if self._buildIdx is None:
@@ -678,7 +981,7 @@ class ProgPair(SimplexAccessor):
 		with nested(*mgrs):
 			pp = self.prog.pairs.pop(ridx)
 			if not self.shape.isRest:
-				self.simplex.shapes.remove(pp.shape)
+				self.simplex._removeItem(pp.shape)
 				self.DCC.deleteShape(pp.shape)
 
 
@@ -849,8 +1152,7 @@ class Progression(SimplexAccessor):
 				neg = 'n' if tVal < 0.0 else ''
 				shapeName = "{0}_{1}{2}".format(self.controller.name, neg, int(abs(tVal)*100))
 
-			currentNames = [i.name for i in self.simplex.shapes]
-			shapeName = getNextName(shapeName, currentNames)
+			shapeName = getNextName(shapeName, self.simplex.shapesByName)
 
 		idx = self.getInsertIndex(tVal)
 		shape = Shape(shapeName, self.simplex)
@@ -891,7 +1193,7 @@ class Progression(SimplexAccessor):
 		with nested(*mgrs):
 			self.pairs.pop(ridx)
 			if not shape.isRest:
-				self.simplex.shapes.remove(shape)
+				self.simplex._removeItem(shape)
 				self.DCC.deleteShape(shape)
 
 	@stackable
@@ -901,7 +1203,7 @@ class Progression(SimplexAccessor):
 			for pp in self.pairs[:]:
 				if pp.shape.isRest:
 					continue
-				self.simplex.shapes.remove(pp.shape)
+				self.simplex._removeItem(pp.shape)
 				self.DCC.deleteShape(pp.shape)
 
 	def getRange(self):
@@ -919,7 +1221,7 @@ class Progression(SimplexAccessor):
 
 class Slider(SimplexAccessor):
 	classDepth = 6
-	def __init__(self, name, simplex, prog, group, color=QColor(128, 128, 128), create=True):
+	def __init__(self, name, simplex, prog, group, color=QColor(128, 128, 128), create=True, thing=None):
 		if group.groupType != type(self):
 			raise ValueError("Cannot add this slider to a combo group")
 
@@ -946,9 +1248,9 @@ class Slider(SimplexAccessor):
 				self.group = group
 				self.group.items.append(self)
 
-			self.simplex.sliders.append(self)
+			self.simplex._addItem(self)
 
-			newThing = self.DCC.getSliderThing(self._name)
+			newThing = thing if thing is not None else self.DCC.getSliderThing(self._name)
 			if newThing is None:
 				if create:
 					self.thing = simplex.DCC.createSlider(self)
@@ -981,8 +1283,7 @@ class Slider(SimplexAccessor):
 			else:
 				group = Group('{0}_GROUP'.format(name), simplex, Slider)
 
-		currentNames = [s.name for s in simplex.sliders]
-		name = getNextName(name, currentNames)
+		name = getNextName(name, simplex.slidersByName)
 
 		prog = Progression(name, simplex)
 		if shape is None:
@@ -1001,7 +1302,8 @@ class Slider(SimplexAccessor):
 	@stackable
 	def name(self, value):
 		""" Set the name of a slider """
-		self._name = value
+		oldName, self._name = self._name, value
+		self.simplex._renameItem(self, oldName)
 		self.prog.name = value
 		self.DCC.renameSlider(self, value)
 		# TODO Also rename the combos
@@ -1079,12 +1381,11 @@ class Slider(SimplexAccessor):
 		pass
 
 	@classmethod
-	def loadV2(cls, simplex, progs, data, create):
+	def loadV2(cls, simplex, progs, data, create, thing=None):
 		name = data["name"]
 		prog = progs[data["prog"]]
 		group = simplex.groups[data.get("group", 0)]
-		color = QColor(*data.get("color", (0, 0, 0)))
-		return cls(name, simplex, prog, group, create=create)
+		return cls(name, simplex, prog, group, create=create, thing=thing)
 
 	def buildDefinition(self, simpDict, legacy):
 		if self._buildIdx is None:
@@ -1124,12 +1425,12 @@ class Slider(SimplexAccessor):
 			g = self.group
 			g.items.remove(self)
 			self.group = None
-			self.simplex.sliders.remove(self)
+			self.simplex._removeItem(self)
 
 			pairs = self.prog.pairs[:] # gotta make a copy
 			for pp in pairs:
 				if not pp.shape.isRest:
-					self.simplex.shapes.remove(pp.shape)
+					self.simplex._removeItem(pp.shape)
 					self.DCC.deleteShape(pp.shape)
 
 			self.DCC.deleteSlider(self)
@@ -1190,7 +1491,7 @@ class Slider(SimplexAccessor):
 		self.DCC.connectShape(shape, mesh, live, delete)
 
 	def updateRange(self):
-		self.DCC.updateSlidersRange([self])
+		self.simplex.updateSlidersRange([self])
 
 	@stackable
 	def setGroup(self, grp):
@@ -1244,6 +1545,8 @@ class ComboPair(SimplexAccessor):
 	@stackable
 	def value(self, val):
 		self._value = val
+		if self.combo is not None:
+			self.simplex._reindexItem(self.combo)
 		for model in self.models:
 			model.itemDataChanged(self)
 
@@ -1281,7 +1584,7 @@ class Combo(SimplexAccessor):
 					p.combo = self
 				self.prog.controller = self
 				self.group.items.append(self)
-				self.simplex.combos.append(self)
+				self.simplex._addItem(self)
 
 	@property
 	def enabled(self):
@@ -1294,12 +1597,7 @@ class Combo(SimplexAccessor):
 
 	@classmethod
 	def comboAlreadyExists(cls, simplex, sliders, values):
-		checker = set([(s.name, v) for s, v in zip(sliders, values)])
-		for combo in simplex.combos:
-			tester = set([(p.slider.name, p.value) for p in combo.pairs])
-			if checker == tester:
-				return combo
-		return None
+		return simplex.comboExists(sliders, values)
 
 	@classmethod
 	def createCombo(cls, name, simplex, sliders, values, group=None, shape=None, solveType=None, tVal=1.0):
@@ -1329,7 +1627,7 @@ class Combo(SimplexAccessor):
 
 		if shape is None:
 			pp = prog.createShape(name, tVal)
-			simplex.DCC.zeroShape(pp.shape)
+			simplex.zeroShapes([pp.shape])
 
 		return cmb
 
@@ -1372,7 +1670,8 @@ class Combo(SimplexAccessor):
 	@stackable
 	def name(self, value):
 		""" Set the name of a combo """
-		self._name = value
+		oldName, self._name = self._name, value
+		self.simplex._renameItem(self, oldName)
 		self.prog.name = value
 		self.DCC.renameCombo(self, value)
 		for model in self.models:
@@ -1436,7 +1735,6 @@ class Combo(SimplexAccessor):
 		name = data["name"]
 		prog = progs[data["prog"]]
 		group = simplex.groups[data.get("group", 1)]
-		color = QColor(*data.get("color", (0, 0, 0)))
 		pairs = [ComboPair(simplex.sliders[s], v) for s, v in data['pairs']]
 		solveType = data.get('solveType')
 		return cls(name, simplex, pairs, prog, group, solveType)
@@ -1507,11 +1805,11 @@ class Combo(SimplexAccessor):
 				return # Can happen when deleting multiple groups
 			g.items.remove(self)
 			self.group = None
-			self.simplex.combos.remove(self)
+			self.simplex._removeItem(self)
 			pairs = self.prog.pairs[:] # gotta make a copy
 			for pp in pairs:
 				if not pp.shape.isRest:
-					self.simplex.shapes.remove(pp.shape)
+					self.simplex._removeItem(pp.shape)
 					self.DCC.deleteShape(pp.shape)
 
 	@stackable
@@ -1538,6 +1836,7 @@ class Combo(SimplexAccessor):
 		with nested(*mgrs):
 			self.pairs.append(cp)
 			cp.combo = self
+		self.simplex._reindexItem(self)
 
 	@stackable
 	def deleteComboPair(self, comboPair):
@@ -1549,6 +1848,7 @@ class Combo(SimplexAccessor):
 			# it popping all over in the heirarchy
 			self.pairs.remove(comboPair)
 			comboPair.combo = None
+		self.simplex._reindexItem(self)
 
 	@stackable
 	def setGroup(self, grp):
@@ -1682,7 +1982,7 @@ class Traversal(SimplexAccessor):
 				self.progressCtrl.traversal = self
 				self.prog.controller = self
 				self.group.items.append(self)
-				self.simplex.traversals.append(self)
+				self.simplex._addItem(self)
 
 	@classmethod
 	def createTraversal(cls, name, simplex, multItem, progItem, multFlip, progFlip, group=None, count=4):
@@ -1707,7 +2007,7 @@ class Traversal(SimplexAccessor):
 		for c in reversed(range(count)):
 			val = (100*(c+1)) / count
 			pp = prog.createShape("{0}_{1}".format(name, val), val / 100.0)
-			simplex.DCC.zeroShape(pp.shape)
+			simplex.zeroShapes([pp.shape])
 		return trav
 
 	@property
@@ -1744,7 +2044,7 @@ class Traversal(SimplexAccessor):
 		name = data["name"]
 		prog = progs[data["prog"]]
 		group = simplex.groups[data.get("group", 2)]
-		color = QColor(*data.get("color", (0, 0, 0)))
+		color = loadColor(data.get("color", (0, 0, 0)))
 
 		pcIdx = data['progressControl']
 		if data['progressType'].lower() == 'slider':
@@ -1773,7 +2073,7 @@ class Traversal(SimplexAccessor):
 				"progressType": type(self.progressCtrl.controller).__name__,
 				"progressControl": self.progressCtrl.buildDefinition(simpDict, legacy),
 				"progressFlip": self.progressCtrl.value < 0,
-				"multiplierType": type(self.progressCtrl.controller).__name__,
+				"multiplierType": type(self.multiplierCtrl.controller).__name__,
 				"multiplierControl": self.multiplierCtrl.buildDefinition(simpDict, legacy),
 				"multiplierFlip": self.multiplierCtrl.value < 0,
 				"group": self.group.buildDefinition(simpDict, legacy),
@@ -1798,12 +2098,12 @@ class Traversal(SimplexAccessor):
 				return # Can happen when deleting multiple groups
 			g.items.remove(self)
 			self.group = None
-			self.simplex.traversals.remove(self)
+			self.simplex._removeItem(self)
 
 			pairs = self.prog.pairs[:] # gotta make a copy
 			for pp in pairs:
 				if not pp.shape.isRest:
-					self.simplex.shapes.remove(pp.shape)
+					self.simplex._removeItem(pp.shape)
 					self.DCC.deleteShape(pp.shape)
 
 	def extractShape(self, shape, live=True, offset=10.0):
@@ -1818,6 +2118,7 @@ class Traversal(SimplexAccessor):
 		tp.traversal = self
 		#old = self.multiplierCtrl
 		self.multiplierCtrl = tp
+		self.simplex._reindexItem(self)
 		for model in self.models:
 			model.itemDataChanged(self.multiplierCtrl)
 
@@ -1829,6 +2130,7 @@ class Traversal(SimplexAccessor):
 		tp.traversal = self
 		#old = self.progressCtrl
 		self.progressCtrl = tp
+		self.simplex._reindexItem(self)
 		for model in self.models:
 			model.itemDataChanged(self.progressCtrl)
 
@@ -1886,7 +2188,7 @@ class Group(SimplexAccessor):
 			groupType = Traversal
 		else:
 			raise RuntimeError("Malformed simplex json string: Improper group type")
-		return cls(name, simplex, groupType, QColor(*color))
+		return cls(name, simplex, groupType, loadColor(color))
 
 	def buildDefinition(self, simpDict, legacy):
 		if self._buildIdx is None:
@@ -1984,6 +2286,10 @@ class Simplex(object):
 		self.stack = Stack() # Reference to the Undo stack
 		self._extras = {} # Any extra key data to store in the output json
 		self._legacy = False # whether to write the legacy types
+		self._batchQueue = None # The DCC calls queued by the current batch
+		self._pBarPending = 0 # Progress bar increments that haven't been shown yet
+		self._pBarTime = 0.0 # The last time the progress bar was updated
+		self._clearIndexes()
 
 	def __deepcopy__(self, memo):
 		cls = self.__class__
@@ -2006,8 +2312,9 @@ class Simplex(object):
 			elif k == "DCC":
 				# do not connect the deepcopied simplex to the DCC
 				# we will want to change it without affecting the current scene
-				# Requires the name be copied already
+				# Requires the name and slider multiplier be copied already
 				setattr(result, '_name', copy.deepcopy(self._name, memo))
+				setattr(result, 'sliderMul', self.sliderMul)
 				setattr(result, k, DummyDCC(result))
 			elif k == "expanded":
 				# do not make a copy of the expansion
@@ -2032,6 +2339,7 @@ class Simplex(object):
 		self.color = QColor(128, 128, 128)
 		self.comboExpanded = False # Am I expanded in the combo tree
 		self.sliderExpanded = False # Am I expanded in the slider tree
+		self.rebuildIndexes()
 
 	# Alternate Constructors
 	@classmethod
@@ -2201,16 +2509,183 @@ class Simplex(object):
 		# Must return the archive, otherwise it gets GC'd
 		return iarch, abcMesh, js
 
+	# INDEXES
+	def _clearIndexes(self):
+		self.shapesByName = {} # Shapes keyed by name
+		self.slidersByName = {} # Sliders keyed by name
+		self.combosByName = {} # Combos keyed by name
+		self._combosByPairs = {} # Lists of combos keyed by their frozenset of (slider, value)
+		self._comboKeys = {} # The _combosByPairs key of each combo
+		self._downstreamCombos = {} # Sets of combos keyed by the sliders they use
+		self._downstreamTraversals = {} # Sets of traversals keyed by their controllers
+		self._traversalCtrls = {} # The controllers of each traversal
+
+	def rebuildIndexes(self):
+		''' Rebuild the name and relationship indexes from the item lists
+		This is only needed if the lists are changed directly
+		'''
+		self._clearIndexes()
+		for item in itertools.chain(self.shapes, self.sliders, self.combos, self.traversals):
+			self._indexItem(item)
+
+	def _itemList(self, item):
+		if isinstance(item, Shape):
+			return self.shapes
+		elif isinstance(item, Slider):
+			return self.sliders
+		elif isinstance(item, Combo):
+			return self.combos
+		elif isinstance(item, Traversal):
+			return self.traversals
+		raise ValueError("Cannot index a {0}".format(type(item).__name__))
+
+	def _nameIndex(self, item):
+		if isinstance(item, Shape):
+			return self.shapesByName
+		elif isinstance(item, Slider):
+			return self.slidersByName
+		elif isinstance(item, Combo):
+			return self.combosByName
+		return None
+
+	def _indexItem(self, item):
+		names = self._nameIndex(item)
+		if names is not None:
+			names[item.name] = item
+
+		if isinstance(item, Combo):
+			key = frozenset([(p.slider, p.value) for p in item.pairs])
+			self._comboKeys[item] = key
+			self._combosByPairs.setdefault(key, []).append(item)
+			for slider, _ in key:
+				self._downstreamCombos.setdefault(slider, set()).add(item)
+		elif isinstance(item, Traversal):
+			ctrls = (item.multiplierCtrl.controller, item.progressCtrl.controller)
+			self._traversalCtrls[item] = ctrls
+			for ctrl in ctrls:
+				self._downstreamTraversals.setdefault(ctrl, set()).add(item)
+
+	def _unindexItem(self, item):
+		names = self._nameIndex(item)
+		if names is not None and names.get(item.name) is item:
+			del names[item.name]
+
+		key = self._comboKeys.pop(item, None)
+		if key is not None:
+			combos = self._combosByPairs[key]
+			combos.remove(item)
+			if not combos:
+				del self._combosByPairs[key]
+			for slider, _ in key:
+				self._discardDownstream(self._downstreamCombos, slider, item)
+
+		ctrls = self._traversalCtrls.pop(item, None)
+		if ctrls is not None:
+			for ctrl in ctrls:
+				self._discardDownstream(self._downstreamTraversals, ctrl, item)
+
+	@staticmethod
+	def _discardDownstream(index, key, item):
+		downstream = index.get(key)
+		if downstream is not None:
+			downstream.discard(item)
+			if not downstream:
+				del index[key]
+
+	def _addItem(self, item):
+		''' Append a shape, slider, combo, or traversal to its list and index it '''
+		self._itemList(item).append(item)
+		self._indexItem(item)
+
+	def _removeItem(self, item):
+		''' Remove a shape, slider, combo, or traversal from its list and the indexes '''
+		self._itemList(item).remove(item)
+		self._unindexItem(item)
+
+	def _reindexItem(self, item):
+		''' Update the indexes after a combo's pairs or a traversal's controllers change '''
+		self._unindexItem(item)
+		self._indexItem(item)
+
+	def _renameItem(self, item, oldName):
+		names = self._nameIndex(item)
+		if names.get(oldName) is item:
+			del names[oldName]
+		names[item.name] = item
+
 	def comboExists(self, sliders, values):
 		''' Check if a combo exists with these specific sliders and values
 		Because combo names aren't necessarily always in the same order
 		'''
-		checkSet = set([(s.name, v) for s, v in zip(sliders, values)])
-		for cmb in self.combos:
-			cmbSet = set([(p.slider.name, p.value) for p in cmb.pairs])
-			if checkSet == cmbSet:
-				return cmb
-		return None
+		combos = self._combosByPairs.get(frozenset(zip(sliders, values)))
+		if not combos:
+			return None
+		if len(combos) > 1:
+			# Duplicates shouldn't happen, but stay consistent with the combo order
+			return min(combos, key=self.combos.index)
+		return combos[0]
+
+	# BATCH EDITS
+	@contextmanager
+	def batch(self):
+		''' Make many edits to the system as a single transaction
+
+		While batching, the connected models aren't told about every item
+		as it changes. Instead, each one is reset once at the end. The whole
+		batch is stored as a single undo revision, and the DCC calls that
+		don't return anything are queued and run in bulk at the end
+
+		Batches can be nested, but only the outermost one does anything
+		'''
+		if self._batchQueue is not None:
+			yield
+			return
+
+		# Store the models as temp so the model doesn't go crazy with the signals
+		models, self.models = self.models, []
+		falloffModels, self.falloffModels = self.falloffModels, []
+		mgrs = [model.resetModelManager() for model in models + falloffModels]
+		self._batchQueue = {'zeroShapes': OrderedDict(), 'updateSlidersRange': OrderedDict()}
+		try:
+			with nested(*mgrs):
+				with self.stack.store(self):
+					try:
+						yield
+					finally:
+						self._flushBatch()
+		finally:
+			self._batchQueue = None
+			# Keep any models that were connected during the batch
+			self.models = models + [m for m in self.models if m not in models]
+			self.falloffModels = falloffModels + [m for m in self.falloffModels if m not in falloffModels]
+
+	def _flushBatch(self):
+		''' Run the DCC calls that were queued by the current batch
+		Anything that was deleted during the batch is skipped
+		'''
+		queue = self._batchQueue
+		shapes = [s for s in queue['zeroShapes'] if self.shapesByName.get(s.name) is s]
+		sliders = [s for s in queue['updateSlidersRange'] if self.slidersByName.get(s.name) is s]
+		for v in queue.itervalues():
+			v.clear()
+		if shapes:
+			self.DCC.zeroShapes(shapes)
+		if sliders:
+			self.DCC.updateSlidersRange(sliders)
+
+	def zeroShapes(self, shapes):
+		''' Zero out shapes in the DCC, or queue them when batching '''
+		if self._batchQueue is None:
+			self.DCC.zeroShapes(shapes)
+		else:
+			self._batchQueue['zeroShapes'].update((s, None) for s in shapes)
+
+	def updateSlidersRange(self, sliders):
+		''' Update the slider ranges in the DCC, or queue them when batching '''
+		if self._batchQueue is None:
+			self.DCC.updateSlidersRange(sliders)
+		else:
+			self._batchQueue['updateSlidersRange'].update((s, None) for s in sliders)
 
 	# DESTRUCTOR
 	def deleteSystem(self):
@@ -2225,31 +2700,21 @@ class Simplex(object):
 		self.models = models
 
 	def getDownstreamTraversals(self, item):
-		downstream = []
-		for t in self.traversals:
-			if (item == t.multiplierCtrl.controller) or (item == t.progressCtrl.controller):
-				downstream.append(t)
-		downstream = list(set(downstream))
-		return downstream
+		return list(self._downstreamTraversals.get(item, ()))
 
 	def getDownstreamCombos(self, slider):
-		downstream = []
 		if not isinstance(slider, Slider):
-			return downstream
-		for c in self.combos:
-			for pair in c.pairs:
-				if pair.slider == slider:
-					downstream.append(c)
-					break
-		downstream = list(set(downstream))
-		return downstream
+			return []
+		return list(self._downstreamCombos.get(slider, ()))
 
 	def deleteDownstream(self, item):
 		todel = []
 		todel.extend(self.getDownstreamCombos(item))
 		todel.extend(self.getDownstreamTraversals(item))
 		for c in todel:
-			c.delete()
+			# Deleting a combo also deletes its downstream traversals
+			if c.group is not None:
+				c.delete()
 
 	# USER METHODS
 	def setLegacy(self, legacy):
@@ -2324,15 +2789,50 @@ class Simplex(object):
 		self.storeExtras(simpDict)
 
 	def _incPBar(self, pBar, txt, inc=1):
+		''' Step the progress bar, but only redraw it every PBAR_INTERVAL seconds '''
 		if pBar is not None:
-			pBar.setValue(pBar.value() + inc)
+			self._pBarPending += inc
+			now = time.time()
+			if now - self._pBarTime < PBAR_INTERVAL:
+				return True
+			self._pBarTime = now
+			pBar.setValue(pBar.value() + self._pBarPending)
+			self._pBarPending = 0
 			pBar.setLabelText("Building:\n" + txt)
 			QApplication.processEvents()
 			return not pBar.wasCanceled()
 		return True
 
+	def _flushPBar(self, pBar):
+		''' Show any progress bar steps that were skipped by _incPBar '''
+		if pBar is not None and self._pBarPending:
+			pBar.setValue(pBar.value() + self._pBarPending)
+		self._pBarPending = 0
+		self._pBarTime = 0.0
+
 	def loadV2(self, simpDict, create=True, pBar=None):
 		preRet = self.DCC.preLoad(self, simpDict, create=create, pBar=pBar)
+
+		# Build the whole system as one batch, and don't store every new
+		# object on the undo stack. Loading is always stored as one revision
+		enabled = self.stack.enabled
+		self.stack.enabled = False
+		try:
+			with self.batch():
+				loaded = self._loadV2Items(simpDict, create=create, pBar=pBar)
+		finally:
+			self.stack.enabled = enabled
+		if not loaded:
+			return
+		self.DCC.postLoad(self, preRet)
+
+	def _loadV2Items(self, simpDict, create=True, pBar=None):
+		''' Build the objects of a version 2 definition
+		The DCC objects are all looked up at once before anything is built
+
+		Returns:
+			bool: False if the user canceled the load
+		'''
 		fos = simpDict.get('falloffs', [])
 		gs = simpDict.get('groups', [])
 		for f in fos:
@@ -2350,19 +2850,24 @@ class Simplex(object):
 			pBar.setLabelText("_"*maxLen)
 			pBar.setValue(0)
 			pBar.setMaximum(len(simpDict["shapes"]) + 1)
+		self._flushPBar(None)
 		self.shapes = []
+		self.rebuildIndexes()
+		shapeThings = self.DCC.getShapeThings([s["name"] for s in simpDict["shapes"]])
 		for s in simpDict["shapes"]:
 			if not self._incPBar(pBar, s["name"]):
-				return
-			Shape.loadV2(self, s, create)
+				return False
+			Shape.loadV2(self, s, create, thing=shapeThings.get(s["name"]))
+		self._flushPBar(pBar)
 
 		self.restShape = self.shapes[0]
 		self.restShape.isRest = True
 
 		progs = [Progression.loadV2(self, p) for p in simpDict['progressions']]
 
+		sliderThings = self.DCC.getSliderThings([s["name"] for s in simpDict["sliders"]])
 		for s in simpDict['sliders']:
-			Slider.loadV2(self, progs, s, create)
+			Slider.loadV2(self, progs, s, create, thing=sliderThings.get(s["name"]))
 		for c in simpDict['combos']:
 			Combo.loadV2(self, progs, c)
 		for t in simpDict['traversals']:
@@ -2370,7 +2875,7 @@ class Simplex(object):
 
 		for x in itertools.chain(self.sliders, self.combos, self.traversals):
 			x.prog.name = x.name
-		self.DCC.postLoad(self, preRet)
+		return True
 
 	def loadV1(self, simpDict, create=True, pBar=None):
 		preRet = self.DCC.preLoad(self, simpDict, create=create, pBar=pBar)
@@ -2383,10 +2888,12 @@ class Simplex(object):
 			pBar.setValue(0)
 			pBar.setMaximum(len(simpDict["shapes"]) + 1)
 
+		self._flushPBar(None)
 		shapes = []
 		for s in simpDict["shapes"]:
 			if not self._incPBar(pBar, s): return
 			shapes.append(Shape(s, self))
+		self._flushPBar(pBar)
 
 		self.restShape = shapes[0]
 		self.restShape.isRest = True
@@ -2400,6 +2907,7 @@ class Simplex(object):
 
 		self.sliders = []
 		self.sliderGroups = []
+		self.rebuildIndexes()
 		createdSlidergroups = {}
 		for s in simpDict["sliders"]:
 			sliderProg = progs[s[1]]
@@ -2415,6 +2923,7 @@ class Simplex(object):
 
 		self.combos = []
 		self.comboGroups = []
+		self.rebuildIndexes()
 		createdComboGroups = {}
 		for c in simpDict["combos"]:
 			prog = progs[c[1]]
@@ -2437,6 +2946,7 @@ class Simplex(object):
 
 		self.traversals = []
 		self.traversalGroups = []
+		self.rebuildIndexes()
 		createdTraversalGroups = {}
 		if 'traversals' in simpDict:
 			for t in simpDict['traversals']:
@@ -2473,13 +2983,11 @@ class Simplex(object):
 
 	def storeExtras(self, simpDict):
 		''' Store any unknown keys when dumping, just in case they're important elsewhere '''
-		sd = copy.deepcopy(simpDict)
-		knownTopLevel = ["encodingVersion", "systemName", "clusterName", "falloffs", "combos",
-			"shapes", "sliders", "groups", "traversals", "progressions"]
+		knownTopLevel = set(["encodingVersion", "systemName", "clusterName", "falloffs", "combos",
+			"shapes", "sliders", "groups", "traversals", "progressions"])
 
-		for ktn in knownTopLevel:
-			if ktn in sd:
-				del sd[ktn]
+		# Only copy the unknown keys, the rest of the definition can be huge
+		sd = {k: copy.deepcopy(v) for k, v in simpDict.iteritems() if k not in knownTopLevel}
 		self._extras = sd
 
 	def loadJSON(self, jsString):
@@ -2503,6 +3011,13 @@ class Simplex(object):
 		defDict = self.buildDefinition()
 		jsString = json.dumps(defDict)
 		path = str(path) # alembic does not like unicode filepaths
+
+		# The shapes may still be read from the loaded .smpx, which could be
+		# the file that's about to be written. Read them before it's opened
+		releaseArchive = getattr(self.DCC, 'releaseArchive', None)
+		if releaseArchive is not None:
+			releaseArchive()
+
 		if blurdev is not None:
 			# Export as HDF5 if at blur
 			arch = OArchive(str(path), False)
@@ -2588,163 +3103,58 @@ class Simplex(object):
 
 
 	# SPLIT CODE
-	def buildSplitterList(self, foList):
-		'''
-			This is kinda fun. The way deepcopy works is that every object
-			that is copied is added to the 'memo' which is a dict keyed off its id()
-			That way, you don't have to re-copy an object if you've already seen it
-			This means that if I make a memo that contains objects that I don't
-			want copied, then I should just be able to use deepcopy, and let that
-			handle keeping references to the un-copied items
-		'''
-		# Build the basic memo dict
-		memo = {}
-		memo[id(self)] = self
-		stack = Stack()
-		stack.enabled = False
-		memo[id(self.stack)] = stack
-
-		memList = [ self.groups, self.sliders, self.combos,
-			 self.traversals, self.falloffs, self.shapes, self.progs]
-
-		for lst in memList:
-			for item in lst:
-				memo[id(item)] = item
-				# splitApplied needs to be part of the item so it persists
-				# through the copy. Otherwise I'd have to keep track of it
-				item._splitApplied = set()
-
-		# now get a list of objects used by the given falloff
-		splitters = []
-		splitBySet = {}
-		for prog in self.progs:
-			# Do it this way (rather than sets) so it keeps order
-			sect = [i for i in foList if i in prog.falloffs]
-			if sect:
-				# Assume that the foList is in priority order
-				# because I can only split an item once on an axis
-				splitFalloff = sect[0]
-				ctrl = prog.controller
-
-				splitters.append(prog)
-				splitters.append(ctrl)
-				splitBySet.setdefault(prog, set()).add(splitFalloff)
-				splitBySet.setdefault(ctrl, set()).add(splitFalloff)
-				for pair in prog.pairs:
-					splitters.append(pair.shape)
-					splitBySet.setdefault(pair.shape, set()).add(splitFalloff)
-
-				# Also add the downstream combos, and their progs
-				dss = []
-				if isinstance(ctrl, Slider):
-					dss.extend(self.getDownstreamCombos(ctrl))
-					dss.extend(self.getDownstreamTraversals(ctrl))
-
-				if isinstance(ctrl, Combo):
-					dss.extend(self.getDownstreamTraversals(ctrl))
-
-				for ds in dss:
-					splitters.append(ds)
-					splitters.append(ds.prog)
-					splitBySet.setdefault(ds, set()).add(splitFalloff)
-					splitBySet.setdefault(ds.prog, set()).add(splitFalloff)
-					for pair in ds.prog.pairs:
-						splitters.append(pair.shape)
-						splitBySet.setdefault(pair.shape, set()).add(splitFalloff)
-
-		splitBy = {}
-		for item, foSet in splitBySet.iteritems():
-			idx = min([foList.index(f) for f in foSet])
-			splitBy[item] = foList[idx]
-
-		splitters = set(splitters)
-		splitters.discard(self.restShape)
-		splitters = list(splitters)
-		splitters = [i for i in splitters if foList[0].axis not in i._splitApplied]
-		# If I can't apply a sided name ot this item, then it can't be split
-		splitters = [i for i in splitters if foList[0].canRename(i)]
-
-		for sp in splitters:
-			try:
-				del memo[id(sp)]
-			except KeyError:
-				print "SP", sp, sp.name
-				raise
-			sp._splitApplied.add(foList[0].axis.lower())
+	def split(self, pBar=None, workers=None):
+		''' Build a new dummy system with every item split along its falloffs
 
-		return splitters, splitBy, memo
+		Arguments:
+			pBar: An optional progress bar
+			workers: The number of threads used to build the split shapes.
+				Defaults to the SIMPLEX_SPLIT_WORKERS environment variable,
+				or the number of cpus
 
-	def split(self, pBar=None):
+		Returns:
+			Simplex: The split system
+		'''
 		if np is None:
 			raise RuntimeError("Numpy is not available, and splitting requires it")
 
-		self.DCC.getAllShapeVertices(self.shapes, pBar)
 		self.DCC.loadMeshTopology()
+		getShapeMatrix = getattr(self.DCC, 'getShapeMatrix', None)
+		if getShapeMatrix is not None:
+			matrix = getShapeMatrix()
+		else:
+			self.DCC.getAllShapeVertices(self.shapes, pBar)
+			names = [s.name for s in self.shapes]
+			matrix = ShapeMatrix.fromPoints(names, [s.verts for s in self.shapes], restIdx=self.shapes.index(self.restShape))
 
 		if pBar is not None:
 			pBar.setValue(0)
 			pBar.setLabelText("Building Split System")
 
-		splitSmpx = copy.deepcopy(self)
+		# Don't store the weights on this system's falloffs. Splitting shouldn't change it
+		weights = {fo: fo.getWeights(matrix.rest) for fo in self.falloffs}
+
+		# Split on the definition, so nothing needs to be deepcopied
+		legacy = self._legacy
+		self._legacy = False
+		try:
+			simpDict = self.buildDefinition()
+		finally:
+			self._legacy = legacy
+		newDict, newMatrix = splitDefinition(simpDict, matrix, self.falloffs, weights=weights, pBar=pBar, workers=workers)
+
+		# Make sure no DCC operations happen during the split
+		splitSmpx = Simplex(newDict['systemName'], forceDummy=True, sliderMul=self.sliderMul)
+		splitSmpx.stack.enabled = False
+		splitSmpx.loadDefinition(newDict)
+		splitSmpx.setLegacy(legacy)
+		for fo, newFo in zip(self.falloffs, splitSmpx.falloffs):
+			newFo.weights = weights[fo]
+
+		splitSmpx.DCC._shapes = newMatrix
+		splitSmpx.DCC._numVerts = newMatrix.numVerts
 		splitSmpx.DCC._faces = self.DCC._faces
 		splitSmpx.DCC._counts = self.DCC._counts
 		splitSmpx.DCC._uvs = self.DCC._uvs
-
-		# Make sure no DCC operations happen during the split
-		restVerts = splitSmpx.restShape.verts
-		for fo in splitSmpx.falloffs:
-			fo.setVerts(restVerts)
-
-		foByAxis = {}
-		for fo in splitSmpx.falloffs:
-			foByAxis.setdefault(fo.axis.lower(), []).append(fo)
-
-		for axis, foList in foByAxis.iteritems():
-			if pBar is not None:
-				pBar.setLabelText("Splitting On {0} axis".format(axis))
-				QApplication.processEvents()
-			else:
-				print "Splitting On {0} axis".format(axis)
-
-			splitList, splitBy, memo = splitSmpx.buildSplitterList(foList)
-
-			lSideSplitList = copy.deepcopy(splitList, memo=copy.copy(memo))
-			rSideSplitList = copy.deepcopy(splitList, memo=copy.copy(memo))
-
-			for oldItem, lItem, rItem in zip(splitList, lSideSplitList, rSideSplitList):
-				fo = splitBy[oldItem]
-				fo.splitRename(lItem, 0)
-				fo.splitRename(rItem, 1)
-				if isinstance(oldItem, Shape):
-					fo.applyFalloff(lItem, 0)
-					fo.applyFalloff(rItem, 1)
-
-				if hasattr(oldItem, 'group'):
-					oldItem.group.items.remove(oldItem)
-					oldItem.group = None
-					lItem.group.items.append(lItem)
-					rItem.group.items.append(rItem)
-
-				if isinstance(oldItem, Slider):
-					splitSmpx.sliders.remove(oldItem)
-					splitSmpx.sliders.append(lItem)
-					splitSmpx.sliders.append(rItem)
-				elif isinstance(oldItem, Combo):
-					splitSmpx.combos.remove(oldItem)
-					splitSmpx.combos.append(lItem)
-					splitSmpx.combos.append(rItem)
-				elif isinstance(oldItem, Traversal):
-					splitSmpx.traversals.remove(oldItem)
-					splitSmpx.traversals.append(lItem)
-					splitSmpx.traversals.append(rItem)
-				elif isinstance(oldItem, Shape):
-					splitSmpx.shapes.remove(oldItem)
-					# It's a DummyDCC, this just removes the shape verts
-					# from the DCC dictionary if it exists
-					splitSmpx.DCC.deleteShape(oldItem)
-					splitSmpx.shapes.append(lItem)
-					splitSmpx.shapes.append(rItem)
-
-		splitSmpx.DCC.pushAllShapeVertices(splitSmpx.shapes)
 		return splitSmpx
 
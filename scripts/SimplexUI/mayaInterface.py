@@ -134,19 +134,7 @@ class DCC(object):
 		missingNames = []
 		seen = set()
 
-		# Get the blendshape weight names
-		try:
-			# GOOD GOD. This is because in maya 2016.5, if you delete a multi-instance
-			# then listAttr, *it lists the deleted ones, and skips the ones at the end*
-			# So I have to use aliasAttr and filter for the weights
-			aliases = cmds.aliasAttr(self.shapeNode, query=True) or []
-			attrs = [aliases[i] for i in range(0, len(aliases), 2)
-					if aliases[i+1].startswith('weight[')]
-			attrs = set(attrs)
-
-		except ValueError:
-			attrs = set()
-
+		attrs = self._getShapeAttrNames()
 		for shapeName in shapeNames:
 			if shapeName in seen:
 				continue
@@ -268,18 +256,45 @@ class DCC(object):
 		else:
 			self.ctrl = ctrlCnx[0]
 
+	def _getShapeAttrNames(self):
+		''' Get the set of blendshape weight names '''
+		try:
+			# GOOD GOD. This is because in maya 2016.5, if you delete a multi-instance
+			# then listAttr, *it lists the deleted ones, and skips the ones at the end*
+			# So I have to use aliasAttr and filter for the weights
+			aliases = cmds.aliasAttr(self.shapeNode, query=True) or []
+			attrs = [aliases[i] for i in range(0, len(aliases), 2)
+					if aliases[i+1].startswith('weight[')]
+			return set(attrs)
+		except ValueError:
+			return set()
+
 	def getShapeThing(self, shapeName):
 		s = cmds.ls("{0}.{1}".format(self.shapeNode, shapeName))
 		if not s:
 			return None
 		return s[0]
 
+	def getShapeThings(self, shapeNames):
+		''' Get a dict of the existing shape objects for a list of
+		names with a single query. Missing shapes are left out
+		'''
+		attrs = self._getShapeAttrNames()
+		return {n: "{0}.{1}".format(self.shapeNode, n) for n in shapeNames if n in attrs}
+
 	def getSliderThing(self, sliderName):
 		things = cmds.ls("{0}.{1}".format(self.ctrl, sliderName))
 		if not things:
 			return None
 		return things[0]
 
+	def getSliderThings(self, sliderNames):
+		''' Get a dict of the existing slider objects for a list of
+		names with a single query. Missing sliders are left out
+		'''
+		attrs = set(cmds.listAttr(self.ctrl, userDefined=True) or [])
+		return {n: "{0}.{1}".format(self.ctrl, n) for n in sliderNames if n in attrs}
+
 	@staticmethod
 	@undoable
 	def buildRestAbc(abcMesh, name):
@@ -322,7 +337,7 @@ class DCC(object):
 		cmds.setAttr(abcNode + ".abc_File", abcPath, type="string")
 		cmds.setAttr(abcNode + ".speed", 24) # Is this needed anymore?
 		shapes = js["shapes"]
-		shapeDict = {i.name:i for i in self.simplex.shapes}
+		shapeDict = self.simplex.shapesByName
 
 		if js['encodingVersion'] > 1:
 			shapes = [i['name'] for i in shapes]
@@ -531,7 +546,7 @@ class DCC(object):
 		if dccMesh is None:
 			dccMesh = self.mesh
 
-		shapeDict = {i.name:i for i in self.simplex.shapes}
+		shapeDict = self.simplex.shapesByName
 
 		shapeNames = js['shapes']
 		if js['encodingVersion'] > 1:
@@ -839,6 +854,12 @@ class DCC(object):
 		cmds.setAttr("{0}.inputPointsTarget".format(shapeInput), 0, (), type='pointArray')
 		cmds.setAttr("{0}.inputComponentsTarget".format(shapeInput), 0, '', type='componentList')
 
+	@undoable
+	def zeroShapes(self, shapes):
+		""" Set a list of shapes to be completely zeroed """
+		for shape in shapes:
+			self.zeroShape(shape)
+
 	@undoable
 	def deleteShape(self, toDelShape):
 		""" Remove a shape from the system """
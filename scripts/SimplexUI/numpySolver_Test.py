@@ -0,0 +1,299 @@
+import json, random
+import numpy as np
+
+from SimplexUI.commands.numpySolver import NumpySimplex
+
+try:
+	from pysimplex import PySimplex #pylint:disable=import-error
+except ImportError:
+	PySimplex = None
+
+
+# HELPERS
+def buildDefinition(sliders, combos=(), traversals=()):
+	''' Build a version 2 definition from short descriptions
+
+	Arguments:
+		sliders: A list of (name, interp, [(shapeName, value), ...])
+		combos: A list of (name, solveType, [(sliderIndex, value), ...])
+			Each combo gets a linear progression with one shape at 1.0
+		traversals: A list of (name, progressControl, multiplierControl, progressFlip)
+			where the controls are (type, index) pairs. Each traversal gets
+			a linear progression with one shape at 1.0
+	'''
+	shapes = [{"name": "Rest", "color": [0, 0, 0]}]
+	progs = []
+
+	def buildProg(name, interp, pairs):
+		idxs = [[0, 0.0]]
+		for shapeName, val in pairs:
+			shapes.append({"name": shapeName, "color": [128, 128, 128]})
+			idxs.append([len(shapes) - 1, val])
+		progs.append({"name": name, "pairs": idxs, "interp": interp, "falloffs": []})
+		return len(progs) - 1
+
+	sliderList = []
+	for name, interp, pairs in sliders:
+		sliderList.append({
+			"name": name, "prog": buildProg(name, interp, pairs),
+			"group": 0, "color": [128, 128, 128], "enabled": True,
+		})
+
+	comboList = []
+	for name, solveType, pairs in combos:
+		comboList.append({
+			"name": name, "prog": buildProg(name, "linear", [(name, 1.0)]),
+			"pairs": [list(p) for p in pairs], "group": 1, "solveType": solveType,
+			"color": [128, 128, 128], "enabled": True,
+		})
+
+	travList = []
+	for name, (pType, pIdx), (mType, mIdx), flip in traversals:
+		travList.append({
+			"name": name, "prog": buildProg(name, "linear", [(name, 1.0)]),
+			"group": 2, "color": [128, 128, 128], "enabled": True,
+			"progressType": pType, "progressControl": pIdx, "progressFlip": flip,
+			"multiplierType": mType, "multiplierControl": mIdx, "multiplierFlip": False,
+		})
+
+	return {
+		"encodingVersion": 2,
+		"systemName": "Solver",
+		"clusterName": "Shape",
+		"falloffs": [],
+		"groups": [
+			{"name": "Group_0", "type": "Slider", "color": [128, 128, 128]},
+			{"name": "Group_1", "type": "Combo", "color": [128, 128, 128]},
+			{"name": "Group_2", "type": "Traversal", "color": [128, 128, 128]},
+		],
+		"shapes": shapes,
+		"progressions": progs,
+		"sliders": sliderList,
+		"combos": comboList,
+		"traversals": travList,
+	}
+
+def solvePose(simpDict, values, exact=True):
+	''' Solve one set of slider values, and get the result by shape name '''
+	solver = NumpySimplex(json.dumps(simpDict))
+	solver.exactSolve = exact
+	out = solver.solve(values)
+	return dict(zip([s["name"] for s in simpDict["shapes"]], out))
+
+def buildComboSystem(solveType):
+	sliders = [("A", "linear", [("A", 1.0)]), ("B", "linear", [("B", 1.0)])]
+	return buildDefinition(sliders, combos=[("AB", solveType, [(0, 1.0), (1, 1.0)])])
+
+def buildRandomDefinition(rand, numSliders=8, numCombos=12, numFloaters=4, numTraversals=3):
+	''' Build a version 2 definition using every interpolation, solve type,
+	and traversal control type, with some disabled sliders and combos
+	'''
+	shapes = [{"name": "Rest", "color": [0, 0, 0]}]
+	progs = []
+
+	def buildProg(name, values, interp):
+		pairs = [[0, 0.0]]
+		for i, v in enumerate(values):
+			shapes.append({"name": "{0}_{1}".format(name, i), "color": [128, 128, 128]})
+			pairs.append([len(shapes) - 1, v])
+		# The solver has to sort the pairs itself
+		rand.shuffle(pairs)
+		progs.append({"name": name, "pairs": pairs, "interp": interp, "falloffs": []})
+		return len(progs) - 1
+
+	sliderValues = [[1.0], [1.0, -1.0], [0.5, 1.0], [0.25, 0.5, 1.0, -0.5, -1.0], [0.5, 1.0, -1.0]]
+	sliders = []
+	for i in range(numSliders):
+		name = "Slider{0}".format(i)
+		interp = rand.choice(["linear", "spline", "splitspline"])
+		sliders.append({
+			"name": name, "prog": buildProg(name, rand.choice(sliderValues), interp),
+			"group": 0, "color": [128, 128, 128], "enabled": rand.random() > 0.1,
+		})
+
+	solveTypes = ["min", "allMul", "extMul", "mulAvgExt", "mulAvgAll", "None"]
+	combos = []
+	for i in range(numCombos):
+		name = "Combo{0}".format(i)
+		pairs = [[s, rand.choice([1.0, -1.0])] for s in rand.sample(range(numSliders), rand.randint(2, 3))]
+		combos.append({
+			"name": name, "prog": buildProg(name, rand.choice([[1.0], [0.5, 1.0]]), rand.choice(["linear", "spline"])),
+			"pairs": pairs, "group": 1, "solveType": rand.choice(solveTypes),
+			"color": [128, 128, 128], "enabled": rand.random() > 0.1,
+		})
+
+	# Floaters are combos with values between 0 and 1, that share sliders
+	for i in range(numFloaters):
+		name = "Floater{0}".format(i)
+		pairs = [[s, rand.choice([0.25, 0.5, 0.75, 1.0, -0.5])] for s in rand.sample(range(3), 2)]
+		combos.append({
+			"name": name, "prog": buildProg(name, [1.0], "linear"), "pairs": pairs, "group": 1,
+			"solveType": "min", "color": [128, 128, 128], "enabled": True,
+		})
+
+	travs = []
+	for i in range(numTraversals):
+		name = "Traversal{0}".format(i)
+		progType = rand.choice(["Slider", "Combo"])
+		multType = rand.choice(["Slider", "Combo"])
+		travs.append({
+			"name": name, "prog": buildProg(name, [0.25, 0.5, 0.75, 1.0], "spline"),
+			"group": 2, "color": [128, 128, 128], "enabled": True,
+			"progressType": progType, "progressFlip": rand.random() > 0.5,
+			"progressControl": rand.randrange(numSliders if progType == "Slider" else numCombos),
+			"multiplierType": multType, "multiplierFlip": rand.random() > 0.5,
+			"multiplierControl": rand.randrange(numSliders if multType == "Slider" else numCombos),
+		})
+
+	simpDict = buildDefinition([])
+	simpDict.update(shapes=shapes, progressions=progs, sliders=sliders, combos=combos, traversals=travs)
+	return simpDict
+
+def buildRandomInputs(rand, numSliders, count):
+	''' Build (count, numSliders) slider values slightly past the -1 to 1 range
+	About a third of the values are snapped to the progression values, where
+	the solvers have to agree about which side of an interval they're on
+	'''
+	snaps = [0.0, 0.25, 0.5, 1.0, -0.5, -1.0]
+	inputs = np.zeros((count, numSliders))
+	for row in inputs:
+		for i in range(numSliders):
+			if rand.random() < 0.33:
+				row[i] = rand.choice(snaps)
+			else:
+				row[i] = rand.uniform(-1.25, 1.25)
+	return inputs
+
+
+
+# PROGRESSION TESTS
+def testLinearSlider():
+	simpDict = buildDefinition([("A", "linear", [("A", 1.0)])])
+	out = solvePose(simpDict, [0.25])
+	assert np.isclose(out["A"], 0.25) and np.isclose(out["Rest"], 0.75), out
+
+def testSplineSlider():
+	simpDict = buildDefinition([("A", "spline", [("A50", 0.5), ("A100", 1.0)])])
+
+	# Catmull-rom goes through its points
+	out = solvePose(simpDict, [0.5])
+	assert np.isclose(out["A50"], 1.0) and np.isclose(out["A100"], 0.0), out
+
+	# Halfway to the first point, the input tangent overshoots a little
+	out = solvePose(simpDict, [0.25])
+	assert np.isclose(out["A50"], 0.625), out
+	assert np.isclose(out["A100"], -0.0625), out
+	assert np.isclose(out["Rest"], 0.75), out
+
+def testSplitSplineSlider():
+	pairs = [("Neg100", -1.0), ("Neg50", -0.5), ("Pos50", 0.5), ("Pos100", 1.0)]
+	spline = solvePose(buildDefinition([("A", "spline", pairs)]), [0.25])
+	split = solvePose(buildDefinition([("A", "splitspline", pairs)]), [0.25])
+
+	# A plain spline uses the negative shapes as a tangent, a split spline doesn't
+	assert np.isclose(spline["Neg50"], -0.0625), spline
+	assert split["Neg50"] == 0.0 and split["Neg100"] == 0.0, split
+	assert np.isclose(split["Pos50"], 0.625) and np.isclose(split["Pos100"], -0.0625), split
+
+
+# COMBO TESTS
+def testComboSolveTypes():
+	# Hand computed for A=0.5, B=0.8
+	expected = {
+		"min": 0.5,
+		"None": 0.5,
+		"allMul": 0.4,
+		"extMul": 0.4,
+		"mulAvgExt": 0.8 / 1.3,
+		"mulAvgAll": 0.8 / 1.3,
+	}
+	for solveType, value in expected.iteritems():
+		out = solvePose(buildComboSystem(solveType), [0.5, 0.8])
+		assert np.isclose(out["AB"], value), (solveType, out["AB"], value)
+
+def testComboSoftMin():
+	out = solvePose(buildComboSystem("min"), [0.5, 0.8], exact=False)
+	assert abs(out["AB"] - 0.4932) < 1.0e-4, out["AB"]
+
+def testComboWrongSide():
+	for values in ([-0.5, 0.8], [0.5, 0.0], [0.0, 0.0]):
+		out = solvePose(buildComboSystem("min"), values)
+		assert out["AB"] == 0.0, (values, out["AB"])
+
+
+# TRAVERSAL TESTS
+def testTraversal():
+	sliders = [("A", "linear", [("A", 1.0)]), ("B", "linear", [("B", 1.0)])]
+	trav = ("T", ("Slider", 0), ("Slider", 1), False)
+	out = solvePose(buildDefinition(sliders, traversals=[trav]), [0.5, 0.5])
+	assert np.isclose(out["T"], 0.25), out
+
+	# A flipped traversal only runs when its progress slider goes negative
+	trav = ("T", ("Slider", 0), ("Slider", 1), True)
+	simpDict = buildDefinition(sliders, traversals=[trav])
+	assert solvePose(simpDict, [0.5, 0.5])["T"] == 0.0
+	assert np.isclose(solvePose(simpDict, [-0.5, 0.5])["T"], 0.25)
+
+
+# BATCH TESTS
+def testBatch():
+	simpDict = buildRandomDefinition(random.Random(0))
+	inputs = buildRandomInputs(random.Random(1), len(simpDict["sliders"]), 20)
+	solver = NumpySimplex(json.dumps(simpDict))
+
+	batch = solver.solveBatch(inputs)
+	assert batch.shape == (20, len(simpDict["shapes"])), batch.shape
+	for row, vec in zip(batch, inputs):
+		assert np.array_equal(row, solver.solve(vec.tolist()))
+
+	output = np.zeros((20, len(simpDict["shapes"]) + 2))
+	solver.solveBatchBuffer(inputs, output)
+	assert np.array_equal(output[:, :-2], batch)
+
+	try:
+		solver.solveBatch(inputs[:, 1:])
+	except ValueError:
+		pass
+	else:
+		raise AssertionError("The wrong number of sliders should be rejected")
+
+def testPluginParity():
+	''' Check against the compiled plugin on random systems, when it's available '''
+	if PySimplex is None:
+		print "Skipped plugin parity, pysimplex is not available"
+		return
+
+	rand = random.Random(0)
+	for sysIdx in range(20):
+		simpDict = buildRandomDefinition(rand)
+		jsString = json.dumps(simpDict)
+		inputs = buildRandomInputs(rand, len(simpDict["sliders"]), 500)
+
+		for exact in (True, False):
+			npSolver = NumpySimplex(jsString)
+			npSolver.exactSolve = exact
+			cppSolver = PySimplex(jsString)
+			cppSolver.exactSolve = exact
+
+			npOut = npSolver.solveBatch(inputs)
+			cppOut = np.array([cppSolver.solve(row.tolist()) for row in inputs])
+			diff = np.abs(npOut - cppOut)
+			row, col = np.unravel_index(diff.argmax(), diff.shape)
+			assert diff[row, col] <= 1.0e-6, (
+				"System {0} (exactSolve={1}): shape {2} differs by {3} for inputs {4}".format(
+					sysIdx, exact, simpDict["shapes"][col]["name"], diff[row, col], inputs[row].tolist()
+				)
+			)
+
+
+
+if __name__ == "__main__":
+	testLinearSlider()
+	testSplineSlider()
+	testSplitSplineSlider()
+	testComboSolveTypes()
+	testComboSoftMin()
+	testComboWrongSide()
+	testTraversal()
+	testBatch()
+	testPluginParity()
@@ -0,0 +1,122 @@
+import os, tempfile
+import numpy as np
+
+from SimplexUI.commands.referenceFile import (
+	References, writeReferences, loadReferences, readReferenceHeader, isReferenceFile
+)
+
+
+# HELPERS
+def buildReferences(numVerts=50):
+	''' Build a rest reference and three (numVerts, 4, 4) affine references
+	based on it. The first moves every 4th point, the second moves every
+	other point, and the third is the same as the rest
+	'''
+	nprand = np.random.RandomState(0)
+	rest = np.zeros((numVerts, 4, 4))
+	rest[:, :3, :3] = np.eye(3)[None] + nprand.uniform(-0.1, 0.1, (numVerts, 3, 3))
+	rest[:, 3, :3] = nprand.uniform(-1.0, 1.0, (numVerts, 3))
+	rest[:, 3, 3] = 1.0
+
+	refs = np.repeat(rest[None], 3, axis=0)
+	for ref, step in zip(refs, (4, 2)):
+		ref[::step, :, :3] += nprand.uniform(-0.5, 0.5, (len(ref[::step]), 4, 3))
+	return refs, rest
+
+def roundTrip(refs, dtype='<f4'):
+	''' Write references to a temp file and read them back
+
+	Returns:
+		dict: The header of the file
+		list: The names
+		list: The reference indices
+		list: Copies of the full (numVerts, 4, 4) references
+	'''
+	names = ["Shape{0}".format(i) for i in range(len(refs) * 2)]
+	refIdxs = [i // 2 for i in range(len(names))]
+
+	handle, path = tempfile.mkstemp(suffix='.smpxref')
+	os.close(handle)
+	try:
+		writeReferences(path, names, refIdxs, refs, dtype=dtype)
+		header, _ = readReferenceHeader(path)
+		rNames, rRefIdxs, rRefs = loadReferences(path)
+		out = [np.array(r) for r in rRefs]
+		# Release the memory map so the file can be removed
+		del rRefs
+	finally:
+		os.remove(path)
+
+	assert list(rNames) == names, rNames
+	assert list(rRefIdxs) == refIdxs, rRefIdxs
+	return header, out
+
+
+
+# ROUND TRIP TESTS
+def testDenseArray():
+	refs, _ = buildReferences()
+	header, out = roundTrip(refs)
+	assert not header["hasRest"] and header["counts"] is None, header
+	assert np.allclose(out, refs, atol=1.0e-5)
+
+def testDenseReferences():
+	refs, _ = buildReferences()
+	header, out = roundTrip(References.fromArray(refs))
+	assert not header["hasRest"], header
+	assert np.allclose(out, refs, atol=1.0e-5)
+
+def testSparseReferences():
+	refs, rest = buildReferences()
+	header, out = roundTrip(References.fromArray(refs, rest=rest))
+
+	# Only the points that moved are stored
+	assert header["hasRest"], header
+	assert header["counts"] == [13, 25, 0], header["counts"]
+	assert np.allclose(out, refs, atol=1.0e-5)
+
+def testInvertedReferences():
+	''' Inverses are float64, so they're stored at full precision '''
+	refs, rest = buildReferences()
+	# The references are rounded to float32 before they're inverted
+	expected = np.linalg.inv(np.array(list(References.fromArray(refs))))
+	for source in (References.fromArray(refs), References.fromArray(refs, rest=rest)):
+		header, out = roundTrip(source.invert(), dtype='<f8')
+		assert header["dtype"] == '<f8', header["dtype"]
+		assert np.allclose(out, expected, atol=1.0e-10)
+
+
+# REFERENCE TESTS
+def testApplyTo():
+	refs, rest = buildReferences()
+	sparse = References.fromArray(refs, rest=rest)
+	pts = np.random.RandomState(1).uniform(-1.0, 1.0, (2, len(rest), 3))
+	hom = np.concatenate([pts, np.ones(pts.shape[:-1] + (1,))], axis=-1)
+	for i in range(len(refs)):
+		expected = np.einsum('...ij,ijk->...ik', hom, sparse[i])[..., :3]
+		assert np.allclose(sparse.applyTo(i, pts), expected), i
+
+def testNotAReferenceFile():
+	handle, path = tempfile.mkstemp(suffix='.smpxref')
+	os.write(handle, b'not a reference file')
+	os.close(handle)
+	try:
+		assert not isReferenceFile(path)
+		try:
+			loadReferences(path)
+		except ValueError:
+			pass
+		else:
+			raise AssertionError("Loading a file without the magic string should fail")
+	finally:
+		os.remove(path)
+
+
+
+if __name__ == "__main__":
+	testDenseArray()
+	testDenseReferences()
+	testSparseReferences()
+	testInvertedReferences()
+	testApplyTo()
+	testNotAReferenceFile()
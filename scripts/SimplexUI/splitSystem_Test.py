@@ -0,0 +1,123 @@
+import json
+import numpy as np
+
+from SimplexUI.commands.shapeMatrix import ShapeMatrix
+from SimplexUI.commands.splitSystem import splitDefinition
+from SimplexUI.interfaceItems import Simplex
+
+
+# HELPERS
+def buildSplitDict():
+	''' A system with one slider on each kind of falloff, and one with none '''
+	def slider(idx, name, falloffs):
+		return (
+			{"name": name, "pairs": [[0, 0.0], [idx, 1.0]], "interp": "spline", "falloffs": falloffs},
+			{"name": name, "prog": idx - 1, "group": 0, "color": [128, 128, 128], "enabled": True},
+		)
+
+	names = ["Smile_X", "Blink_X", "Jaw_X"]
+	progs, sliders = zip(*[slider(i + 1, n, f) for i, (n, f) in enumerate(zip(names, [[0], [1], []]))])
+	return {
+		"encodingVersion": 2,
+		"systemName": "Split",
+		"clusterName": "Shape",
+		"falloffs": [{
+			"name": "Left_X", "type": "planar", "axis": "X", "maxVal": 1.0,
+			"maxHandle": 0.66, "minHandle": 0.33, "minVal": -1.0, "mapName": None,
+			"color": [128, 128, 128],
+		}, {
+			"name": "Mask", "type": "map", "axis": None, "maxVal": None,
+			"maxHandle": None, "minHandle": None, "minVal": None, "mapName": "Mask",
+			"color": [128, 128, 128],
+		}],
+		"groups": [{"name": "Group_0", "type": "Slider", "color": [128, 128, 128]}],
+		"shapes": [{"name": n, "color": [128, 128, 128]} for n in ["Rest"] + names],
+		"progressions": list(progs),
+		"sliders": list(sliders),
+		"combos": [],
+		"traversals": [],
+	}
+
+def buildSplitSystem(numVerts=40):
+	''' Build the definition, a dummy system with the map weights set, and
+	a shape matrix whose rest spans both sides of the planar falloff.
+	Half the points never move, so the sparse matrix has something to skip
+	'''
+	simpDict = buildSplitDict()
+	nprand = np.random.RandomState(0)
+	rest = nprand.uniform(-0.5, 0.5, (numVerts, 3))
+	rest[:, 0] = np.linspace(-1.5, 1.5, numVerts)
+	points = rest[None] + nprand.uniform(-0.5, 0.5, (len(simpDict["shapes"]), numVerts, 3))
+	points[0] = rest
+	points[:, ::2] = rest[::2]
+	matrix = ShapeMatrix.fromPoints([s["name"] for s in simpDict["shapes"]], points)
+
+	smpx = Simplex.buildSystemFromDict(json.loads(json.dumps(simpDict)), None, forceDummy=True)
+	smpx.falloffs[1].weights = nprand.rand(numVerts)
+	return simpDict, matrix, smpx
+
+def getDeltas(simpDict, matrix):
+	return dict((s["name"], matrix.getDelta(s["name"])) for s in simpDict["shapes"])
+
+
+# SPLIT TESTS
+def testGetWeights():
+	simpDict, matrix, smpx = buildSplitSystem()
+	planar, mapFo = smpx.falloffs
+	mapWeights = mapFo.weights
+
+	weights = planar.getWeights(matrix.rest)
+	assert planar._weights is None, "Planar weights were stored on the falloff"
+	assert weights[0] == 0.0 and weights[-1] == 1.0, "Planar weights don't span the falloff"
+	assert mapFo.getWeights(matrix.rest) is mapWeights, "Map weights were changed"
+
+def testSplitPlanar():
+	simpDict, matrix, smpx = buildSplitSystem()
+	weights = dict((fo, fo.getWeights(matrix.rest)) for fo in smpx.falloffs)
+	newDict, newMatrix = splitDefinition(simpDict, matrix, smpx.falloffs, weights=weights, workers=1)
+
+	names = [s["name"] for s in newDict["shapes"]]
+	assert names == ["Rest", "Smile_L", "Smile_R", "Blink_X", "Jaw_X"], names
+	assert [s["name"] for s in newDict["sliders"]] == ["Smile_L", "Smile_R", "Blink_X", "Jaw_X"]
+
+	w = weights[smpx.falloffs[0]]
+	delta = matrix.getDelta("Smile_X")
+	assert np.allclose(newMatrix.getDelta("Smile_L"), delta * w[:, None], atol=1.0e-5)
+	assert np.allclose(newMatrix.getDelta("Smile_R"), delta * (1 - w)[:, None], atol=1.0e-5)
+
+	# The map falloff is never split on, and unsplit shapes are left alone
+	for name in ("Blink_X", "Jaw_X"):
+		assert np.array_equal(newMatrix.getDelta(name), matrix.getDelta(name)), name
+
+	# Make sure the new definition can actually be loaded
+	Simplex.buildSystemFromDict(newDict, None, forceDummy=True)
+
+def testSplitSparse():
+	simpDict, matrix, smpx = buildSplitSystem()
+	weights = dict((fo, fo.getWeights(matrix.rest)) for fo in smpx.falloffs)
+	denseDict, dense = splitDefinition(simpDict, matrix, smpx.falloffs, weights=weights, workers=1)
+	sparseDict, sparse = splitDefinition(simpDict, matrix.toSparse(), smpx.falloffs, weights=weights, workers=2)
+
+	assert sparseDict == denseDict, "Sparse and dense split definitions differ"
+	dd, sd = getDeltas(denseDict, dense), getDeltas(sparseDict, sparse)
+	for name, delta in dd.iteritems():
+		assert np.allclose(sd[name], delta, atol=1.0e-5), name
+
+def testSplitDefaultWeights():
+	''' Without a weights dictionary, the falloffs' own weights are used '''
+	simpDict, matrix, smpx = buildSplitSystem()
+	weights = dict((fo, fo.getWeights(matrix.rest)) for fo in smpx.falloffs)
+	_, expected = splitDefinition(simpDict, matrix, smpx.falloffs, weights=weights, workers=1)
+
+	smpx.falloffs[0].setVerts(matrix.rest)
+	newDict, newMatrix = splitDefinition(simpDict, matrix, smpx.falloffs, workers=1)
+	for name, delta in getDeltas(newDict, expected).iteritems():
+		assert np.array_equal(newMatrix.getDelta(name), delta), name
+
+
+
+if __name__ == "__main__":
+	testGetWeights()
+	testSplitPlanar()
+	testSplitSparse()
+	testSplitDefaultWeights()
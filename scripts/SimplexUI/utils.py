@@ -38,9 +38,11 @@ def getUiFile(fileVar, subFolder="ui", uiName=None):
 	return uiFile
 
 def getNextName(name, currentNames):
-	''' Get the next available name '''
+	''' Get the next available name
+	currentNames can be any container, and a set or dict is checked directly
+	'''
 	i = 0
-	s = set(currentNames)
+	s = currentNames if isinstance(currentNames, (set, frozenset, dict)) else set(currentNames)
 	while True:
 		if not i:
 			nn = name
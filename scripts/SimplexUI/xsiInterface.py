@@ -110,9 +110,32 @@ class DCC(object):
 				return [prop, None, None, None]
 		return None
 
+	def getShapeThings(self, shapeNames):
+		''' Get a dict of the existing shape objects for a list of
+		names with a single pass over the cluster. Missing shapes are left out
+		'''
+		props = {}
+		for prop in self.shapeCluster.Properties:
+			props.setdefault(prop.Name, prop)
+		ret = {}
+		for shapeName in shapeNames:
+			prop = props.get(self.shapeNamePrefix + shapeName)
+			if prop is not None:
+				ret[shapeName] = [prop, None, None, None]
+		return ret
+
 	def getSliderThing(self, sliderName):
 		return self.inProp.Parameters(sliderName)
 
+	def getSliderThings(self, sliderNames):
+		''' Get a dict of the existing slider objects for a list of names '''
+		ret = {}
+		for sliderName in sliderNames:
+			thing = self.getSliderThing(sliderName)
+			if thing is not None:
+				ret[sliderName] = thing
+		return ret
+
 	def preLoad(self, simp, simpDict, create=True, pBar=None):
 		# Pre-build all the nodes and parameters quickly
 		if pBar is not None:
@@ -624,7 +647,7 @@ class DCC(object):
 	def exportAbc(self, dccMesh, abcMesh, js, world=False, pBar=None):
 		# dccMesh doesn't work in XSI, so just ignore it
 		# export the data to alembic
-		shapeDict = {i.name:i for i in self.simplex.shapes}
+		shapeDict = self.simplex.shapesByName
 		if js['encodingVersion'] > 1:
 			shapeNames = [i['name'] for i in js["shapes"]]
 		else:
@@ -972,6 +995,12 @@ class DCC(object):
 
 		print("Shape %s has been reset" %shape.name)
 
+	@undoable
+	def zeroShapes(self, shapes):
+		""" Set a list of shapes to be completely zeroed """
+		for shape in shapes:
+			self.zeroShape(shape)
+
 	@undoable
 	def deleteShape(self, toDelShape):
 		""" Remove a shape from the system """